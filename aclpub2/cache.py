@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Optional
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+# The cache lives next to the build directory rather than inside it, so that it
+# survives the `rm -rf build` performed by --overwrite.
+DEFAULT_CACHE_DIR = Path(".aclpub2_cache")
+
+# Bump this whenever a change to the generation code invalidates cached outputs.
+CACHE_VERSION = "2"
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_strings(*parts: str) -> str:
+    digest = hashlib.sha256(CACHE_VERSION.encode("utf-8"))
+    for part in parts:
+        # Length-prefix each part so that ("ab", "c") and ("a", "bc") differ.
+        encoded = str(part).encode("utf-8")
+        digest.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    A content-addressed store of build products. Entries are grouped by
+    namespace (e.g. "watermarked_pdfs") and addressed by a hex digest computed
+    by the caller from everything that determines the product's content.
+    Entries are written atomically, so concurrent workers may share a cache.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, namespace: str, key: str, suffix: str = "") -> Path:
+        return Path(self.root, namespace, key[:2], key + suffix)
+
+    def get(self, namespace: str, key: str, suffix: str = "") -> Optional[Path]:
+        path = self.path(namespace, key, suffix)
+        if path.exists():
+            return path
+        return None
+
+    def put(self, namespace: str, key: str, source: Path, suffix: str = "") -> Path:
+        path = self.path(namespace, key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return path
+
+    def write(self, namespace: str, key: str, data: bytes, suffix: str = "") -> Path:
+        path = self.path(namespace, key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return path
+
+    def fetch(self, namespace: str, key: str, destination: Path, suffix: str = "") -> bool:
+        """
+        Copies a cached entry to destination, returning whether it was found.
+        """
+        path = self.get(namespace, key, suffix)
+        if path is None:
+            return False
+        shutil.copy2(path, destination)
+        return True
@@ -0,0 +1,264 @@
+"""
+Pre-flight validation of a proceedings input directory. Every problem that
+would otherwise stop the build one at a time is collected in a single pass:
+the .yml files are checked against a schema, program entries against
+papers.yml, and every paper PDF is opened in a process pool. Neither LaTeX
+nor user input is involved. Warnings, e.g. pages that are not A4, are
+reported along with the problems but do not stop the build.
+"""
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PyPDF2 import PdfFileReader
+from PyPDF2.generic import ArrayObject, IndirectObject
+
+from aclpub2.config import SafeLoader, required_conference_fields
+from aclpub2.pages import parallel_map
+
+import yaml
+
+# A schema is a type or tuple of types, a list holding the schema of every
+# item, or a dict holding the schema of every field; fields ending in "?" are
+# optional, and "*" stands for any field. Other fields are not checked.
+NAME = {"first_name": str, "last_name": str, "middle_name?": str}
+PERSON = {**NAME, "institution?": str}
+BLOCKS = [{"role": str, "entries?": [PERSON], "members?": [PERSON]}]
+SESSION = {
+    "title": str,
+    "start_time": datetime,
+    "end_time": datetime,
+    "papers?": [{"id": (int, str)}],
+}
+SESSION["subsessions?"] = [SESSION]
+
+SCHEMAS = {
+    "conference_details": {
+        **{field: object for field in required_conference_fields},
+        "start_date": date,
+        "end_date": date,
+        "editors": [NAME],
+    },
+    "papers": [
+        {
+            "id": (int, str),
+            "title": str,
+            "authors": [NAME],
+            "file?": str,
+            "archival?": bool,
+            "abstract?": str,
+            "attachments?": [{"type": str, "file": str}],
+        }
+    ],
+    "program": [SESSION],
+    "program_committee": [{"role?": str, "entries": [{"*": str}]}],
+    "organizing_committee": BLOCKS,
+    "sponsors": [{"tier": str, "logos": [str]}],
+    "prefaces": [{"title": str, "file": str}],
+    "invited_talks": [{"title": str}],
+    "panels": [{"title": str}],
+    "additional_pages": [{"title": str}],
+}
+
+# Papers should be A4, in points, up to rounding.
+A4 = (595.0, 842.0)
+PAGE_SIZE_TOLERANCE = 2.0
+
+
+def type_name(types) -> str:
+    if isinstance(types, tuple):
+        return " or ".join(t.__name__ for t in types)
+    return types.__name__
+
+
+def validate(value, schema, where: str) -> List[str]:
+    """
+    Returns a message for every place where value does not follow schema.
+    """
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            return [f"{where}: expected a list, got {value!r}"]
+        problems = []
+        for i, item in enumerate(value):
+            problems += validate(item, schema[0], f"{where}[{i}]")
+        return problems
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            return [f"{where}: expected a mapping, got {value!r}"]
+        problems = []
+        for field, field_schema in schema.items():
+            if field == "*":
+                for key, item in value.items():
+                    problems += validate(item, field_schema, f"{where}.{key}")
+                continue
+            optional = field.endswith("?")
+            field = field.rstrip("?")
+            if field not in value or (optional and value[field] is None):
+                if not optional:
+                    problems.append(f"{where}: missing '{field}'")
+                continue
+            problems += validate(value[field], field_schema, f"{where}.{field}")
+        return problems
+    types = schema if isinstance(schema, tuple) else (schema,)
+    # YAML reads e.g. "no" as False, and booleans are also ints.
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        return [f"{where}: expected {type_name(schema)}, got {value!r}"]
+    return []
+
+
+def load_yaml(path: Path, problems: List[str]):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.load(f, Loader=SafeLoader)
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        problems.append(f"{path.name}: cannot be parsed: {e}")
+        return None
+
+
+def program_paper_ids(sessions):
+    for session in sessions:
+        if not isinstance(session, dict):
+            continue
+        for paper in session.get("papers") or []:
+            if isinstance(paper, dict) and "id" in paper:
+                yield paper["id"], session.get("title")
+        yield from program_paper_ids(session.get("subsessions") or [])
+
+
+def check_configs(root: Path):
+    """
+    Checks every .yml file of root, and returns the problems and the papers.
+    """
+    problems = []
+    configs = {}
+    for name, schema in SCHEMAS.items():
+        path = Path(root, f"{name}.yml")
+        if not path.exists():
+            if name == "conference_details":
+                problems.append(f"{path.name}: missing")
+            continue
+        configs[name] = load_yaml(path, problems)
+        if configs[name] is not None:
+            problems += validate(configs[name], schema, path.name)
+
+    papers = configs.get("papers") if isinstance(configs.get("papers"), list) else []
+    papers = [paper for paper in papers if isinstance(paper, dict)]
+    ids = {}
+    for paper in papers:
+        if "id" in paper and paper["id"] in ids:
+            problems.append(f"papers.yml: duplicate id {paper['id']}")
+        ids[paper.get("id")] = paper
+    if isinstance(configs.get("program"), list):
+        for paper_id, session in program_paper_ids(configs["program"]):
+            if paper_id not in ids:
+                problems.append(
+                    f"program.yml: session '{session}' lists paper {paper_id}, which is not in papers.yml"
+                )
+    return problems, papers
+
+
+def link_problems(reader: PdfFileReader) -> List[str]:
+    """
+    Returns a message for every link annotation without a valid rectangle or
+    whose internal destination does not exist.
+    """
+    problems = []
+    pages = {
+        reader.getPage(i).indirectRef.idnum: i for i in range(reader.getNumPages())
+    }
+    named = None
+    for i in range(reader.getNumPages()):
+        annotations = reader.getPage(i).get("/Annots") or []
+        if isinstance(annotations, IndirectObject):
+            annotations = annotations.getObject()
+        for annotation in annotations:
+            annotation = annotation.getObject()
+            if annotation.get("/Subtype") != "/Link":
+                continue
+            where = f"link on page {i + 1}"
+            rect = annotation.get("/Rect")
+            if not isinstance(rect, ArrayObject) or len(rect) != 4:
+                problems.append(f"{where} has no valid /Rect")
+                continue
+            destination = annotation.get("/Dest")
+            action = annotation.get("/A")
+            if destination is None and action is not None:
+                action = action.getObject()
+                if action.get("/S") == "/GoTo":
+                    destination = action.get("/D")
+            if destination is None:
+                continue
+            destination = destination.getObject()
+            if isinstance(destination, ArrayObject):
+                target = destination[0] if destination else None
+                if not isinstance(target, IndirectObject) or target.idnum not in pages:
+                    problems.append(f"{where} points to a page that does not exist")
+            else:
+                if named is None:
+                    named = set(reader.getNamedDestinations())
+                if str(destination) not in named:
+                    problems.append(f"{where} points to the undefined destination {destination}")
+    return problems
+
+
+def check_pdf(pdf_path: Path) -> Tuple[List[str], List[str]]:
+    """
+    Returns the problems and the warnings of a paper PDF. Pages that are not
+    A4 are only warned about, since the build scales them.
+    """
+    try:
+        reader = PdfFileReader(str(pdf_path), strict=False)
+        if reader.isEncrypted:
+            return ["is encrypted"], []
+        num_pages = reader.getNumPages()
+        if num_pages == 0:
+            return ["has no pages"], []
+        warnings = []
+        for i in range(num_pages):
+            box = reader.getPage(i).mediaBox
+            size = (float(box.getWidth()), float(box.getHeight()))
+            if any(abs(a - b) > PAGE_SIZE_TOLERANCE for a, b in zip(sorted(size), A4)):
+                warnings.append(
+                    f"page {i + 1} is {size[0]:.0f}x{size[1]:.0f}pt instead of A4 (595x842pt)"
+                )
+                break
+        return link_problems(reader), warnings
+    except Exception as e:
+        return [f"cannot be read: {e}"], []
+
+
+def check_paper_pdf(pdf_path: str):
+    return pdf_path, check_pdf(Path(pdf_path))
+
+
+def check_inputs(
+    root: Path, processes: Optional[int] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns every problem and every warning found in the input directory root.
+    """
+    root = Path(root)
+    problems, papers = check_configs(root)
+    pdfs = {}
+    for paper in papers:
+        if paper.get("archival", True) is False:
+            continue
+        # Archival papers need a PDF, which the schema cannot express.
+        if paper.get("file") is None:
+            problems.append(f"papers.yml: paper {paper.get('id')}: missing 'file'")
+            continue
+        if not isinstance(paper["file"], str):
+            continue
+        pdf_path = Path(root, "papers", paper["file"])
+        if not pdf_path.exists():
+            problems.append(f"papers.yml: paper {paper.get('id')}: {pdf_path} does not exist")
+        else:
+            pdfs[str(pdf_path)] = paper.get("id")
+    warnings = []
+    for pdf_path, (pdf_problems, pdf_warnings) in parallel_map(
+        check_paper_pdf, sorted(pdfs), processes
+    ):
+        where = f"paper {pdfs[pdf_path]} ({Path(pdf_path).name})"
+        problems += [f"{where}: {problem}" for problem in pdf_problems]
+        warnings += [f"{where}: {warning}" for warning in pdf_warnings]
+    return problems, warnings
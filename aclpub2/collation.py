@@ -0,0 +1,93 @@
+"""
+Sort keys for names, used wherever people are alphabetized: the author index
+of the proceedings and the handbook, and the committee lists. Names may hold
+Unicode accents as well as LaTeX ones, e.g. "Müller" and "M\\"{u}ller", which
+sort the same. Keys are cached, since the same people appear many times.
+"""
+from functools import lru_cache
+
+import re
+import unicodedata
+
+# LaTeX commands for letters without a decomposition into a base letter and
+# an accent.
+LATEX_LETTERS = {
+    "ss": "ss",
+    "o": "o",
+    "O": "O",
+    "l": "l",
+    "L": "L",
+    "aa": "a",
+    "AA": "A",
+    "ae": "ae",
+    "AE": "AE",
+    "oe": "oe",
+    "OE": "OE",
+    "i": "i",
+    "j": "j",
+}
+LATEX_LETTER = re.compile(r"\\(" + "|".join(sorted(LATEX_LETTERS, key=len, reverse=True)) + r")(?![A-Za-z])\s*")
+# Accents, e.g. \"u, \'{e} or \c S, and any other command or escape.
+LATEX_ACCENT = re.compile(r"\\(?:[`'^\"~=.]|[uvHcdbkrt](?![A-Za-z]))\s*")
+LATEX_COMMAND = re.compile(r"\\[A-Za-z]+\s*|\\|[{}]")
+
+# The same for Unicode letters that NFKD does not decompose.
+LETTERS = str.maketrans(
+    {
+        "ø": "o",
+        "Ø": "O",
+        "ł": "l",
+        "Ł": "L",
+        "đ": "d",
+        "Đ": "D",
+        "ð": "d",
+        "Ð": "D",
+        "ħ": "h",
+        "Ħ": "H",
+        "ı": "i",
+        "ß": "ss",
+        "æ": "ae",
+        "Æ": "AE",
+        "œ": "oe",
+        "Œ": "OE",
+        "þ": "th",
+        "Þ": "Th",
+    }
+)
+
+
+@lru_cache(maxsize=1 << 16)
+def sort_key(text: str) -> str:
+    """
+    Returns text without LaTeX markup and accents, case folded.
+    """
+    text = LATEX_LETTER.sub(lambda match: LATEX_LETTERS[match.group(1)], text)
+    text = LATEX_COMMAND.sub("", LATEX_ACCENT.sub("", text))
+    text = unicodedata.normalize("NFKD", text).translate(LETTERS)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def initial(text: str) -> str:
+    """
+    Returns the letter that text is listed under, e.g. "o" for "Ødegaard".
+    """
+    key = sort_key(text)
+    for c in key:
+        if c.isalnum():
+            return c
+    return key[:1]
+
+
+def name_key(last_name: str, first_name: str = "", middle_name: str = ""):
+    """
+    The sort key of a person. Names that collate the same are ordered by
+    their spelling, so that the order does not depend on the input order.
+    """
+    return (
+        sort_key(last_name),
+        sort_key(first_name),
+        sort_key(middle_name),
+        last_name,
+        first_name,
+        middle_name,
+    )
@@ -1,21 +1,124 @@
+from datetime import date, datetime
 from pathlib import Path
+from typing import Optional
 
+from aclpub2.cache import BuildCache, hash_file, hash_strings
+from aclpub2.escape import normalize_latex_string
+
+import json
 import yaml
 
+# The libyaml based loader and dumper are several times faster than the pure
+# Python ones, but are only there if PyYAML was built against libyaml.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CDumper", yaml.Dumper)
+
+# Bump this whenever a change to the loading or normalization of the configs
+# invalidates the snapshots stored in the build cache.
+SNAPSHOT_VERSION = "3"
+
+
+def dump_yaml(data) -> str:
+    return yaml.dump(data, Dumper=Dumper)
 
-def normalize_latex_string(text: str) -> str:
-    return (
-        text.replace("’", "'")
-        .replace("&", "\\&")
-        .replace("_", "\\_")
-        .replace("%", "\\%")
+
+def snapshot_key(kind: str, root: Path) -> str:
+    """
+    Digest of every .yml file that the configs of root may be loaded from.
+    """
+    root = Path(root)
+    files = sorted(root.glob("*.yml")) + sorted(root.glob("workshops/*.yml"))
+    return hash_strings(
+        SNAPSHOT_VERSION,
+        kind,
+        *(f"{path.relative_to(root)}:{hash_file(path)}" for path in files),
     )
 
 
-def load_configs(root: Path):
+def encode_snapshot(value):
+    """
+    Turns configs into JSON data. Tuples, mappings (whose keys need not be
+    strings) and dates are tagged, so that decode_snapshot restores them;
+    anything else YAML may produce raises a TypeError.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [encode_snapshot(item) for item in value]
+    if isinstance(value, tuple):
+        return {"tuple": [encode_snapshot(item) for item in value]}
+    if isinstance(value, dict):
+        return {
+            "dict": [[encode_snapshot(k), encode_snapshot(v)] for k, v in value.items()]
+        }
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    raise TypeError(f"cannot snapshot {type(value).__name__}")
+
+
+def decode_snapshot(data):
+    if isinstance(data, list):
+        return [decode_snapshot(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    (tag, value), = data.items()
+    if tag == "tuple":
+        return tuple(decode_snapshot(item) for item in value)
+    if tag == "dict":
+        return {decode_snapshot(k): decode_snapshot(v) for k, v in value}
+    if tag == "datetime":
+        return datetime.fromisoformat(value)
+    if tag == "date":
+        return date.fromisoformat(value)
+    raise ValueError(f"unknown snapshot tag {tag}")
+
+
+def load_snapshot(cache: BuildCache, key: str):
+    """
+    Returns the configs stored under key, or None. Snapshots are plain JSON
+    read by decode_snapshot, which only builds containers, strings, numbers
+    and dates, so that a snapshot planted in a shared cache directory can at
+    worst feed wrong configs to the build, but never run code.
+    """
+    path = cache.get("configs", key, ".json")
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return decode_snapshot(json.load(f))
+    except (ValueError, TypeError, AttributeError):
+        # E.g. a truncated snapshot; it is rebuilt.
+        return None
+
+
+def save_snapshot(cache: BuildCache, key: str, configs):
+    try:
+        data = json.dumps(encode_snapshot(configs))
+    except TypeError:
+        # The configs hold a YAML type that has no snapshot form, e.g.
+        # !!binary; they are parsed again every time.
+        return
+    cache.write("configs", key, data.encode("utf-8"), ".json")
+
+
+def load_configs(
+    root: Path, unattended: bool = False, cache: Optional[BuildCache] = None
+):
     """
     Loads all conference configuration files defined in the root directory.
+    Problems are reported without waiting for confirmation if unattended is set.
+    If a cache is given, configs that loaded without problems are stored in it,
+    and loaded from there as long as none of the .yml files change.
     """
+    if cache is not None:
+        key = snapshot_key("proceedings", root)
+        configs = load_snapshot(cache, key)
+        if configs is not None:
+            return configs
+
+    well_formed = True
     conference = load_config("conference_details", root, required=True)
     for item in conference:
         if isinstance(conference[item], str):
@@ -36,11 +139,13 @@ def load_configs(root: Path):
                     try:
                         entry[k] = normalize_latex_string(v)
                     except:
+                        well_formed = False
                         print(
                             "Warning: the following entry from the program_committee.yml is ill-formed"
                         )
                         print("\t" + str(entry))
-                        input("Press a key to continue...")
+                        if not unattended:
+                            input("Press a key to continue...")
 
     invited_talks = load_config("invited_talks", root)
     panels = load_config("panels", root)
@@ -65,9 +170,10 @@ def load_configs(root: Path):
         print(
             "Please take a look at: https://github.com/rycolab/aclpub2/blob/main/README.md"
         )
-        input("\nPress Enter to continue anyway or Ctrl+C to quit.\n")
+        if not unattended:
+            input("\nPress Enter to continue anyway or Ctrl+C to quit.\n")
 
-    return (
+    configs = (
         conference,
         papers,
         sponsors,
@@ -79,6 +185,9 @@ def load_configs(root: Path):
         additional_pages,
         program,
     )
+    if cache is not None and is_ok and well_formed:
+        save_snapshot(cache, key, configs)
+    return configs
 
 
 def normalize_program(program):
@@ -89,10 +198,16 @@ def normalize_program(program):
                 subentry["title"] = normalize_latex_string(subentry["title"])
 
 
-def load_configs_handbook(root: Path):
+def load_configs_handbook(root: Path, cache: Optional[BuildCache] = None):
     """
-    Loads all conference configuration files defined in the root directory.
+    Loads all conference configuration files defined in the root directory,
+    or their snapshot in cache, see load_configs.
     """
+    if cache is not None:
+        key = snapshot_key("handbook", root)
+        configs = load_snapshot(cache, key)
+        if configs is not None:
+            return configs
     conference = load_config("conference_details", root)
     papers = load_config("papers", root)
     for paper in papers:
@@ -127,7 +242,7 @@ def load_configs_handbook(root: Path):
         )
     program_overview = load_config("program_overview", root)
 
-    return (
+    configs = (
         conference,
         papers,
         sponsors,
@@ -145,6 +260,9 @@ def load_configs_handbook(root: Path):
         workshop_programs,
         workshop_papers,
     )
+    if cache is not None:
+        save_snapshot(cache, key, configs)
+    return configs
 
 
 def load_config(config: str, root: Path, required=False):
@@ -156,7 +274,19 @@ def load_config(config: str, root: Path, required=False):
             )
         return None
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return unalias(yaml.load(f, Loader=SafeLoader))
+
+
+def unalias(data):
+    """
+    Copies the lists and dicts that YAML aliases share between several places,
+    e.g. a person in two committees, so that each place is normalized once.
+    """
+    if isinstance(data, dict):
+        return {key: unalias(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [unalias(value) for value in data]
+    return data
 
 
 required_conference_fields = [
@@ -0,0 +1,51 @@
+"""
+LaTeX escaping, shared by the configuration loader and the importers in
+openreview/ and softconf/. Both escapers make a single pass over the text and
+remember their results, since names, institutions and titles repeat a lot.
+"""
+from functools import lru_cache
+
+import re
+
+# Importers escape plain text: every character that LaTeX treats specially.
+TEX_ESCAPES = str.maketrans(
+    {
+        "&": r"\&",
+        "%": r"\%",
+        "$": r"\$",
+        "#": r"\#",
+        "_": r"\_",
+        "{": r"\{",
+        "}": r"\}",
+        "~": r"\textasciitilde{}",
+        "^": r"\^{}",
+        "\\": r"\textbackslash{}",
+        "<": r"\textless{}",
+        ">": r"\textgreater{}",
+    }
+)
+
+# The .yml inputs may already contain LaTeX, e.g. the output of an importer,
+# so the loader only escapes the characters that commonly appear unescaped in
+# them, and only where they are not escaped yet.
+NORMALIZATIONS = {"’": "'", "&": r"\&", "_": r"\_", "%": r"\%"}
+UNNORMALIZED = re.compile(r"’|(?<!\\)[&_%]")
+
+CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tex_escape(text: str) -> str:
+    """
+    Escapes plain text to appear as is in LaTeX.
+    """
+    return text.translate(TEX_ESCAPES)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_latex_string(text: str) -> str:
+    """
+    Escapes the &, _ and % of a configuration value that are not escaped yet,
+    and replaces typographic apostrophes.
+    """
+    return UNNORMALIZED.sub(lambda match: NORMALIZATIONS[match.group()], text)
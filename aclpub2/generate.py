@@ -1,27 +1,189 @@
 from collections import defaultdict
 from pathlib import Path
-from PyPDF2 import PdfFileReader
+from typing import Any, Dict, List, Optional, Set
 
-from aclpub2.templates import load_template, homoglyph, TEMPLATE_DIR
-from aclpub2.config import load_configs, load_configs_handbook
+from aclpub2.templates import (
+    load_template,
+    get_conference_dates,
+    TEMPLATE_DIR,
+    collect_author_index,
+)
+from aclpub2.collation import initial, sort_key
+from aclpub2.config import dump_yaml, load_configs, load_configs_handbook
+from aclpub2.cache import BuildCache, hash_strings
+from aclpub2.watermark import create_native_watermarked_pdf, latex_to_text
+from aclpub2.pax import extract_annotations, hash_included_pdf
+from aclpub2.pages import count_pages, read_page_count
+from aclpub2.merge import merge_pdfs, read_page_labels, split_pdf
+from aclpub2 import profiling
+from aclpub2.materialize import (
+    materialize_file,
+    materialize_text,
+    materialize_tree,
+    prune,
+)
+from aclpub2.scheduler import DependencyFailed, Result, Scheduler
+from aclpub2.latex import (
+    BEGIN_DOCUMENT,
+    CompilationError,
+    compile_latex,
+    log_excerpt,
+    preamble_format,
+)
 
-import multiprocessing
-import subprocess
+import re
 import roman
 import shutil
 import os
 import glob
+import json
 import traceback
 import yaml
 
-PARENT_DIR = Path(__file__).parent
 
+def generate_proceedings(
+    path: str,
+    overwrite: bool,
+    outdir: str,
+    nopax: bool,
+    frontmatter: bool,
+    cache_dir: Optional[str] = None,
+    watermark: str = "latex",
+    assemble: str = "latex",
+    unattended: bool = False,
+    jobs: Optional[int] = None,
+    build_dir: str = "build",
+    watermark_batch: int = 1,
+    chunks: int = 1,
+):
+    build_dir = prepare_build_dir(Path(build_dir), overwrite)
+    cache = BuildCache(Path(cache_dir)) if cache_dir is not None else None
+    volume = load_volume(Path(path), build_dir, Path(outdir), unattended, cache)
+    page_index = Path(cache.root, "page_counts.json") if cache is not None else None
+    with profiling.stage("process_papers"):
+        volume.process_papers(page_index=page_index)
+    results, failures = build_volumes(
+        [volume],
+        build_dir,
+        cache,
+        nopax,
+        frontmatter,
+        watermark,
+        jobs,
+        watermark_batch,
+        assemble=assemble,
+    )
+    finish_volumes(
+        [volume],
+        results,
+        failures,
+        cache,
+        nopax,
+        frontmatter,
+        watermark,
+        assemble,
+        unattended,
+        chunks=chunks,
+        jobs=jobs,
+    )
 
-def generate_proceedings(path: str, overwrite: bool, outdir: str, nopax: bool, frontmatter: bool):
-    root = Path(path)
-    build_dir = Path("build")
-    build_dir.mkdir(exist_ok=True)
 
+def generate_volumes(
+    manifest: str,
+    overwrite: bool,
+    outdir: str,
+    nopax: bool,
+    frontmatter: bool,
+    cache_dir: Optional[str] = None,
+    watermark: str = "latex",
+    assemble: str = "latex",
+    unattended: bool = False,
+    jobs: Optional[int] = None,
+    build_dir: str = "build",
+    watermark_batch: int = 1,
+    chunks: int = 1,
+):
+    """
+    Builds every volume listed in a manifest, e.g. a main volume, findings
+    and workshops, in one process. The volumes share the task schedulers, and
+    so one bound on the number of concurrent jobs, and the build cache. Paper
+    PDFs are counted and passed through PAX once, however many volumes include
+    them.
+    """
+    build_root = prepare_build_dir(Path(build_dir), overwrite)
+    cache = BuildCache(Path(cache_dir)) if cache_dir is not None else None
+    volumes = [
+        load_volume(
+            root, Path(build_root, name), Path(outdir, name), unattended, cache, name
+        )
+        for name, root in load_manifest(Path(manifest))
+    ]
+    # Task names are prefixed with the volume name when there are several
+    # volumes.
+    if len(volumes) > 1:
+        for volume in volumes:
+            volume.prefix = f"{volume.name}: "
+    page_index = Path(cache.root, "page_counts.json") if cache is not None else None
+    with profiling.stage("process_papers"):
+        num_pages = count_pages(
+            [pdf for volume in volumes for pdf in volume.paper_files()], page_index
+        )
+        for volume in volumes:
+            volume.process_papers(num_pages=num_pages)
+    results, failures = build_volumes(
+        volumes,
+        build_root,
+        cache,
+        nopax,
+        frontmatter,
+        watermark,
+        jobs,
+        watermark_batch,
+        assemble=assemble,
+    )
+    finish_volumes(
+        volumes,
+        results,
+        failures,
+        cache,
+        nopax,
+        frontmatter,
+        watermark,
+        assemble,
+        unattended,
+        chunks=chunks,
+        jobs=jobs,
+    )
+
+
+def load_manifest(manifest_path: Path):
+    """
+    Returns (name, input directory) for every volume of a manifest. The
+    manifest is a YAML list of input directories relative to the manifest,
+    each given as a path or as a mapping with a path and an optional name,
+    which defaults to the name of the directory and names the build and
+    output directories of the volume.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entries = yaml.safe_load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{manifest_path} must be a list of volume directories")
+    volumes = {}
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        if "path" not in entry:
+            raise ValueError(f"missing 'path' in volume: {entry}")
+        root = Path(manifest_path.parent, entry["path"])
+        name = str(entry.get("name", root.resolve().name))
+        if name in volumes:
+            raise ValueError(f"duplicate volume name in {manifest_path}: {name}")
+        volumes[name] = root
+    return list(volumes.items())
+
+
+def prepare_build_dir(build_dir: Path, overwrite: bool) -> Path:
+    build_dir.mkdir(parents=True, exist_ok=True)
     # Throw if the build directory isn't empty, and the user did not specify an overwrite.
     if len([_ for _ in build_dir.iterdir()]) > 0 and not overwrite:
         raise Exception(
@@ -29,164 +191,552 @@ def generate_proceedings(path: str, overwrite: bool, outdir: str, nopax: bool, f
         )
     if overwrite:
         shutil.rmtree(str(build_dir), ignore_errors=True)
-        build_dir.mkdir()
+        build_dir.mkdir(parents=True)
+    return build_dir
 
-    # Load and preprocess the .yml configuration.
-    (
-        conference,
-        papers,
-        sponsors,
-        prefaces,
-        organizing_committee,
-        program_committee,
-        invited_talks,
-        panels,
-        additional_pages,
-        program,
-    ) = load_configs(root)
 
-    sessions_by_date = None
-    if program is not None:
+class Volume:
+    """
+    The configuration of one proceedings volume, built in build_dir and
+    written to output_dir.
+    """
+
+    def __init__(self, name: str, root: Path, build_dir: Path, output_dir: Path, configs):
+        self.name = name
+        # Starts the names of the scheduler tasks of the volume.
+        self.prefix = ""
+        self.root = root
+        self.build_dir = build_dir
+        self.output_dir = output_dir
+        (
+            self.conference,
+            self.papers,
+            self.sponsors,
+            self.prefaces,
+            self.organizing_committee,
+            self.program_committee,
+            self.invited_talks,
+            self.panels,
+            self.additional_pages,
+            self.program,
+        ) = configs
+        self.sessions_by_date = None
+        self.id_to_paper = None
+        self.alphabetized_author_index = None
+        self.archival_papers = None
+        # The scheduler task that watermarks each archival paper.
+        self.watermark_tasks = {}
+
+    def paper_files(self):
+        return [
+            Path(self.root, "papers", paper["file"])
+            for paper in self.papers or []
+            if paper.get("archival", True) and "file" in paper
+        ]
+
+    def process_papers(self, page_index: Optional[Path] = None, num_pages=None):
+        (
+            self.id_to_paper,
+            self.alphabetized_author_index,
+            self.archival_papers,
+        ) = process_papers(self.papers, self.root, page_index, num_pages)
+
+    def render(self, include_papers: bool, nopax: bool, paper_pdfs=None) -> str:
+        template = load_template("proceedings")
+        return template.render(
+            root=str(self.root),
+            conference=self.conference,
+            conference_dates=get_conference_dates(self.conference),
+            sponsors=self.sponsors,
+            prefaces=self.prefaces,
+            organizing_committee=self.organizing_committee,
+            program_committee=self.program_committee,
+            invited_talks=self.invited_talks,
+            panels=self.panels,
+            additional_pages=self.additional_pages,
+            archival_papers=self.archival_papers,
+            id_to_paper=self.id_to_paper,
+            program=self.sessions_by_date,
+            alphabetized_author_index=self.alphabetized_author_index,
+            include_papers=include_papers,
+            paper_pdfs=paper_pdfs,
+            nopax=nopax,
+        )
+
+
+def load_volume(
+    root: Path,
+    build_dir: Path,
+    output_dir: Path,
+    unattended: bool = False,
+    cache: Optional[BuildCache] = None,
+    name: Optional[str] = None,
+):
+    # Load and preprocess the .yml configuration.
+    with profiling.stage("load_configs", volume=str(root)):
+        configs = load_configs(root, unattended, cache)
+        volume = Volume(
+            name or root.resolve().name, root, build_dir, output_dir, configs
+        )
+    build_dir.mkdir(parents=True, exist_ok=True)
+    if volume.program is not None:
         try:
-            sessions_by_date = process_program(program)
+            with profiling.stage("process_program"):
+                volume.sessions_by_date = process_program(volume.program)
         except:
             print("Sorry. Your program.yml file seems malformed. It will be skipped.")
             traceback.print_exc()
-            sessions_by_date = None
+            volume.sessions_by_date = None
+    return volume
 
-    id_to_paper, alphabetized_author_index, archival_papers = process_papers(papers, root)
 
-    template = load_template("proceedings")
-    rendered_template = template.render(
-        root=str(root),
-        conference=conference,
-        conference_dates=get_conference_dates(conference),
-        sponsors=sponsors,
-        prefaces=prefaces,
-        organizing_committee=organizing_committee,
-        program_committee=program_committee,
-        invited_talks=invited_talks,
-        panels=panels,
-        additional_pages=additional_pages,
-        archival_papers=archival_papers,
-        id_to_paper=id_to_paper,
-        program=sessions_by_date,
-        alphabetized_author_index=alphabetized_author_index,
-        include_papers=False,
-        nopax=nopax,
+def build_volumes(
+    volumes,
+    build_root: Path,
+    cache: Optional[BuildCache],
+    nopax: bool,
+    frontmatter: bool,
+    watermark: str,
+    jobs: Optional[int],
+    watermark_batch: int = 1,
+    assemble: str = "latex",
+):
+    """
+    Runs the front matter, input copies, annotation extraction and watermarks
+    of all volumes on one scheduler, since they only depend on the page
+    numbers. Task names start with the prefix of their volume.
+    """
+    scheduler = Scheduler(jobs)
+    paper_pdfs = {}
+    for volume in volumes:
+        prefix = volume.prefix
+        # The output directory is updated in place, and pruned of stale files
+        # once everything is written.
+        Path(volume.output_dir, "inputs").mkdir(parents=True, exist_ok=True)
+        scheduler.add(
+            f"{prefix}front matter",
+            compile_front_matter,
+            volume.build_dir,
+            volume.render(include_papers=False, nopax=nopax),
+        )
+        scheduler.add(
+            f"{prefix}copy inputs",
+            copy_inputs,
+            volume.root,
+            Path(volume.output_dir, "inputs"),
+            volume.papers if not frontmatter else None,
+        )
+        if volume.papers is not None and not frontmatter:
+            paper_pdfs[volume.name] = {
+                paper["id"]: Path(volume.root, "papers", paper["file"])
+                for paper in volume.archival_papers
+            }
+    # Papers are included from the PDF that sits next to their extracted
+    # annotations, which is the input PDF unless PAX has to be run. PAX runs
+    # once for all volumes, and once per distinct PDF. Native watermarks keep
+    # the links of the papers, so with them, only the latex assembly includes
+    # papers through pdfpages and needs PAX.
+    if paper_pdfs and (watermark == "latex" or (assemble == "latex" and not nopax)):
+        scheduler.add(
+            "pax",
+            extract_annotations,
+            sorted({path for pdfs in paper_pdfs.values() for path in pdfs.values()}),
+            cache or BuildCache(Path(build_root, "cache")),
+        )
+        paper_pdfs = {
+            name: {id: Result("pax", path) for id, path in pdfs.items()}
+            for name, pdfs in paper_pdfs.items()
+        }
+    for volume in volumes:
+        if volume.name in paper_pdfs:
+            volume.watermark_tasks = schedule_watermarks(
+                scheduler,
+                volume.archival_papers,
+                volume.conference,
+                volume.root,
+                cache,
+                watermark,
+                paper_pdfs[volume.name],
+                volume.build_dir,
+                prefix=volume.prefix,
+                batch=watermark_batch,
+            )
+    with profiling.stage("tasks"):
+        return scheduler.run()
+
+
+def finish_volumes(
+    volumes,
+    results,
+    failures,
+    cache: Optional[BuildCache],
+    nopax: bool,
+    frontmatter: bool,
+    watermark: str,
+    assemble: str,
+    unattended: bool = False,
+    chunks: int = 1,
+    jobs: Optional[int] = None,
+):
+    """
+    Retries the papers that failed to watermark, assembles the proceedings and
+    writes the outputs of every volume, given the results and failures of
+    build_volumes. The retries run one volume after the other, and then the
+    assembly of all volumes runs on one scheduler, so that no more than jobs
+    tasks run at any time. The error of a single volume is raised, while with
+    several volumes, those that failed are reported once the others are done.
+    """
+    if assemble not in ASSEMBLY_METHODS:
+        raise ValueError(f"unknown assembly method: {assemble}")
+    scheduler = Scheduler(jobs)
+    task_volumes = {}
+    failed = set()
+    for volume in volumes:
+        try:
+            tasks = schedule_assembly(
+                scheduler,
+                volume,
+                results,
+                failures,
+                cache,
+                nopax,
+                frontmatter,
+                watermark,
+                assemble,
+                unattended,
+                chunks,
+                jobs,
+            )
+        except Exception:
+            if len(volumes) == 1:
+                raise
+            print(f"Volume {volume.name} failed:")
+            traceback.print_exc()
+            failed.add(volume.name)
+            continue
+        task_volumes.update((task, volume.name) for task in tasks)
+    _, errors = scheduler.run()
+    if len(volumes) == 1:
+        raise_failures(errors)
+    failed |= {task_volumes[task] for task in errors}
+    if failed:
+        names = [volume.name for volume in volumes if volume.name in failed]
+        raise Exception(f"Failed to build the volumes {', '.join(names)}.")
+
+
+def schedule_assembly(
+    scheduler: Scheduler,
+    volume: Volume,
+    results,
+    failures,
+    cache: Optional[BuildCache],
+    nopax: bool,
+    frontmatter: bool,
+    watermark: str,
+    assemble: str,
+    unattended: bool = False,
+    chunks: int = 1,
+    jobs: Optional[int] = None,
+) -> List[str]:
+    """
+    Retries the papers of a volume that failed to watermark, and adds the
+    tasks that assemble its proceedings and write its outputs to the
+    scheduler. Returns the names of these tasks. With the latex assembly and
+    more than one chunk, the watermarked papers are joined in that many
+    parts, see schedule_chunks.
+    """
+    build_dir, output_dir, prefix = volume.build_dir, volume.output_dir, volume.prefix
+    raise_failures(
+        {
+            name: error
+            for name, error in failures.items()
+            if name in (f"{prefix}front matter", f"{prefix}copy inputs")
+            or (name == "pax" and volume.papers is not None and not frontmatter)
+        }
     )
-    tex_file = Path(build_dir, "front_matter.tex")
-    with open(tex_file, "w+") as f:
-        f.write(rendered_template)
-    subprocess.run(
-        [
-            "pdflatex",
-            f"-output-directory={build_dir}",
-            "-save-size=40000",
-            str(tex_file),
-        ]
+    inputs = results[f"{prefix}copy inputs"]
+    if volume.papers is None or frontmatter:
+        # If there are no papers, treat the front_matter as the proceedings.
+        output_name = "proceedings.pdf" if volume.papers is None else "front_matter.pdf"
+        outputs = inputs | {
+            materialize_file(
+                Path(build_dir, "front_matter.pdf"), Path(output_dir, output_name)
+            )
+        }
+        prune(output_dir, outputs)
+        return []
+
+    paper_pdfs = {
+        paper["id"]: Path(volume.root, "papers", paper["file"])
+        for paper in volume.archival_papers
+    }
+    if "pax" in results:
+        paper_pdfs = {id: results["pax"][path] for id, path in paper_pdfs.items()}
+    finish_watermarks(
+        volume.archival_papers,
+        watermark_failures(volume.watermark_tasks, results, failures),
+        volume.conference,
+        volume.root,
+        cache,
+        watermark,
+        paper_pdfs,
+        unattended=unattended,
+        jobs=jobs,
+        build_dir=build_dir,
     )
 
-    # Regenerate the output directory.
-    output_dir = Path(outdir)
-    shutil.rmtree(str(output_dir), ignore_errors=True)
-    output_dir.mkdir()
+    parts = {}
+    if assemble == "latex" and chunks > 1:
+        parts = schedule_chunks(
+            scheduler, volume.archival_papers, build_dir, chunks, prefix
+        )
+    elif assemble == "latex":
+        with open(Path(build_dir, "proceedings.tex"), "w+") as f:
+            f.write(volume.render(include_papers=True, nopax=nopax, paper_pdfs=paper_pdfs))
+    assemble_task = scheduler.add(
+        f"{prefix}assemble",
+        assemble_volume,
+        volume,
+        assemble,
+        list(parts.values()) if parts else None,
+        after=list(parts),
+    )
+    copy_task = scheduler.add(
+        f"{prefix}copy outputs",
+        copy_outputs,
+        volume,
+        inputs,
+        after=[assemble_task],
+    )
+    return list(parts) + [assemble_task, copy_task]
 
-    # Copy the inputs yaml.
-    input_copy_dir = Path(output_dir, "inputs")
-    input_copy_dir.mkdir()
-    files = glob.iglob(os.path.join(root, "*.y*ml"))
-    for file in files:
-        if os.path.isfile(file):
-            shutil.copy2(file, input_copy_dir)
 
-    # If there are no papers, treat the front_matter as the proceedings and exit.
-    if papers is None:
-        shutil.copy2(
-            Path(build_dir, "front_matter.pdf"), Path(output_dir, "proceedings.pdf")
+def assemble_volume(volume: Volume, assemble: str, paper_parts: Optional[List[Path]] = None):
+    with profiling.stage("assemble", method=assemble, volume=volume.name):
+        if assemble == "merge" or paper_parts is not None:
+            assemble_proceedings(
+                volume.archival_papers,
+                volume.alphabetized_author_index,
+                volume.build_dir,
+                paper_parts,
+            )
+        else:
+            # Internal links need at least a second pass.
+            compile_latex(
+                Path(volume.build_dir, "proceedings.tex"),
+                volume.build_dir,
+                ["-save-size=40000"],
+            )
+
+
+def copy_outputs(volume: Volume, inputs: Set[Path]):
+    """
+    Writes the proceedings, watermarked papers and attachments of a volume
+    next to the copies of its inputs, and prunes everything else from its
+    output directory.
+    """
+    build_dir, output_dir = volume.build_dir, volume.output_dir
+    with profiling.stage("copy outputs", volume=volume.name):
+        outputs = set(inputs)
+        # Copy proceedings
+        outputs.add(
+            materialize_file(
+                Path(build_dir, "proceedings.pdf"), Path(output_dir, "proceedings.pdf")
+            )
+        )
+        # Copy watermarked PDFs.
+        output_watermarked = Path(output_dir, "watermarked_pdfs")
+        for file in Path(build_dir, "watermarked_pdfs").glob("*.pdf"):
+            outputs.add(materialize_file(file, Path(output_watermarked, file.name)))
+        # Copy the front matter as 0.pdf.
+        outputs.add(
+            materialize_file(
+                Path(build_dir, "front_matter.pdf"), Path(output_watermarked, "0.pdf")
+            )
+        )
+        outputs |= copy_folder(
+            Path(volume.root, "attachments"), Path(output_dir, "attachments")
         )
-        return
+        prune(output_dir, outputs)
+
+
+def compile_front_matter(build_dir: Path, rendered_template: str):
+    with profiling.stage("front matter"):
+        tex_file = Path(build_dir, "front_matter.tex")
+        with open(tex_file, "w+") as f:
+            f.write(rendered_template)
+        compile_latex(tex_file, build_dir, ["-save-size=40000"])
 
-    # If frontmatter is set, output the front matter and exit.
-    if frontmatter:
-        shutil.copy2(
-            Path(build_dir, "front_matter.pdf"), Path(output_dir, "front_matter.pdf")
+
+def copy_inputs(root: Path, input_copy_dir: Path, papers) -> Set[Path]:
+    """
+    Copies the input .yml files and, if papers are given, the input folders,
+    replacing papers.yml with the papers and their page ranges. Returns the
+    paths of the copies.
+    """
+    with profiling.stage("copy inputs"):
+        outputs = set()
+        files = glob.iglob(os.path.join(root, "*.y*ml"))
+        for file in files:
+            if os.path.isfile(file) and not (papers and Path(file).name == "papers.yml"):
+                outputs.add(
+                    materialize_file(Path(file), Path(input_copy_dir, Path(file).name))
+                )
+        if papers is None:
+            return outputs
+        # Overwrite the papers.yml with information that contains page ranges
+        outputs.add(materialize_text(dump_yaml(papers), Path(input_copy_dir, "papers.yml")))
+        # Copy other input folders.
+        for folder_to_copy in [
+            "papers",
+            "invited_talks",
+            "panels",
+            "additional_pages",
+            "prefaces",
+            "sponsor_logos",
+        ]:
+            outputs |= copy_folder(
+                Path(root, folder_to_copy), Path(input_copy_dir, folder_to_copy)
+            )
+        return outputs
+
+
+def chunk_papers(archival_papers, chunks: int):
+    """
+    Splits the papers into up to chunks runs of consecutive papers with about
+    the same number of pages.
+    """
+    if not archival_papers:
+        return []
+    first_page = archival_papers[0]["start_page"]
+    total_pages = archival_papers[-1]["end_page"] - first_page + 1
+    groups = defaultdict(list)
+    for paper in archival_papers:
+        groups[(paper["start_page"] - first_page) * chunks // total_pages].append(paper)
+    return [groups[i] for i in sorted(groups)]
+
+
+def schedule_chunks(
+    scheduler: Scheduler,
+    archival_papers,
+    build_dir: Path,
+    chunks: int,
+    prefix: str = "",
+) -> Dict[str, Path]:
+    """
+    Adds a task per chunk of consecutive papers that joins the watermarked
+    PDFs of that chunk into one part, and returns their PDFs in order by task
+    name. The papers were already watermarked, so the parts are merged
+    rather than compiled, which keeps their links without running pax again.
+    """
+    chunk_dir = Path(build_dir, "chunks")
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    paper_pdfs = dict(
+        zip(
+            [paper["id"] for paper in archival_papers],
+            watermarked_paper_pdfs(archival_papers, build_dir),
+        )
+    )
+    parts = {}
+    for i, papers in enumerate(chunk_papers(archival_papers, chunks)):
+        part = Path(chunk_dir, f"proceedings_{i}.pdf")
+        task = scheduler.add(
+            f"{prefix}chunk {i}",
+            merge_pdfs,
+            [paper_pdfs[paper["id"]] for paper in papers],
+            part,
+        )
+        parts[task] = part
+    return parts
+
+
+def compile_part(tex_file: Path):
+    """
+    Compiles one of several documents that are merged afterwards, next to it.
+    """
+    run = compile_latex(tex_file, tex_file.parent, ["-save-size=40000"], quiet=True)
+    if run.returncode != 0:
+        raise CompilationError(f"Cannot compile {tex_file}.", log_excerpt(run.log))
+
+
+def raise_failures(failures):
+    for error in failures.values():
+        if not isinstance(error, DependencyFailed):
+            raise error
+
+
+# "latex" includes every watermarked paper again in proceedings.tex; "merge"
+# concatenates the already built PDFs, see assemble_proceedings.
+ASSEMBLY_METHODS = ["latex", "merge"]
+
+
+def watermarked_paper_pdfs(archival_papers, build_dir: Path) -> List[Path]:
+    """
+    Returns the watermarked PDF of every paper, in order, and raises if some
+    paper was not watermarked.
+    """
+    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
+    pdfs = [Path(watermarked_pdfs, f"{paper['id']}.pdf") for paper in archival_papers]
+    missing = [
+        str(paper["id"]) for paper, pdf in zip(archival_papers, pdfs) if not pdf.exists()
+    ]
+    if missing:
+        raise Exception(
+            f"Cannot assemble the proceedings, papers {', '.join(missing)} were not watermarked."
         )
-        return
+    return pdfs
+
 
-    generate_watermarked_pdfs(id_to_paper.values(), conference, root)
+def assemble_proceedings(
+    archival_papers,
+    alphabetized_author_index,
+    build_dir: Path = Path("build"),
+    paper_parts: Optional[List[Path]] = None,
+):
+    """
+    Builds proceedings.pdf by concatenating the front matter, the watermarked
+    papers and a separately compiled author index. The page.N destinations
+    that the table of contents and the program link to are defined on the
+    merged pages, and every paper gets a bookmark as with addtotoc.
+    paper_parts replaces the watermarked papers by PDFs holding all of their
+    pages in order, see schedule_chunks.
+    """
+    if paper_parts is None:
+        paper_parts = watermarked_paper_pdfs(archival_papers, build_dir)
+    last_page = archival_papers[-1]["end_page"] if archival_papers else 0
+
+    template = load_template("author_index")
     rendered_template = template.render(
-        root=str(root),
-        conference=conference,
-        conference_dates=get_conference_dates(conference),
-        sponsors=sponsors,
-        prefaces=prefaces,
-        organizing_committee=organizing_committee,
-        program_committee=program_committee,
-        invited_talks=invited_talks,
-        panels=panels,
-        additional_pages=additional_pages,
-        archival_papers=archival_papers,
-        id_to_paper=id_to_paper,
-        program=sessions_by_date,
+        start_page=last_page + 1,
         alphabetized_author_index=alphabetized_author_index,
-        include_papers=True,
-        nopax=nopax,
     )
-    tex_file = Path(build_dir, "proceedings.tex")
+    tex_file = Path(build_dir, "author_index.tex")
     with open(tex_file, "w+") as f:
         f.write(rendered_template)
-    subprocess.run(
-        [
-            "pdflatex",
-            f"-output-directory={build_dir}",
-            "-save-size=40000",
-            str(tex_file),
-        ]
-    )
-    # Must run the latex compilation twice to include internal links.
-    subprocess.run(
-        [
-            "pdflatex",
-            f"-output-directory={build_dir}",
-            "-save-size=40000",
-            str(tex_file),
-        ]
-    )
+    compile_latex(tex_file, build_dir)
 
-    # Copy proceedings
-    shutil.copy2(
-        Path(build_dir, "proceedings.pdf"), Path(output_dir, "proceedings.pdf")
+    front_matter = Path(build_dir, "front_matter.pdf")
+    offset = read_page_count(front_matter) - 1
+    bookmarks = []
+    named_pages = {}
+    for paper in archival_papers:
+        bookmarks.append((latex_to_text(paper["title"]), offset + paper["start_page"]))
+        for page in range(paper["start_page"], paper["end_page"] + 1):
+            named_pages[f"page.{page}"] = offset + page
+    bookmarks.append(("Author Index", offset + last_page + 1))
+    merge_pdfs(
+        [front_matter] + paper_parts + [tex_file.with_suffix(".pdf")],
+        Path(build_dir, "proceedings.pdf"),
+        bookmarks=bookmarks,
+        named_pages=named_pages,
+        labels=[(0, "/r"), (offset + 1, "/D")],
     )
-    # Copy watermarked PDFs.
-    output_watermarked = Path(output_dir, "watermarked_pdfs")
-    output_watermarked.mkdir()
-    for file in Path(build_dir, "watermarked_pdfs").glob("*.pdf"):
-        shutil.copy2(file, output_watermarked)
-    # Copy the front matter as 0.pdf.
-    shutil.copy2(Path(build_dir, "front_matter.pdf"), Path(output_watermarked, "0.pdf"))
-    # Overwrite the papers.yml with information that contains page ranges
-    with open(Path(input_copy_dir, "papers.yml"), "w") as new_papers_yml:
-        yaml.dump(papers, new_papers_yml)
-    # Copy other input folders.
-    for folder_to_copy in [
-        "papers",
-        "invited_talks",
-        "panels",
-        "additional_pages",
-        "prefaces",
-        "sponsor_logos",
-    ]:
-        copy_folder(
-            Path(root, folder_to_copy), Path(input_copy_dir, folder_to_copy)
-        )
-
-    copy_folder(Path(root, "attachments"), Path(output_dir, "attachments"))
 
 
-def copy_folder(input_path: Path, output_dir: Path):
+def copy_folder(input_path: Path, output_dir: Path) -> Set[Path]:
     if os.path.isdir(input_path):
-        shutil.copytree(input_path, output_dir)
+        return materialize_tree(input_path, output_dir)
+    return set()
 
 
 def find_page_offset(proceedings_pdf):
@@ -216,8 +766,15 @@ def find_page_offset(proceedings_pdf):
     return offset
 
 
-def generate_handbook(path: str, overwrite: bool):
+def generate_handbook(
+    path: str,
+    overwrite: bool,
+    cache_dir: Optional[str] = None,
+    sections: bool = False,
+    jobs: Optional[int] = None,
+):
     root = Path(path)
+    cache = BuildCache(Path(cache_dir)) if cache_dir is not None else None
     build_dir = Path("build")
     build_dir.mkdir(exist_ok=True)
 
@@ -244,7 +801,7 @@ def generate_handbook(path: str, overwrite: bool):
         workshops,
         workshop_programs,
         workshop_papers,
-    ) = load_configs_handbook(root)
+    ) = load_configs_handbook(root, cache)
     program_workshops = {}
     for id, workshop_program in workshop_programs.items():
         if workshop_program is not None:
@@ -262,56 +819,196 @@ def generate_handbook(path: str, overwrite: bool):
     template = load_template("handbook")
     program = process_program_handbook(program)
     tutorial_program = process_program(tutorial_program, max_lines=350)
-    rendered_template = template.render(
-        root=str(root),
-        conference=conference,
-        conference_dates=get_conference_dates(conference),
-        sponsors=sponsors,
-        prefaces=prefaces,
-        organizing_committee=organizing_committee,
-        program_committee=program_committee,
-        tutorial_program=tutorial_program,
-        tutorials=tutorials,
-        invited_talks=invited_talks,
-        panels=panels,
-        additional_pages=additional_pages,
-        papers=papers,
-        id_to_paper=id_to_paper,
-        program=program,
-        program_overview=program_overview,
-        workshops=workshops,
-        program_workshops=program_workshops,
-        workshop_days=workshop_days,
-        workshop_papers=workshop_papers,
-        build_dir=str(build_dir),
-    )
+    # The author index is written by the template itself, see
+    # collect_author_index, so makeindex does not have to run between passes.
+    with collect_author_index():
+        rendered_template = template.render(
+            root=str(root),
+            conference=conference,
+            conference_dates=get_conference_dates(conference),
+            sponsors=sponsors,
+            prefaces=prefaces,
+            organizing_committee=organizing_committee,
+            program_committee=program_committee,
+            tutorial_program=tutorial_program,
+            tutorials=tutorials,
+            invited_talks=invited_talks,
+            panels=panels,
+            additional_pages=additional_pages,
+            papers=papers,
+            id_to_paper=id_to_paper,
+            program=program,
+            program_overview=program_overview,
+            workshops=workshops,
+            program_workshops=program_workshops,
+            workshop_days=workshop_days,
+            workshop_papers=workshop_papers,
+            build_dir=str(build_dir),
+        )
     tex_file = Path(build_dir, "handbook.tex")
     with open(tex_file, "w+") as f:
         f.write(rendered_template)
     if not Path(build_dir, "content").exists():
         shutil.copytree(f"{TEMPLATE_DIR}/content", f"{build_dir}/content")
-    subprocess.run(["pdflatex", f"-output-directory={build_dir}", str(tex_file)])
-    subprocess.run(["makeindex", str(tex_file.with_suffix(".idx"))])
-    subprocess.run(["pdflatex", f"-output-directory={build_dir}", str(tex_file)])
+    if sections:
+        compile_handbook_sections(rendered_template, build_dir, jobs)
+    else:
+        compile_latex(tex_file, build_dir)
 
 
-def get_conference_dates(conference) -> str:
-    start_date = conference["start_date"]
-    end_date = conference["end_date"]
-    start_month = start_date.strftime("%B")
-    end_month = end_date.strftime("%B")
-    if start_month == end_month:
-        if start_date.day == end_date.day:
-            return f"{start_month} {start_date.day}"
-        return f"{start_month} {start_date.day}-{end_date.day}"
-    return f"{start_month} {start_date.day} - {end_month} {end_date.day}"
+# The handbook template marks where it can be split with this line, see
+# compile_handbook_sections.
+HANDBOOK_SECTION = "% handbook section\n"
+HANDBOOK_ROUNDS = 5
+# What a section hands to the others through its .aux file.
+AUX_CONTENTS = re.compile(r"^\\@writefile\{toc\}\{(.*)\}\s*$", re.MULTILINE)
+AUX_LABEL = re.compile(r"^\\newlabel\{.*$", re.MULTILINE)
+AUX_INDEX_PAGE = re.compile(r"^\\aclindexpage\{.*$", re.MULTILINE)
+AUX_NEXT_PAGE = re.compile(r"^\\handbooknextpage\{(\d+)\}", re.MULTILINE)
+# Hyperref numbers some anchors, e.g. those of unnumbered chapters, through
+# the whole document, so every section starts them this far apart.
+ANCHORS_PER_SECTION = 100000
 
 
-def process_papers(papers, root: Path):
+def compile_handbook_sections(
+    rendered_template: str, build_dir: Path, jobs: Optional[int] = None
+):
+    """
+    Compiles the sections of the handbook side by side, and merges them into
+    handbook.pdf. Each section starts on the page after the previous one, and
+    gets the table of contents, labels and index pages of the others from
+    their .aux files. Since these change with the page numbers, sections are
+    compiled again until their inputs no longer change.
+    """
+    preamble, body = rendered_template.split(BEGIN_DOCUMENT, 1)
+    body = body.rsplit(r"\end{document}", 1)[0]
+    parts = body.split(HANDBOOK_SECTION)
+    chapters = [0]
+    sections = [0]
+    for part in parts[:-1]:
+        chapters.append(chapters[-1] + len(re.findall(r"\\chapter\{", part)))
+        # Sections are numbered within their chapter, and so are their anchors.
+        since_chapter = re.split(r"\\chapter\{", part)
+        sections.append(
+            len(re.findall(r"\\section\{", since_chapter[-1]))
+            + (sections[-1] if len(since_chapter) == 1 else 0)
+        )
+    section_dir = Path(build_dir, "handbook_sections")
+    section_dir.mkdir(parents=True, exist_ok=True)
+    contents_file = Path(section_dir, "contents.toc")
+    tex_files = [Path(section_dir, f"section_{i}.tex") for i in range(len(parts))]
+
+    auxes = [""] * len(parts)
+    # The first page of the last compilation of each section and of the one
+    # after it.
+    first_pages = [1] * len(parts)
+    next_pages = [1] * len(parts)
+    compiled = [None] * len(parts)
+    for _ in range(HANDBOOK_ROUNDS):
+        contents = "".join(
+            match + "\n" for aux in auxes for match in AUX_CONTENTS.findall(aux)
+        )
+        contents_file.write_text(contents)
+        page = None
+        scheduler = Scheduler(jobs)
+        for i, part in enumerate(parts):
+            # Sections keep the length they had in their last compilation.
+            first_page = page
+            if page is not None:
+                page += next_pages[i] - first_pages[i]
+            else:
+                page = next_pages[i]
+            references = handbook_references(auxes, i, part, contents_file)
+            text = handbook_section(
+                preamble, part, i, first_page, chapters[i], sections[i], tex_files[i]
+            )
+            inputs = (text, references, contents if r"\tableofcontents" in part else None)
+            if inputs == compiled[i]:
+                continue
+            compiled[i] = inputs
+            if first_page is not None:
+                first_pages[i] = first_page
+            tex_files[i].with_suffix(".refs").write_text(references)
+            tex_files[i].write_text(text)
+            scheduler.add(tex_files[i].stem, compile_part, tex_files[i])
+        if not scheduler.tasks:
+            break
+        with profiling.stage("handbook sections", sections=len(scheduler.tasks)):
+            _, failures = scheduler.run()
+        raise_failures(failures)
+        for i, tex_file in enumerate(tex_files):
+            auxes[i] = tex_file.with_suffix(".aux").read_text(encoding="latin-1")
+            next_page = AUX_NEXT_PAGE.search(auxes[i])
+            next_pages[i] = int(next_page.group(1)) if next_page else first_pages[i]
+    else:
+        print(f"The handbook sections still changed after {HANDBOOK_ROUNDS} rounds.")
+
+    pdfs = [tex_file.with_suffix(".pdf") for tex_file in tex_files]
+    merge_pdfs(pdfs, Path(build_dir, "handbook.pdf"), labels=read_page_labels(pdfs[0]))
+
+
+def handbook_section(
+    preamble: str,
+    part: str,
+    i: int,
+    first_page: Optional[int],
+    chapter: int,
+    section: int,
+    tex_file: Path,
+) -> str:
+    """
+    The document of the i-th section of the handbook. The first section sets
+    up its own page numbering.
+    """
+    setup = r"\handbookreferences{" + tex_file.with_suffix(".refs").as_posix() + "}\n"
+    if i > 0:
+        setup += (
+            f"\\handbooksection{{{first_page}}}{{{chapter}}}{{{section}}}"
+            f"{{{i * ANCHORS_PER_SECTION}}}\n"
+        )
+    return (
+        preamble
+        + BEGIN_DOCUMENT
+        + "\n"
+        + setup
+        + part
+        + "\n\\handbooksectionend\n\\end{document}\n"
+    )
+
+
+def handbook_references(auxes: List[str], i: int, part: str, contents_file: Path) -> str:
+    """
+    What the i-th section reads from the others: their labels if it refers
+    to any, the index pages if it prints the author index, and the merged
+    table of contents.
+    """
+    lines = [
+        r"\renewcommand{\@starttoc}[1]{\begingroup\makeatletter"
+        + r"\InputIfFileExists{"
+        + contents_file.with_suffix("").as_posix()
+        + r".#1}{}{}\endgroup}"
+    ]
+    for j, aux in enumerate(auxes):
+        if j == i:
+            continue
+        if "ref{" in part:
+            lines += AUX_LABEL.findall(aux)
+        if r"\begin{theindex}" in part:
+            lines += AUX_INDEX_PAGE.findall(aux)
+    return "\n".join(lines) + "\n"
+
+
+def process_papers(
+    papers,
+    root: Path,
+    page_index: Optional[Path] = None,
+    num_pages: Optional[Dict[Path, int]] = None,
+):
     """
     process_papers
-    - uses PAX to extract PDF annotations from the paper files in preparation for
-        re-insertion
+    - counts the pages of all archival papers in parallel, reusing the counts
+        stored in page_index for files that did not change, unless num_pages
+        already holds them
     - maps paper ID to the contents of the paper in order to assist with program
         generation
     - alphabetizes and splits author names, and associates them with the start pages
@@ -323,6 +1020,15 @@ def process_papers(papers, root: Path):
     id_to_paper = {}
     author_to_pages = defaultdict(list)
     archival_papers = []
+    if num_pages is None:
+        num_pages = count_pages(
+            [
+                Path(root, "papers", paper["file"])
+                for paper in papers
+                if paper.get("archival", True) and "file" in paper
+            ],
+            page_index,
+        )
     for paper in papers:
         # Always add the paper to the id-to-paper map.
         if "id" not in paper:
@@ -334,10 +1040,9 @@ def process_papers(papers, root: Path):
         if "file" not in paper:
             raise ValueError(f"missing 'file' in paper {paper['id']}")
         pdf_path = Path(root, "papers", paper["file"])
-        pdf = PdfFileReader(str(pdf_path))
-        paper["num_pages"] = pdf.getNumPages()
+        paper["num_pages"] = num_pages[pdf_path]
         paper["start_page"] = page
-        paper["end_page"] = page + pdf.getNumPages() - 1
+        paper["end_page"] = page + paper["num_pages"] - 1
         if "authors" not in paper:
             raise ValueError(f"missing 'authors' in paper {paper['id']}")
         for author in paper["authors"]:
@@ -350,110 +1055,433 @@ def process_papers(papers, root: Path):
                 raise ValueError(f"missing 'last_name' in author of paper {paper['id']}")
             index_name = f"{author['last_name']}, {given_names}"
             author_to_pages[index_name].append(page)
-        page += pdf.getNumPages()
+        page += paper["num_pages"]
         archival_papers.append(paper)
     alphabetized_author_index = defaultdict(list)
-    for author, pages in sorted(author_to_pages.items()):
-        alphabetized_author_index[homoglyph(author[0]).lower()].append((author, pages))
-    for author_pages in alphabetized_author_index.values():
-        author_pages.sort(key=lambda entry: entry[0].lower())
+    for author, pages in sorted(
+        author_to_pages.items(), key=lambda entry: (sort_key(entry[0]), entry[0])
+    ):
+        alphabetized_author_index[initial(author)].append((author, pages))
     return id_to_paper, sorted(alphabetized_author_index.items()), archival_papers
 
 
-def error_handler(e):
-    print(traceback.print_exception(type(e), e, e.__traceback__))
-    input(
-        "\nSorry. I have problems compiling the watermarked papers. Press Enter to process another paper or Ctrl+C to quit.\n"
-    )
+# "latex" compiles templates/watermarked_pdf.tex per paper; "native" stamps
+# the footer onto the existing PDF pages, see aclpub2/watermark.py.
+WATERMARK_BACKENDS = ["latex", "native"]
 
+# Papers that fail are retried after the main pass, with less parallelism.
+RETRY_PROCESSES = 2
 
-def generate_watermarked_pdfs(papers_with_pages, conference, root: Path):
-    build_dir = Path("build")
-    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
-    watermarked_pdfs.mkdir(exist_ok=True)
-    with multiprocessing.Pool(processes=multiprocessing.cpu_count()) as pool:
-        for paper in papers_with_pages:
-            if "archival" in paper and not paper["archival"]:
-                continue
-            pool.apply_async(
-                create_watermarked_pdf,
-                args=(paper, conference, root),
-                error_callback=error_handler,
+
+def watermark_job(watermark_function, paper, *args):
+    with profiling.stage("watermark paper", paper=paper["id"]):
+        return watermark_function(paper, *args)
+
+
+def schedule_watermarks(
+    scheduler: Scheduler,
+    papers,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache] = None,
+    watermark: str = "latex",
+    paper_pdfs: Optional[Dict[Any, Any]] = None,
+    build_dir: Path = Path("build"),
+    prefix: str = "",
+    batch: int = 1,
+) -> Dict[Any, str]:
+    """
+    Adds a task per archival paper to the scheduler, and returns the task
+    names by paper ID. paper_pdfs may map paper IDs to scheduler Results.
+    Task names start with prefix. With the latex backend, the .tex files of
+    all papers are rendered by one task in this process, so that workers only
+    run pdflatex, and with a batch size above one, each task compiles that
+    many consecutive papers at once, see create_watermarked_pdfs.
+    """
+    if watermark == "latex":
+        watermark_function = create_watermarked_pdf
+    elif watermark == "native":
+        watermark_function = create_native_watermarked_pdf
+    else:
+        raise ValueError(f"unknown watermark backend: {watermark}")
+    Path(build_dir, "watermarked_pdfs").mkdir(parents=True, exist_ok=True)
+    papers = [paper for paper in papers if paper.get("archival", True)]
+    paper_pdfs = {
+        paper["id"]: (paper_pdfs or {}).get(paper["id"]) for paper in papers
+    }
+    if watermark == "latex" and papers:
+        render_task = scheduler.add(
+            f"{prefix}render watermarks",
+            render_watermarked_tex,
+            papers,
+            conference,
+            root,
+            paper_pdfs,
+        )
+        # The papers share a preamble, whose format is dumped once up front
+        # rather than by every worker, see enable_formats.
+        format_task = scheduler.add(
+            f"{prefix}watermark format",
+            preamble_format,
+            Result(render_task, papers[0]["id"]),
+        )
+    tasks = {}
+    if watermark == "latex" and batch > 1:
+        for i in range(0, len(papers), batch):
+            batch_papers = papers[i : i + batch]
+            ids = [paper["id"] for paper in batch_papers]
+            task = scheduler.add(
+                f"{prefix}watermark {ids[0]}-{ids[-1]}",
+                create_watermarked_pdfs,
+                batch_papers,
+                conference,
+                root,
+                cache,
+                {id: paper_pdfs[id] for id in ids},
+                build_dir,
+                {id: Result(render_task, id) for id in ids},
+                after=[format_task],
+                in_process=True,
             )
-        pool.close()
-        pool.join()
+            tasks.update((id, task) for id in ids)
+        return tasks
+    for paper in papers:
+        args = [paper, conference, root, cache, paper_pdfs[paper["id"]], build_dir]
+        if watermark == "latex":
+            args.append(Result(render_task, paper["id"]))
+        tasks[paper["id"]] = scheduler.add(
+            f"{prefix}watermark {paper['id']}",
+            watermark_job,
+            watermark_function,
+            *args,
+            after=[format_task] if watermark == "latex" else [],
+            in_process=True,
+        )
+    return tasks
 
 
-def create_watermarked_pdf(paper, conference, root: Path):
-    build_dir = Path("build")
-    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
-    template = load_template("watermarked_pdf")
-    rendered_template = template.render(
-        root=root,
-        paper=paper,
-        conference=conference,
-        conference_dates=get_conference_dates(conference),
+def generate_watermarked_pdfs(
+    papers_with_pages,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache] = None,
+    watermark: str = "latex",
+    paper_pdfs: Optional[Dict[Any, Path]] = None,
+    unattended: bool = False,
+    retries: int = 1,
+    jobs: Optional[int] = None,
+    build_dir: Path = Path("build"),
+    batch: int = 1,
+):
+    """
+    Watermarks all archival papers, see finish_watermarks for the handling of
+    papers that fail.
+    """
+    scheduler = Scheduler(jobs)
+    tasks = schedule_watermarks(
+        scheduler,
+        papers_with_pages,
+        conference,
+        root,
+        cache,
+        watermark,
+        paper_pdfs,
+        build_dir,
+        batch=batch,
+    )
+    results, failures = scheduler.run()
+    return finish_watermarks(
+        papers_with_pages,
+        watermark_failures(tasks, results, failures),
+        conference,
+        root,
+        cache,
+        watermark,
+        paper_pdfs,
+        unattended=unattended,
+        retries=retries,
+        jobs=jobs,
+        build_dir=build_dir,
     )
+
+
+def watermark_failures(tasks, results, failures):
+    """
+    Returns the errors of the papers that could not be watermarked by paper ID,
+    given the watermark task of every paper and the outcome of the scheduler.
+    A batch task either fails as a whole, or returns the errors of its papers
+    that fail on their own.
+    """
+    errors = {}
+    for id, task in tasks.items():
+        if task in failures:
+            errors[id] = failures[task]
+        elif isinstance(results.get(task), dict) and id in results[task]:
+            errors[id] = results[task][id]
+    return errors
+
+
+def finish_watermarks(
+    papers_with_pages,
+    failures,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache] = None,
+    watermark: str = "latex",
+    paper_pdfs: Optional[Dict[Any, Path]] = None,
+    unattended: bool = False,
+    retries: int = 1,
+    jobs: Optional[int] = None,
+    build_dir: Path = Path("build"),
+):
+    """
+    Retries the papers that failed to watermark, given as a map from paper ID
+    to error, up to retries times, with at most jobs processes. The outcome of
+    every paper is written to build_report.json in build_dir. Unless
+    unattended is set, the user is asked whether to continue without the
+    papers that still fail.
+    """
+    papers = [
+        paper
+        for paper in papers_with_pages
+        if "archival" not in paper or paper["archival"]
+    ]
+    attempts = {paper["id"]: 1 for paper in papers}
+    for _ in range(retries):
+        if not failures:
+            break
+        print(f"Retrying {len(failures)} papers that could not be watermarked")
+        retry_papers = [paper for paper in papers if paper["id"] in failures]
+        for paper in retry_papers:
+            attempts[paper["id"]] += 1
+        scheduler = Scheduler(
+            min(RETRY_PROCESSES, len(retry_papers), jobs or RETRY_PROCESSES)
+        )
+        tasks = schedule_watermarks(
+            scheduler,
+            retry_papers,
+            conference,
+            root,
+            cache,
+            watermark,
+            paper_pdfs,
+            build_dir,
+        )
+        results, errors = scheduler.run()
+        failures = watermark_failures(tasks, results, errors)
+
+    report = watermark_report(papers, attempts, failures, watermark)
+    with open(Path(build_dir, "build_report.json"), "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print_watermark_summary(report)
+    if failures and not unattended:
+        input(
+            "\nSorry. I have problems compiling the watermarked papers. Press Enter to continue without them or Ctrl+C to quit.\n"
+        )
+    return report
+
+
+def watermark_report(papers, attempts, failures, watermark: str):
+    entries = []
+    for paper in papers:
+        entry = {
+            "id": paper["id"],
+            "file": paper.get("file"),
+            "attempts": attempts[paper["id"]],
+        }
+        error = failures.get(paper["id"])
+        if error is not None:
+            entry["status"] = "failed"
+            entry["error"] = str(error)
+            entry["log"] = getattr(error, "log", "")
+        elif entry["attempts"] > 1:
+            entry["status"] = "retried"
+        else:
+            entry["status"] = "ok"
+        entries.append(entry)
+    return {"watermark": watermark, "papers": entries}
+
+
+def print_watermark_summary(report):
+    entries = report["papers"]
+    failed = [entry for entry in entries if entry["status"] == "failed"]
+    retried = [entry for entry in entries if entry["status"] == "retried"]
+    print(
+        f"Watermarked {len(entries) - len(failed)} of {len(entries)} papers"
+        f" ({len(retried)} after a retry)."
+    )
+    for entry in failed:
+        print(f"\nPaper {entry['id']} ({entry['file']}) failed after {entry['attempts']} attempts:")
+        print(entry["error"])
+        if entry["log"]:
+            print(entry["log"])
+
+
+def render_watermarked_tex(
+    papers, conference, root: Path, paper_pdfs: Optional[Dict[Any, Path]] = None
+) -> Dict[Any, str]:
+    """
+    Renders the watermark .tex file of every paper with a single template and
+    the conference fields prepared once, and returns them by paper ID.
+    """
+    template = load_template("watermarked_pdf")
+    conference_dates = get_conference_dates(conference)
+    paper_pdfs = paper_pdfs or {}
+    return {
+        paper["id"]: template.render(
+            root=root,
+            pdf_path=paper_pdfs.get(paper["id"]) or Path(root, "papers", paper["file"]),
+            paper=paper,
+            conference=conference,
+            conference_dates=conference_dates,
+        )
+        for paper in papers
+    }
+
+
+def create_watermarked_pdf(
+    paper,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache] = None,
+    pdf_path: Optional[Path] = None,
+    build_dir: Path = Path("build"),
+    rendered_template: Optional[str] = None,
+):
+    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
+    if pdf_path is None:
+        pdf_path = Path(root, "papers", paper["file"])
+    if rendered_template is None:
+        rendered_template = render_watermarked_tex(
+            [paper], conference, root, {paper["id"]: pdf_path}
+        )[paper["id"]]
     tex_file = Path(watermarked_pdfs, f"{paper['id']}.tex")
     with open(tex_file, "w+") as f:
         f.write(rendered_template)
-    pdf_path = Path(root, "papers", paper["file"])
-    pax_path = pdf_path.with_suffix(".pax")
-    if not pax_path.exists():
-        subprocess.call(
-            [
-                "java",
-                "-cp",
-                f"{PARENT_DIR}/pax.jar:{PARENT_DIR}/pdfbox.jar",
-                "pax.PDFAnnotExtractor",
-                pdf_path,
-            ]
-        )
+    # The rendered template already contains every conference field and page
+    # number that ends up in the watermark, so together with the source PDF and
+    # its annotations it fully determines the output.
+    cache_key = None
+    if cache is not None:
+        cache_key = hash_strings(hash_included_pdf(pdf_path), rendered_template)
+        if cache.fetch("watermarked_pdfs", cache_key, tex_file.with_suffix(".pdf"), ".pdf"):
+            print(f"Reusing cached {paper['id']}")
+            return
     print(f"Compiling {paper['id']}")
-    returncode = subprocess.call(
-        [
-            "pdflatex",
-            "-halt-on-error",
-            f"-output-directory={watermarked_pdfs}",
-            str(tex_file),
-        ],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        shell=False,
-    )
-    returncode = subprocess.call(
-        [
-            "pdflatex",
-            "-halt-on-error",
-            f"-output-directory={watermarked_pdfs}",
-            str(tex_file),
-        ],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        shell=False,
-    )
-    if returncode != 0:
+    run = compile_latex(tex_file, watermarked_pdfs, ["-halt-on-error"], quiet=True)
+    if run.returncode != 0:
         # Some PAX errors can be handled by trying a second time.
-        returncode = subprocess.call(
-            [
-                "pdflatex",
-                "-halt-on-error",
-                f"-output-directory={watermarked_pdfs}",
-                str(tex_file),
-            ],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            shell=False,
-        )
+        run = compile_latex(tex_file, watermarked_pdfs, ["-halt-on-error"], quiet=True)
 
-    if returncode > 0:
-        raise Exception(
+    if run.returncode > 0:
+        raise CompilationError(
             "Sorry but it seems I cannot compile paper "
             + str(paper["file"])
             + " and it will not be added to the output folder!"
             + "\nIt is generally due to a PDF with a problematic internal links."
-            '\nA "possible" solution is to open the PDF with any preview system and export it again.'
+            '\nA "possible" solution is to open the PDF with any preview system and export it again.',
+            log_excerpt(run.log),
+        )
+    if cache is not None:
+        cache.put("watermarked_pdfs", cache_key, tex_file.with_suffix(".pdf"), ".pdf")
+
+
+def join_watermarked_tex(rendered_templates: List[str]) -> str:
+    """
+    Joins the watermark .tex files of several papers into one document. They
+    share the preamble, and each one sets up its paper after \begin{document}.
+    """
+    begin, end = r"\begin{document}", r"\end{document}"
+    preamble = rendered_templates[0].split(begin, 1)[0]
+    bodies = [
+        text.split(begin, 1)[1].rsplit(end, 1)[0] for text in rendered_templates
+    ]
+    return preamble + begin + "".join(bodies) + end + "\n"
+
+
+def create_watermarked_pdfs(
+    papers,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache],
+    pdf_paths: Dict[Any, Path],
+    build_dir: Path,
+    rendered_templates: Dict[Any, str],
+) -> Dict[Any, Exception]:
+    """
+    Watermarks consecutive papers with a single pdflatex run, which is then
+    split into the PDF of each paper, so that they share the LaTeX startup.
+    A batch that fails is split in halves until the failing papers are found;
+    their errors are returned by paper ID.
+    """
+    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
+    # Batches live in a folder of their own, since every PDF of
+    # watermarked_pdfs is copied to the output.
+    batch_dir = Path(watermarked_pdfs, "batches")
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    cache_keys = {}
+    pending = []
+    for paper in papers:
+        pdf_file = Path(watermarked_pdfs, f"{paper['id']}.pdf")
+        if cache is not None:
+            cache_keys[paper["id"]] = hash_strings(
+                hash_included_pdf(pdf_paths[paper["id"]]), rendered_templates[paper["id"]]
+            )
+            if cache.fetch("watermarked_pdfs", cache_keys[paper["id"]], pdf_file, ".pdf"):
+                print(f"Reusing cached {paper['id']}")
+                continue
+        pending.append(paper)
+
+    errors = {}
+
+    def compile_batch(batch):
+        if len(batch) == 1:
+            paper = batch[0]
+            try:
+                create_watermarked_pdf(
+                    paper,
+                    conference,
+                    root,
+                    cache,
+                    pdf_paths[paper["id"]],
+                    build_dir,
+                    rendered_templates[paper["id"]],
+                )
+            except CompilationError as e:
+                errors[paper["id"]] = e
+            return
+        ids = [paper["id"] for paper in batch]
+        tex_file = Path(batch_dir, f"{ids[0]}-{ids[-1]}.tex")
+        with open(tex_file, "w+") as f:
+            f.write(join_watermarked_tex([rendered_templates[id] for id in ids]))
+        print(f"Compiling {', '.join(str(id) for id in ids)}")
+        run = compile_latex(tex_file, batch_dir, ["-halt-on-error"], quiet=True)
+        if run.returncode != 0:
+            print(f"Splitting the batch of {', '.join(str(id) for id in ids)}")
+            half = len(batch) // 2
+            compile_batch(batch[:half])
+            compile_batch(batch[half:])
+            return
+        split_pdf(
+            tex_file.with_suffix(".pdf"),
+            [
+                (
+                    Path(watermarked_pdfs, f"{paper['id']}.pdf"),
+                    paper["end_page"] - paper["start_page"] + 1,
+                )
+                for paper in batch
+            ],
         )
+        if cache is not None:
+            for id in ids:
+                cache.put(
+                    "watermarked_pdfs", cache_keys[id], Path(watermarked_pdfs, f"{id}.pdf"), ".pdf"
+                )
+
+    if pending:
+        with profiling.stage("watermark batch", papers=len(pending)):
+            compile_batch(pending)
+    return errors
 
 
 def process_program_handbook(program):
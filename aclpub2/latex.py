@@ -0,0 +1,251 @@
+"""
+A pdflatex driver that only runs as many passes as a document needs, and
+that can start them from a format file holding the preamble already loaded.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from aclpub2 import profiling
+from aclpub2.cache import hash_strings
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+# Files through which one pass hands information to the next.
+AUXILIARY_SUFFIXES = (".aux", ".toc", ".out")
+
+RERUN_WARNING = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|Please rerun LaTeX|run LaTeX again"
+)
+# The lines of an .aux file that the next pass reads back into the document:
+# labels, citations, contents entries and author index pages. Everything else,
+# e.g. the definitions that hyperref writes to every .aux file, never requires
+# a rerun.
+REFERENCE_AUX_LINE = re.compile(
+    rb"^\\(newlabel|bibcite|aclindexpage|@writefile\{(toc|lof|lot)\})\b"
+)
+
+BEGIN_DOCUMENT = r"\begin{document}"
+# Files that a preamble reads, and that are part of its format.
+INPUT_COMMAND = re.compile(r"\\(?:input|include)\s*\{([^}]*)\}")
+
+# Where format files are kept, see enable_formats.
+_format_dir: Optional[Path] = None
+
+
+class CompilationError(Exception):
+    """
+    A failed compilation, carrying an excerpt of its LaTeX log.
+    """
+
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+    def __reduce__(self):
+        # Keep the log when the error is sent back from a worker process.
+        return CompilationError, (str(self), self.log)
+
+
+class LatexRun(NamedTuple):
+    returncode: int
+    passes: int
+    log: str
+
+
+def auxiliary_digest(path: Path) -> str:
+    """
+    Hashes what the next pass reads from an auxiliary file, treating a missing
+    file like an empty one. Of .aux files, only the lines holding references
+    count.
+    """
+    digest = hashlib.sha256()
+    if path.exists():
+        with open(path, "rb") as f:
+            for line in f:
+                if path.suffix != ".aux" or REFERENCE_AUX_LINE.match(line):
+                    digest.update(line)
+    return digest.hexdigest()
+
+
+def auxiliary_state(tex_file: Path, output_dir: Path, suffixes) -> Dict[str, str]:
+    return {
+        suffix: auxiliary_digest(Path(output_dir, tex_file.stem + suffix))
+        for suffix in suffixes
+    }
+
+
+def read_log(tex_file: Path, output_dir: Path) -> str:
+    log_file = Path(output_dir, tex_file.stem + ".log")
+    if not log_file.exists():
+        return ""
+    # TeX logs are not necessarily valid UTF-8.
+    return log_file.read_text(encoding="latin-1")
+
+
+def enable_formats(format_dir: Path):
+    """
+    Makes compile_latex start pdflatex from a format file of the document's
+    preamble, dumped with mylatexformat into format_dir the first time the
+    preamble is seen. Pool workers inherit the setting when they are forked.
+    """
+    global _format_dir
+    _format_dir = Path(format_dir).resolve()
+
+
+@lru_cache(maxsize=None)
+def pdflatex_version() -> Optional[str]:
+    """
+    The version of pdflatex, or None if mylatexformat is not installed.
+    """
+    if shutil.which("pdflatex") is None or shutil.which("kpsewhich") is None:
+        return None
+    found = subprocess.run(
+        ["kpsewhich", "mylatexformat.ltx"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    if found.returncode != 0 or not found.stdout.strip():
+        return None
+    version = subprocess.run(
+        ["pdflatex", "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    return version.stdout.decode("utf-8", "replace").splitlines()[0]
+
+
+def preamble_inputs(preamble: str) -> List[str]:
+    """
+    Returns the name and contents of every file that the preamble \\inputs,
+    and of those that they \\input in turn. Files that are not found from the
+    working directory, e.g. those of the TeX installation, are only named.
+    """
+    parts = []
+    seen = set()
+    pending = INPUT_COMMAND.findall(preamble)
+    while pending:
+        name = pending.pop(0).strip()
+        if name in seen:
+            continue
+        seen.add(name)
+        text = ""
+        for path in (Path(name), Path(name + ".tex")):
+            if path.is_file():
+                text = path.read_text(encoding="latin-1")
+                pending += INPUT_COMMAND.findall(text)
+                break
+        parts += [name, text]
+    return parts
+
+
+def preamble_format(text: str) -> Optional[Path]:
+    """
+    Returns the format file of the preamble of text, everything before
+    \\begin{document}, dumping it if needed, or None if formats are not
+    enabled or the preamble cannot be dumped. Formats are keyed by the
+    preamble, the files it \\inputs and the pdflatex version, so that a
+    changed template, macro file or TeX installation gets a new one.
+    """
+    if _format_dir is None or BEGIN_DOCUMENT not in text:
+        return None
+    version = pdflatex_version()
+    if version is None:
+        return None
+    preamble = text.split(BEGIN_DOCUMENT, 1)[0]
+    key = hash_strings(preamble, version, *preamble_inputs(preamble))
+    format_file = Path(_format_dir, f"{key}.fmt")
+    failed_file = Path(_format_dir, f"{key}.failed")
+    if format_file.exists():
+        return format_file
+    if failed_file.exists():
+        return None
+    _format_dir.mkdir(parents=True, exist_ok=True)
+    # Workers may dump the same format at the same time, each one under its
+    # own name, and the last one replaces the others.
+    jobname = f"{key}-{os.getpid()}-{threading.get_ident()}"
+    tex_file = Path(_format_dir, f"{jobname}.tex")
+    tex_file.write_text(preamble + BEGIN_DOCUMENT + "\n\\end{document}\n")
+    command = [
+        "pdflatex",
+        "-ini",
+        f"-jobname={jobname}",
+        f"-output-directory={_format_dir}",
+        "&pdflatex",
+        "mylatexformat.ltx",
+        str(tex_file),
+    ]
+    with profiling.stage("dump format", key=key):
+        returncode = profiling.call(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    dumped = Path(_format_dir, f"{jobname}.fmt")
+    log = read_log(tex_file, _format_dir)
+    for suffix in (".tex", ".log"):
+        tex_file.with_suffix(suffix).unlink(missing_ok=True)
+    if returncode != 0 or not dumped.exists():
+        # Keep the log, and do not try again for the same preamble.
+        failed_file.write_text(log)
+        return None
+    os.replace(dumped, format_file)
+    return format_file
+
+
+def compile_latex(
+    tex_file: Path,
+    output_dir: Path,
+    args: Sequence[str] = (),
+    max_passes: int = 3,
+    quiet: bool = False,
+    between_passes: Optional[Callable[[], None]] = None,
+    watch: Sequence[str] = AUXILIARY_SUFFIXES,
+) -> LatexRun:
+    """
+    Runs pdflatex on tex_file until its auxiliary files stop changing and the
+    log asks for no further rerun, or max_passes is reached. A failing pass
+    ends the compilation. between_passes, e.g. a makeindex call, runs after
+    every pass; the files it produces should be listed in watch.
+
+    If formats are enabled, see enable_formats, passes start from the format
+    of the preamble of tex_file, and if the first one fails, the compilation
+    starts again without it.
+    """
+    command = ["pdflatex", *args, f"-output-directory={output_dir}", str(tex_file)]
+    format_file = preamble_format(tex_file.read_text()) if _format_dir else None
+    if format_file is not None:
+        command.insert(1, f"-fmt={format_file}")
+    output = subprocess.DEVNULL if quiet else None
+    with profiling.stage("latex", file=tex_file.name):
+        state = auxiliary_state(tex_file, output_dir, watch)
+        passes = 0
+        while True:
+            returncode = profiling.call(command, stdout=output, stderr=output)
+            passes += 1
+            log = read_log(tex_file, output_dir)
+            if returncode != 0 and format_file is not None and passes == 1:
+                command.remove(f"-fmt={format_file}")
+                format_file = None
+                passes = 0
+                continue
+            if returncode != 0 or passes >= max_passes:
+                break
+            if between_passes is not None:
+                between_passes()
+            previous_state = state
+            state = auxiliary_state(tex_file, output_dir, watch)
+            if state == previous_state and not RERUN_WARNING.search(log):
+                break
+    return LatexRun(returncode, passes, log)
+
+
+def log_excerpt(log: str, num_lines: int = 15) -> str:
+    """
+    Returns the first error of a LaTeX log and the lines following it, or the
+    end of the log if it contains no error.
+    """
+    lines = log.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("!"):
+            return "\n".join(lines[i : i + num_lines])
+    return "\n".join(lines[-num_lines:])
@@ -0,0 +1,133 @@
+"""
+Materialization of the output tree. Files are reflinked or hardlinked from
+the build and input directories where the filesystem allows it, and copied
+otherwise. Files that are already up to date are left untouched, so that
+re-running a build does not rewrite gigabytes of unchanged PDFs.
+"""
+from pathlib import Path
+from typing import Iterable, Set
+
+import filecmp
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl request that makes a file share the extents of another, on Linux
+# filesystems with copy-on-write support such as Btrfs and XFS.
+FICLONE = 0x40049409
+
+
+def reflink(source: Path, destination: Path):
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    try:
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        destination.unlink(missing_ok=True)
+        raise
+    shutil.copystat(source, destination)
+
+
+def link_file(source: Path, destination: Path):
+    """
+    Creates destination with the content of source, sharing storage with it
+    if possible. A reflink is preferred to a hardlink, since writing to a
+    hardlinked output would also change its source.
+    """
+    for method in (reflink, os.link):
+        try:
+            return method(source, destination)
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+
+
+def is_up_to_date(source: Path, destination: Path) -> bool:
+    try:
+        dst = destination.stat()
+    except FileNotFoundError:
+        return False
+    src = source.stat()
+    if (src.st_dev, src.st_ino) == (dst.st_dev, dst.st_ino):
+        return True
+    if src.st_size != dst.st_size:
+        return False
+    if src.st_mtime_ns == dst.st_mtime_ns:
+        return True
+    # E.g. a paper that was watermarked again with the same result.
+    if filecmp.cmp(source, destination, shallow=False):
+        # Make the cheap check succeed next time.
+        os.utime(destination, ns=(dst.st_atime_ns, src.st_mtime_ns))
+        return True
+    return False
+
+
+def materialize_file(source: Path, destination: Path) -> Path:
+    """
+    Makes destination hold the content of source, and returns destination.
+    """
+    source, destination = Path(source), Path(destination)
+    if is_up_to_date(source, destination):
+        return destination
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temporary = destination.with_name(f".{destination.name}.tmp-{os.getpid()}")
+    temporary.unlink(missing_ok=True)
+    link_file(source, temporary)
+    os.replace(temporary, destination)
+    return destination
+
+
+def materialize_text(text: str, destination: Path) -> Path:
+    """
+    Writes text to destination, unless it already holds exactly that text.
+    """
+    destination = Path(destination)
+    data = text.encode("utf-8")
+    if destination.exists() and destination.read_bytes() == data:
+        return destination
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temporary = destination.with_name(f".{destination.name}.tmp-{os.getpid()}")
+    temporary.write_bytes(data)
+    os.replace(temporary, destination)
+    return destination
+
+
+def materialize_tree(source_dir: Path, destination_dir: Path) -> Set[Path]:
+    """
+    Materializes every file below source_dir at the same place below
+    destination_dir, and returns the destination paths.
+    """
+    destinations = set()
+    for directory, _, files in os.walk(source_dir):
+        relative = Path(directory).relative_to(source_dir)
+        for file in files:
+            destinations.add(
+                materialize_file(Path(directory, file), Path(destination_dir, relative, file))
+            )
+    return destinations
+
+
+def prune(root: Path, keep: Iterable[Path]):
+    """
+    Removes every file below root that is not in keep, and the directories
+    that are left empty. This replaces wiping the output directory, which
+    would force every kept file to be written again.
+    """
+    keep = {Path(path).resolve() for path in keep}
+    keep_dirs = {parent for path in keep for parent in path.parents}
+    for directory, dirs, files in os.walk(root, topdown=False):
+        for file in files:
+            path = Path(directory, file)
+            if path.resolve() not in keep:
+                path.unlink()
+        for name in dirs:
+            path = Path(directory, name)
+            if path.is_symlink():
+                path.unlink()
+            elif path.resolve() not in keep_dirs and not any(path.iterdir()):
+                path.rmdir()
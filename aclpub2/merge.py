@@ -0,0 +1,370 @@
+"""
+Assembly of a volume by concatenating already compiled PDFs, rather than
+including them again in a LaTeX document, and the reverse for batches of
+papers compiled together.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfFileReader, PdfFileWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+    createStringObject,
+)
+
+
+def page_destination(page_ref) -> ArrayObject:
+    return ArrayObject([page_ref, NameObject("/Fit")])
+
+
+class PdfStreamWriter:
+    """
+    Writes a PDF to a stream one object at a time, rather than keeping every
+    object until the end as PdfFileWriter does. The objects of an input PDF
+    are copied with copy and written by flush, after which they can be
+    dropped along with the reader.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = []
+        # The copies of the objects of the current input, by object number.
+        self.refs = {}
+        self.pending = []
+        stream.write(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self) -> IndirectObject:
+        self.offsets.append(None)
+        return IndirectObject(len(self.offsets), 0, self)
+
+    def write(self, ref: IndirectObject, obj):
+        self.offsets[ref.idnum - 1] = self.stream.tell()
+        self.stream.write(f"{ref.idnum} 0 obj\n".encode("ascii"))
+        obj.writeToStream(self.stream, None)
+        self.stream.write(b"\nendobj\n")
+
+    def add(self, obj) -> IndirectObject:
+        ref = self.reserve()
+        self.write(ref, obj)
+        return ref
+
+    def start_input(self, reader: PdfFileReader) -> List[IndirectObject]:
+        """
+        Starts copying from reader, and returns the references that its pages
+        will be written to, so that links to pages further on can be copied.
+        """
+        self.refs = {}
+        self.pending = []
+        page_refs = []
+        for i in range(reader.getNumPages()):
+            page_ref = reader.getPage(i).indirectRef
+            page_refs.append(self.reserve())
+            self.refs[(page_ref.idnum, page_ref.generation)] = page_refs[-1]
+        return page_refs
+
+    def copy(self, obj):
+        """
+        Returns a copy of a direct object of the current input, which refers
+        to the copies of the indirect objects it refers to.
+        """
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key not in self.refs:
+                self.refs[key] = self.reserve()
+                self.pending.append(obj)
+            return self.refs[key]
+        if isinstance(obj, StreamObject):
+            if isinstance(obj, EncodedStreamObject):
+                copy = EncodedStreamObject()
+                copy._data = obj._data
+            else:
+                copy = DecodedStreamObject()
+                copy.setData(obj.getData())
+            # The length is written along with the data.
+            copy.update(
+                (key, self.copy(value)) for key, value in obj.items() if key != "/Length"
+            )
+            return copy
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject((key, self.copy(value)) for key, value in obj.items())
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.copy(value) for value in obj)
+        return obj
+
+    def flush(self):
+        """
+        Writes the objects of the current input that copies refer to.
+        """
+        while self.pending:
+            obj = self.pending.pop()
+            self.write(self.refs[(obj.idnum, obj.generation)], self.copy(obj.getObject()))
+
+    def close(self, catalog: DictionaryObject):
+        root = self.add(catalog)
+        xref = self.stream.tell()
+        self.stream.write(f"xref\n0 {len(self.offsets) + 1}\n".encode("ascii"))
+        self.stream.write(b"0000000000 65535 f \n")
+        for offset in self.offsets:
+            self.stream.write(f"{offset:010d} 00000 n \n".encode("ascii"))
+        trailer = DictionaryObject(
+            {
+                NameObject("/Size"): NumberObject(len(self.offsets) + 1),
+                NameObject("/Root"): root,
+            }
+        )
+        self.stream.write(b"trailer\n")
+        trailer.writeToStream(self.stream, None)
+        self.stream.write(f"\nstartxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+
+def copy_outline(writer: PdfStreamWriter, reader: PdfFileReader, outline):
+    """
+    Copies an outline as returned by PdfFileReader.getOutlines into a list of
+    (title, destination, children), see write_outline.
+    """
+    items = []
+    for item in outline:
+        if isinstance(item, list):
+            if items and items[-1] is not None:
+                items[-1][2].extend(copy_outline(writer, reader, item))
+            continue
+        if reader.getDestinationPageNumber(item) < 0:
+            items.append(None)
+            continue
+        items.append((item.title, writer.copy(item.getDestArray()), []))
+    return [item for item in items if item is not None]
+
+
+def write_outline(writer: PdfStreamWriter, items, parent: IndirectObject):
+    """
+    Writes the outline items given as (title, destination, children) under
+    parent, and returns the references of the first and last ones.
+    """
+    refs = [writer.reserve() for _ in items]
+    for i, ((title, destination, children), ref) in enumerate(zip(items, refs)):
+        item = DictionaryObject(
+            {
+                NameObject("/Title"): createStringObject(title),
+                NameObject("/Parent"): parent,
+                NameObject("/A"): DictionaryObject(
+                    {
+                        NameObject("/S"): NameObject("/GoTo"),
+                        NameObject("/D"): destination,
+                    }
+                ),
+            }
+        )
+        if i > 0:
+            item[NameObject("/Prev")] = refs[i - 1]
+        if i + 1 < len(refs):
+            item[NameObject("/Next")] = refs[i + 1]
+        if children:
+            first, last = write_outline(writer, children, ref)
+            item[NameObject("/First")] = first
+            item[NameObject("/Last")] = last
+            item[NameObject("/Count")] = NumberObject(len(children))
+        writer.write(ref, item)
+    return refs[0], refs[-1]
+
+
+def link_destination(annotation):
+    """
+    Returns the dictionary and key holding the destination of a link
+    annotation, or None if it does not link within the document.
+    """
+    if annotation.get("/Subtype") != "/Link":
+        return None
+    if "/Dest" in annotation:
+        return annotation, "/Dest"
+    action = annotation.get("/A")
+    if action is not None and action.getObject().get("/S") == "/GoTo":
+        return action.getObject(), "/D"
+    return None
+
+
+def resolve_links(page, destinations):
+    """
+    Replaces the named destinations of the links on page that are in
+    destinations by the explicit destinations they map to.
+    """
+    annotations = page.get("/Annots")
+    # The annotations may be an indirect array, e.g. as PyPDF2 writes them.
+    for annotation in annotations.getObject() if annotations is not None else []:
+        link = link_destination(annotation.getObject())
+        if link is None:
+            continue
+        holder, key = link
+        name = holder[key]
+        if not isinstance(name, ArrayObject) and name in destinations:
+            holder[NameObject(key)] = destinations[name]
+
+
+def page_labels(labels: Sequence[Tuple]) -> DictionaryObject:
+    nums = ArrayObject()
+    for page_index, style, *start in labels:
+        nums.append(NumberObject(page_index))
+        nums.append(
+            DictionaryObject(
+                {
+                    NameObject("/S"): NameObject(style),
+                    NameObject("/St"): NumberObject(start[0] if start else 1),
+                }
+            )
+        )
+    return DictionaryObject({NameObject("/Nums"): nums})
+
+
+def read_page_labels(pdf_path: Path) -> List[Tuple[int, str, int]]:
+    """
+    Returns the page label ranges of pdf_path as (first page index, style,
+    first page number), the reverse of page_labels, leaving out ranges without
+    page numbers.
+    """
+    reader = PdfFileReader(str(pdf_path), strict=False)
+    labels = reader.trailer["/Root"].get("/PageLabels")
+    if labels is None:
+        return []
+    nums = labels.getObject().get("/Nums", [])
+    ranges = [(int(nums[i]), nums[i + 1].getObject()) for i in range(0, len(nums) - 1, 2)]
+    return [
+        (page_index, str(label["/S"]), int(label.get("/St", 1)))
+        for page_index, label in ranges
+        if "/S" in label
+    ]
+
+
+def merge_pdfs(
+    inputs: List[Path],
+    output_path: Path,
+    bookmarks: Sequence[Tuple[str, int]] = (),
+    named_pages: Optional[Dict[str, int]] = None,
+    labels: Sequence[Tuple] = (),
+):
+    """
+    Concatenates inputs into output_path, keeping their annotations, outlines
+    and named destinations, so that links between the inputs that go through
+    named destinations (e.g. hyperref's page.N anchors) keep resolving. Inputs
+    reuse names such as figure.1, so the links of an input to the names that
+    it defines itself are turned into explicit destinations first; other
+    names resolve to the first input that defines them. The pages of each
+    input are written out before the next one is read, so that memory use is
+    bounded by the largest input rather than by the volume.
+
+    bookmarks: additional top-level (title, page index) outline entries.
+    named_pages: named destinations to (re)define as (name, page index); these
+        take precedence over destinations of the same name in the inputs.
+    labels: page label ranges as (first page index, style) or (first page
+        index, style, first page number), where style is a PDF numbering style
+        such as "/r" or "/D"; numbering restarts at 1 by default.
+    """
+    named_pages = named_pages or {}
+    destinations = {}
+    page_refs = []
+    outline = []
+    pending_bookmarks = sorted(bookmarks, key=lambda bookmark: bookmark[1], reverse=True)
+    with open(output_path, "wb") as f:
+        writer = PdfStreamWriter(f)
+        pages_ref = writer.reserve()
+        for input_path in inputs:
+            reader = PdfFileReader(str(input_path), strict=False)
+            input_page_refs = writer.start_input(reader)
+            local_destinations = {}
+            for name, destination in reader.namedDestinations.items():
+                if reader.getDestinationPageNumber(destination) < 0:
+                    continue
+                if name not in named_pages:
+                    local_destinations[name] = destination.getDestArray()
+                if name not in destinations:
+                    destinations[name] = writer.copy(destination.getDestArray())
+            for i, page_ref in enumerate(input_page_refs):
+                page = reader.getPage(i)
+                resolve_links(page, local_destinations)
+                # Inherited attributes are already copied into the page.
+                page = DictionaryObject(
+                    (key, value) for key, value in page.items() if key != "/Parent"
+                )
+                page = writer.copy(page)
+                page[NameObject("/Parent")] = pages_ref
+                writer.write(page_ref, page)
+                writer.flush()
+            page_refs += input_page_refs
+            # Keep the outline in page order.
+            while pending_bookmarks and pending_bookmarks[-1][1] < len(page_refs):
+                title, page_index = pending_bookmarks.pop()
+                outline.append((title, page_destination(page_refs[page_index]), []))
+            outline += copy_outline(writer, reader, reader.getOutlines())
+            writer.flush()
+
+        writer.write(
+            pages_ref,
+            DictionaryObject(
+                {
+                    NameObject("/Type"): NameObject("/Pages"),
+                    NameObject("/Kids"): ArrayObject(page_refs),
+                    NameObject("/Count"): NumberObject(len(page_refs)),
+                }
+            ),
+        )
+        for name, page_index in named_pages.items():
+            destinations[name] = page_destination(page_refs[page_index])
+        names = ArrayObject()
+        for name in sorted(destinations):
+            names.append(createStringObject(name))
+            names.append(destinations[name])
+        catalog = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Catalog"),
+                NameObject("/Pages"): pages_ref,
+                NameObject("/Names"): DictionaryObject(
+                    {NameObject("/Dests"): DictionaryObject({NameObject("/Names"): names})}
+                ),
+                NameObject("/PageMode"): NameObject("/UseOutlines"),
+            }
+        )
+        if outline:
+            outlines_ref = writer.reserve()
+            first, last = write_outline(writer, outline, outlines_ref)
+            writer.write(
+                outlines_ref,
+                DictionaryObject(
+                    {
+                        NameObject("/Type"): NameObject("/Outlines"),
+                        NameObject("/First"): first,
+                        NameObject("/Last"): last,
+                        NameObject("/Count"): NumberObject(len(outline)),
+                    }
+                ),
+            )
+            catalog[NameObject("/Outlines")] = outlines_ref
+        if labels:
+            catalog[NameObject("/PageLabels")] = page_labels(labels)
+        writer.close(catalog)
+
+
+def split_pdf(input_path: Path, outputs: Sequence[Tuple[Path, int]]):
+    """
+    Splits input_path into consecutive parts, given as (output path, number
+    of pages), keeping the annotations of every page. Links between the pages
+    of a part keep pointing to them.
+    """
+    reader = PdfFileReader(str(input_path), strict=False)
+    if sum(num_pages for _, num_pages in outputs) != reader.getNumPages():
+        raise ValueError(
+            f"{input_path} has {reader.getNumPages()} pages, not the"
+            f" {sum(num_pages for _, num_pages in outputs)} of its parts"
+        )
+    first = 0
+    for output_path, num_pages in outputs:
+        writer = PdfFileWriter()
+        for i in range(first, first + num_pages):
+            writer.addPage(reader.getPage(i))
+        first += num_pages
+        with open(output_path, "wb") as f:
+            writer.write(f)
@@ -0,0 +1,112 @@
+"""
+Page counting for camera-ready papers, backed by a persistent index so that
+repeated builds do not parse unchanged PDFs again.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from PyPDF2 import PdfFileReader
+
+from aclpub2.cache import hash_file
+
+import json
+import multiprocessing
+import os
+import tempfile
+
+
+def read_page_count(pdf_path: Path) -> int:
+    """
+    Reads the page count from the root of the page tree. Unlike
+    PdfFileReader.getNumPages, this does not resolve every page object.
+    """
+    reader = PdfFileReader(str(pdf_path), strict=False)
+    if reader.isEncrypted:
+        return reader.getNumPages()
+    return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+
+
+def scan_pdf(pdf_path: str):
+    stat = os.stat(pdf_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(Path(pdf_path)),
+    }
+
+
+def parallel_map(function, items, processes: Optional[int] = None):
+    items = list(items)
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    processes = min(processes or multiprocessing.cpu_count(), len(items))
+    with multiprocessing.Pool(processes=processes) as pool:
+        return pool.map(function, items, chunksize=8)
+
+
+def load_index(index_path: Optional[Path]):
+    if index_path is None or not index_path.exists():
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        # A corrupt index only costs a rescan.
+        return {}
+
+
+def save_index(index_path: Path, index):
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=index_path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+
+
+def count_pages(
+    pdf_paths: Iterable[Path], index_path: Optional[Path] = None, processes: int = None
+) -> Dict[Path, int]:
+    """
+    Returns the number of pages of each PDF. Files whose size and modification
+    time match the index are not opened at all; other files are hashed, and
+    only parsed if no PDF with the same content was seen before. Hashing and
+    parsing are spread over a process pool.
+    """
+    pdf_paths = [Path(path) for path in pdf_paths]
+    index = load_index(index_path)
+    known_page_counts = {
+        entry["sha256"]: entry["num_pages"] for entry in index.values()
+    }
+    counts = {}
+    to_scan = {}
+    for pdf_path in pdf_paths:
+        key = str(pdf_path.resolve())
+        entry = index.get(key)
+        stat = pdf_path.stat()
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            counts[pdf_path] = entry["num_pages"]
+        else:
+            to_scan[key] = None
+    if to_scan:
+        entries = dict(zip(to_scan, parallel_map(scan_pdf, to_scan, processes)))
+        # Only one file per content is parsed, so that a paper that appears
+        # several times, e.g. in several volumes, is parsed once.
+        to_parse = {}
+        for key, entry in entries.items():
+            if entry["sha256"] not in known_page_counts:
+                to_parse.setdefault(entry["sha256"], key)
+        known_page_counts.update(
+            zip(to_parse, parallel_map(read_page_count, to_parse.values(), processes))
+        )
+        for entry in entries.values():
+            entry["num_pages"] = known_page_counts[entry["sha256"]]
+        index.update(entries)
+        if index_path is not None:
+            save_index(index_path, index)
+        for pdf_path in pdf_paths:
+            counts.setdefault(pdf_path, index[str(pdf_path.resolve())]["num_pages"])
+    return counts
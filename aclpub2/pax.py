@@ -0,0 +1,98 @@
+"""
+Batch extraction of PDF annotations with PAX, so that the links of the
+camera-ready papers can be reinserted by the pax LaTeX package.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from aclpub2 import profiling
+from aclpub2.cache import BuildCache, hash_file, hash_strings
+
+import os
+import shutil
+import tempfile
+
+PARENT_DIR = Path(__file__).parent
+PAX_CLASSPATH = f"{PARENT_DIR}/pax.jar:{PARENT_DIR}/pdfbox.jar"
+
+
+def run_pax(pdf_paths: List[Path]):
+    """
+    Runs PDFAnnotExtractor over a list of PDFs in a single JVM. A .pax file is
+    written next to each PDF.
+    """
+    profiling.call(
+        ["java", "-cp", PAX_CLASSPATH, "pax.PDFAnnotExtractor"]
+        + [str(path) for path in pdf_paths]
+    )
+
+
+def hash_included_pdf(pdf_path: Path) -> str:
+    """
+    Digest of a PDF as pax includes it: its own content, and that of the .pax
+    file next to it, if any.
+    """
+    key = hash_file(pdf_path)
+    pax_path = Path(pdf_path).with_suffix(".pax")
+    if pax_path.exists():
+        key = hash_strings(key, hash_file(pax_path))
+    return key
+
+
+def stage_pdf(source: Path, destination: Path):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def extract_annotations(
+    pdf_paths: Iterable[Path], cache: BuildCache, jvms: int = 2
+) -> Dict[Path, Path]:
+    """
+    Makes sure that every PDF has its annotations extracted, and returns a map
+    from each input PDF to the PDF that LaTeX should include. pax looks for
+    the .pax file next to the included PDF, so extracted annotations are kept
+    in the cache next to a copy of their source PDF, addressed by its hash.
+    PDFs that already ship a .pax file next to them are used as they are.
+    """
+    included = {}
+    missing = {}
+    for pdf_path in pdf_paths:
+        pdf_path = Path(pdf_path)
+        if pdf_path.with_suffix(".pax").exists():
+            included[pdf_path] = pdf_path
+            continue
+        key = hash_file(pdf_path)
+        cached_pdf = cache.get("pax", key, ".pdf")
+        if cached_pdf is not None and cache.get("pax", key, ".pax") is not None:
+            included[pdf_path] = cached_pdf
+        else:
+            missing.setdefault(key, []).append(pdf_path)
+    if not missing:
+        return included
+
+    with profiling.stage("pax", papers=len(missing)):
+        print(f"Extracting annotations from {len(missing)} papers")
+        cache.root.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=cache.root) as staging:
+            staged = []
+            for key, sources in missing.items():
+                staged_path = Path(staging, f"{key}.pdf")
+                stage_pdf(sources[0], staged_path)
+                staged.append(staged_path)
+            jvms = max(1, min(jvms, len(staged)))
+            with ThreadPoolExecutor(max_workers=jvms) as executor:
+                list(executor.map(run_pax, [staged[i::jvms] for i in range(jvms)]))
+            for staged_path in staged:
+                key = staged_path.stem
+                pax_path = staged_path.with_suffix(".pax")
+                # Keep papers whose extraction failed, they are merely included
+                # without their links, as they would be with a missing .pax.
+                included_path = cache.put("pax", key, staged_path, ".pdf")
+                if pax_path.exists():
+                    cache.put("pax", key, pax_path, ".pax")
+                for source in missing[key]:
+                    included[source] = included_path
+    return included
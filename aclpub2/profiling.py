@@ -0,0 +1,153 @@
+"""
+An opt-in build profiler. Stages and subprocesses are recorded as events of
+the Chrome trace format, which can be loaded in chrome://tracing or Perfetto.
+
+Every process appends its events as JSON lines to a shared file, so that the
+events of pool workers, which inherit the profiler when they are forked, end
+up in the same trace as those of the parent.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import json
+import os
+import resource
+import subprocess
+import threading
+import time
+
+_events_path: Optional[Path] = None
+
+
+def enabled() -> bool:
+    return _events_path is not None
+
+
+def enable(trace_path: Path):
+    global _events_path
+    _events_path = Path(f"{trace_path}.events")
+    _events_path.parent.mkdir(parents=True, exist_ok=True)
+    _events_path.unlink(missing_ok=True)
+
+
+def timestamp() -> int:
+    return time.time_ns() // 1000
+
+
+def record(name: str, category: str, start: int, end: int, **args):
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": start,
+        "dur": end - start,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": args,
+    }
+    line = (json.dumps(event, default=str) + "\n").encode("utf-8")
+    # A single append is not interleaved with the writes of other processes.
+    fd = os.open(_events_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+@contextmanager
+def stage(name: str, **args):
+    """
+    Records the wall and CPU time, including that of finished child processes,
+    spent in the enclosed block.
+    """
+    if not enabled():
+        yield
+        return
+    start, start_cpu = timestamp(), cpu_seconds()
+    try:
+        yield
+    finally:
+        record(name, "stage", start, timestamp(), cpu_s=cpu_seconds() - start_cpu, **args)
+
+
+def call(command, **kwargs) -> int:
+    """
+    subprocess.call that, when profiling, records the wall time, CPU time and
+    peak resident set size of the child process.
+    """
+    if not enabled() or not hasattr(os, "wait4"):
+        return subprocess.call(command, **kwargs)
+    start = timestamp()
+    process = subprocess.Popen(command, **kwargs)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    record(
+        Path(command[0]).name,
+        "subprocess",
+        start,
+        timestamp(),
+        command=" ".join(str(part) for part in command),
+        returncode=process.returncode,
+        cpu_s=usage.ru_utime + usage.ru_stime,
+        # Kilobytes on Linux, bytes on macOS.
+        max_rss=usage.ru_maxrss,
+    )
+    return process.returncode
+
+
+def summarize(events):
+    """
+    Totals per event name, which are easier to compare between runs than the
+    events themselves.
+    """
+    summary = {}
+    for event in events:
+        totals = summary.setdefault(
+            event["name"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0}
+        )
+        totals["count"] += 1
+        totals["wall_s"] += event["dur"] / 1e6
+        totals["cpu_s"] += event["args"].get("cpu_s", 0.0)
+    return dict(sorted(summary.items()))
+
+
+def write_trace(trace_path: Path):
+    """
+    Collects the events of all processes into a Chrome trace at trace_path,
+    and stops profiling.
+    """
+    global _events_path
+    events = []
+    if _events_path.exists():
+        with open(_events_path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        _events_path.unlink()
+    _events_path = None
+    events.sort(key=lambda event: event["ts"])
+    parent = os.getpid()
+    for pid in sorted({event["pid"] for event in events}):
+        events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "aclpub2" if pid == parent else f"worker {pid}"},
+            }
+        )
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "summary": summarize(event for event in events if event["ph"] == "X"),
+            },
+            f,
+            indent=1,
+        )
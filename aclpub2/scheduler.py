@@ -0,0 +1,165 @@
+"""
+A small dependency-graph scheduler for the build. Tasks run as soon as the
+tasks they depend on are done, with at most a fixed number of tasks running at
+a time across threads and worker processes.
+"""
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from collections import defaultdict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import heapq
+import multiprocessing
+import traceback
+
+
+class Result(NamedTuple):
+    """
+    An argument placeholder for the result of another task, or for the item
+    key of that result if key is given. Using it, also as a value of a dict
+    argument, makes the task depend on the other task.
+    """
+
+    task: str
+    key: Any = None
+
+
+class DependencyFailed(Exception):
+    pass
+
+
+class Task(NamedTuple):
+    name: str
+    function: Callable
+    args: Tuple
+    kwargs: Dict[str, Any]
+    after: Tuple[str, ...]
+    in_process: bool
+
+
+def resolve(value, results):
+    if isinstance(value, Result):
+        result = results[value.task]
+        return result if value.key is None else result[value.key]
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+    return value
+
+
+def placeholders(value):
+    if isinstance(value, Result):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from placeholders(item)
+
+
+class Scheduler:
+    def __init__(self, jobs: Optional[int] = None):
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.tasks: Dict[str, Task] = {}
+
+    def add(
+        self,
+        name: str,
+        function: Callable,
+        *args,
+        after: Sequence[str] = (),
+        in_process: bool = False,
+        **kwargs,
+    ) -> str:
+        """
+        Adds a task that calls function(*args, **kwargs) once the tasks named
+        in after are done. Tasks can only depend on tasks added before them,
+        so the graph cannot have cycles. Tasks that spend their time in Python
+        rather than in subprocesses should set in_process, so that they run
+        in a worker process instead of a thread.
+        """
+        if name in self.tasks:
+            raise ValueError(f"duplicate task: {name}")
+        dependencies = list(after) + [
+            placeholder.task
+            for value in list(args) + list(kwargs.values())
+            for placeholder in placeholders(value)
+        ]
+        for dependency in dependencies:
+            if dependency not in self.tasks:
+                raise ValueError(f"task {name} depends on unknown task {dependency}")
+        self.tasks[name] = Task(
+            name, function, args, kwargs, tuple(dict.fromkeys(dependencies)), in_process
+        )
+        return name
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+        """
+        Runs all tasks, preferring the ones added first among those that are
+        ready. Returns the results of the tasks that succeeded, and the errors
+        of those that failed; tasks that depend on a failed task fail with
+        DependencyFailed without running.
+        """
+        order = {name: i for i, name in enumerate(self.tasks)}
+        waiting = {name: len(task.after) for name, task in self.tasks.items()}
+        dependents = defaultdict(list)
+        for name, task in self.tasks.items():
+            for dependency in task.after:
+                dependents[dependency].append(name)
+        ready = [(order[name], name) for name, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        results = {}
+        failures = {}
+        running = {}
+
+        def fail(name: str, error: BaseException):
+            stack = [(name, error)]
+            while stack:
+                name, error = stack.pop()
+                if name in failures:
+                    continue
+                failures[name] = error
+                for dependent in dependents[name]:
+                    stack.append((dependent, DependencyFailed(f"{name} failed")))
+
+        threads = ThreadPoolExecutor(max_workers=self.jobs)
+        processes = None
+        try:
+            while ready or running:
+                while ready and len(running) < self.jobs:
+                    _, name = heapq.heappop(ready)
+                    if name in failures:
+                        continue
+                    task = self.tasks[name]
+                    if task.in_process and processes is None:
+                        processes = ProcessPoolExecutor(max_workers=self.jobs)
+                    executor = processes if task.in_process else threads
+                    future = executor.submit(
+                        task.function,
+                        *[resolve(value, results) for value in task.args],
+                        **{key: resolve(value, results) for key, value in task.kwargs.items()},
+                    )
+                    running[future] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        # Report right away, but never block the other tasks.
+                        print(f"Task {name} failed:")
+                        traceback.print_exception(type(error), error, error.__traceback__)
+                        fail(name, error)
+                        continue
+                    results[name] = future.result()
+                    for dependent in dependents[name]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            heapq.heappush(ready, (order[dependent], dependent))
+        finally:
+            threads.shutdown()
+            if processes is not None:
+                processes.shutdown()
+        return results, failures
@@ -1,24 +1,86 @@
 from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Optional
 
+from aclpub2.collation import initial, name_key, sort_key
+
+import contextvars
 import jinja2
 
 TEMPLATE_DIR = Path(Path(__file__).parent, "templates")
 
-HOMOGLYPHS = {"Ø": "o", "Ö": "o", "Ç": "c", "Ş": "s", "Š": "s", "Á": "a", r"\c{S}": "s", "Ü": "u"}
-
 
 def load_file(*args: str):
     with open(Path(*args)) as f:
         return f.read()
 
 
+# The entries of the author index of the template being rendered, numbered in
+# order of appearance, see collect_author_index.
+_author_index = contextvars.ContextVar("author_index", default=None)
+
+
+@contextmanager
+def collect_author_index():
+    """
+    Makes the templates rendered in the block build their author index in
+    Python: names are registered with index_entry, and print_author_index
+    writes the index. The pages are filled in by LaTeX through the .aux file,
+    see \\aclindex in content/special/preamble.tex, so makeindex is not needed.
+    """
+    token = _author_index.set({})
+    try:
+        yield
+    finally:
+        _author_index.reset(token)
+
+
+def index_entry(name: str, makeindex_name: Optional[str] = None) -> str:
+    """
+    Returns the LaTeX that adds the current page to the index entry of name,
+    given as "Last, First". Outside of collect_author_index, this is an
+    \\index command for makeindex, with makeindex_name if given, as the
+    templates that still use makeindex have always indexed some names by
+    surname only.
+    """
+    entries = _author_index.get()
+    if entries is None:
+        return r"\index{" + (makeindex_name or name) + "}"
+    number = entries.setdefault(name, len(entries))
+    return r"\aclindex{" + str(number) + "}"
+
+
+def print_author_index() -> str:
+    """
+    Returns the author index of the entries registered so far, grouped by
+    initial as makeindex does.
+    """
+    entries = _author_index.get()
+    if not entries:
+        return ""
+    lines = [r"\begin{theindex}"]
+    letter = None
+    for name, number in sorted(
+        entries.items(), key=lambda entry: (initial(entry[0]), sort_key(entry[0]), entry[0])
+    ):
+        if letter is not None and initial(name) != letter:
+            lines.append(r"\indexspace")
+        letter = initial(name)
+        lines.append(r"\item " + name + r", \aclindexpages{" + str(number) + "}")
+    lines.append(r"\end{theindex}")
+    return "\n".join(lines)
+
+
 def render_name(user):
     name = user["first_name"] + " "
+    given_names = user["first_name"]
     if "middle_name" in user:
         name += user["middle_name"] + " "
-    name += user["last_name"] + r"\index{" + user["last_name"] + "}"
+        given_names += " " + user["middle_name"]
+    name += user["last_name"] + index_entry(
+        user["last_name"] + ", " + given_names, user["last_name"]
+    )
     return name
 
 
@@ -33,17 +95,13 @@ def join_names(delimiter: str, items: List[Any], delimiter_last: str = None):
 
 
 def index_author(author: str):
-    n = author.split(" ")
-    return r"\index{" + n[-1] + ", " + " ".join(n[:-1]) + "}"
+    n = author.strip().split(" ")
+    return index_entry(n[-1] + ", " + " ".join(n[:-1]))
 
 
 def index_speakers(author: str):
-    n = author.split(",")
-    s = ""
-    for aut in n:
-        sur = aut.split(" ")[-1]
-        s += r"\index{" + sur + "}"
-    return s
+    speakers = [aut.strip().split(" ") for aut in author.split(",") if aut.strip()]
+    return "".join(index_entry(n[-1] + ", " + " ".join(n[:-1]), n[-1]) for n in speakers)
 
 
 def join_page_numbers(page_numbers):
@@ -56,13 +114,14 @@ def join_page_numbers(page_numbers):
 def group_by_last_name(entries) -> List[List[str]]:
     alphabetized_names = defaultdict(list)
     for entry in entries:
-        last_name = entry["last_name"]
-        alphabetized_names[homoglyph(last_name)].append(entry)
+        alphabetized_names[initial(entry["last_name"])].append(entry)
     output = []
-    letters = list(alphabetized_names.keys())
-    letters.sort()
-    for letter in letters:
-        alphabetized_names[letter].sort(key=lambda x: (x["last_name"], x["first_name"]))
+    for letter in sorted(alphabetized_names):
+        alphabetized_names[letter].sort(
+            key=lambda x: name_key(
+                x["last_name"], x["first_name"], x.get("middle_name") or ""
+            )
+        )
         output.append(alphabetized_names[letter])
     return output
 
@@ -75,23 +134,40 @@ def to_string_sorting_by_last_name(entries) -> str:
     return ", ".join(res)
 
 
-def homoglyph(name: str) -> str:
-    for s, h in HOMOGLYPHS.items():
-        if name.startswith(s):
-            return h
-    return name[0].lower()
-
-
 def program_date(date) -> str:
     return date.strftime("%A, %B %-d, %Y")
 
 
+def get_conference_dates(conference) -> str:
+    start_date = conference["start_date"]
+    end_date = conference["end_date"]
+    start_month = start_date.strftime("%B")
+    end_month = end_date.strftime("%B")
+    if start_month == end_month:
+        if start_date.day == end_date.day:
+            return f"{start_month} {start_date.day}"
+        return f"{start_month} {start_date.day}-{end_date.day}"
+    return f"{start_month} {start_date.day} - {end_month} {end_date.day}"
+
+
 def session_times(session) -> str:
     start = session["start_time"].strftime("%H:%M")
     end = session["end_time"].strftime("%H:%M")
     return f"{start} - {end}"
 
 
+def bytecode_cache():
+    """
+    Compiled templates are kept in a per-user directory of the system temp
+    folder, keyed by their source, so that each process does not parse the
+    templates again. Without a writable temp folder they are compiled as usual.
+    """
+    try:
+        return jinja2.FileSystemBytecodeCache()
+    except RuntimeError:
+        return None
+
+
 LATEX_JINJA_ENV = jinja2.Environment(
     block_start_string=r"\BLOCK{",
     block_end_string="}",
@@ -102,6 +178,7 @@ LATEX_JINJA_ENV = jinja2.Environment(
     trim_blocks=True,
     autoescape=False,
     loader=jinja2.FileSystemLoader(str(TEMPLATE_DIR)),
+    bytecode_cache=bytecode_cache(),
 )
 LATEX_JINJA_ENV.globals.update(
     load_file=load_file,
@@ -113,6 +190,7 @@ LATEX_JINJA_ENV.globals.update(
     join_page_numbers=join_page_numbers,
     index_author=index_author,
     index_speakers=index_speakers,
+    print_author_index=print_author_index,
 )
 
 
@@ -0,0 +1,276 @@
+"""
+A native watermarking backend that stamps the ACL footer and page numbers
+directly onto the pages of a camera-ready PDF, without a LaTeX round trip.
+
+The layout mirrors templates/watermarked_pdf.tex: a two-line footnotesize
+footer on the first page whose first baseline sits 13mm above the bottom edge,
+and a plain page number in the footer of every page. Since the original page
+objects are kept, the paper's annotations and internal links survive untouched.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PyPDF2 import PdfFileReader, PdfFileWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+
+from aclpub2.cache import BuildCache, hash_file, hash_strings
+from aclpub2.templates import get_conference_dates
+
+import unicodedata
+
+MM = 72 / 25.4
+
+# \footnotesize and \normalsize of the 11pt book class.
+WATERMARK_FONT_SIZE = 9
+WATERMARK_BASELINE_SKIP = 11
+WATERMARK_BASELINE = 13 * MM
+PAGE_NUMBER_FONT_SIZE = 10.95
+PAGE_NUMBER_BASELINE = 20 * MM
+
+ROMAN = "/ACLPubRoman"
+ITALIC = "/ACLPubItalic"
+FONTS = {ROMAN: "/Times-Roman", ITALIC: "/Times-Italic"}
+
+# Advance widths (in 1/1000 em) of the printable ASCII range of the standard
+# Times fonts, taken from their Adobe font metrics, under WinAnsiEncoding.
+_ROMAN_WIDTHS = (
+    "250 333 408 500 500 833 778 180 333 333 500 564 250 333 250 278 "
+    "500 500 500 500 500 500 500 500 500 500 278 278 564 564 564 444 "
+    "921 722 667 667 722 611 556 722 722 333 389 722 611 889 722 722 "
+    "556 722 667 556 611 722 722 944 722 722 611 333 278 333 469 500 "
+    "333 444 500 444 500 444 333 500 500 278 278 500 278 778 500 500 "
+    "500 500 333 389 278 500 500 722 500 500 444 480 200 480 541"
+)
+_ITALIC_WIDTHS = (
+    "250 333 420 500 500 833 778 214 333 333 500 675 250 333 250 278 "
+    "500 500 500 500 500 500 500 500 500 500 333 333 675 675 675 500 "
+    "920 611 611 667 722 611 611 722 722 333 444 667 556 833 667 722 "
+    "611 722 611 500 556 722 611 833 611 556 556 389 278 389 422 500 "
+    "333 500 500 444 500 444 278 500 500 278 278 444 278 722 500 500 "
+    "500 500 389 389 278 500 444 667 444 444 389 400 275 400 541"
+)
+WIDTHS = {
+    ROMAN: dict(zip(range(32, 127), map(int, _ROMAN_WIDTHS.split()))),
+    ITALIC: dict(zip(range(32, 127), map(int, _ITALIC_WIDTHS.split()))),
+}
+# Non-ASCII WinAnsi characters that appear in the footer.
+for _widths in WIDTHS.values():
+    _widths.update({0x96: 500, 0xA9: 760})
+
+LATEX_REPLACEMENTS = [
+    ("\\textcopyright", "©"),
+    ("\\&", "&"),
+    ("\\%", "%"),
+    ("\\_", "_"),
+    ("\\#", "#"),
+    ("\\$", "$"),
+    ("---", "—"),
+    ("--", "–"),
+    ("~", " "),
+    ("{", ""),
+    ("}", ""),
+]
+
+
+def latex_to_text(text: str) -> str:
+    for latex, plain in LATEX_REPLACEMENTS:
+        text = text.replace(latex, plain)
+    return text
+
+
+def encode_text(text: str) -> bytes:
+    """
+    Encodes text for a WinAnsi-encoded standard font. Characters outside of
+    that encoding are replaced by their unaccented base letter if possible.
+    """
+    encoded = bytearray()
+    for char in text:
+        try:
+            encoded += char.encode("cp1252")
+        except UnicodeEncodeError:
+            base = unicodedata.normalize("NFKD", char)[:1]
+            encoded += base.encode("cp1252", errors="replace")
+    return bytes(encoded)
+
+
+def text_width(data: bytes, font: str, size: float) -> float:
+    widths = WIDTHS[font]
+    return sum(widths.get(byte, 500) for byte in data) * size / 1000
+
+
+def pdf_string(data: bytes) -> bytes:
+    escaped = data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + escaped + b")"
+
+
+def watermark_lines(paper, conference) -> List[List[Tuple[str, str]]]:
+    """
+    Returns the footer as a list of lines, each a list of (font, text) runs.
+    """
+    title = conference.get("watermark_book_title") or conference["book_title"]
+    title_lines = [latex_to_text(line).strip() for line in title.split("\\\\")]
+    lines = [[(ITALIC, line)] for line in title_lines[:-1]]
+    lines.append(
+        [
+            (ITALIC, title_lines[-1]),
+            (ROMAN, f", pages {paper['start_page']}–{paper['end_page']}"),
+        ]
+    )
+    year = conference["start_date"].year
+    lines.append(
+        [
+            (
+                ROMAN,
+                f"{latex_to_text(get_conference_dates(conference))}, {year} © "
+                f"{year} Association for Computational Linguistics",
+            )
+        ]
+    )
+    return lines
+
+
+def display_transform(page) -> Tuple[float, float, List[float]]:
+    """
+    Returns the displayed width and height of a page, and the matrix mapping
+    displayed coordinates (origin at the visible bottom left corner) to the
+    page's user space, taking /Rotate and the crop box into account.
+    """
+    box = page.cropBox
+    x0, y0 = float(box.getLowerLeft_x()), float(box.getLowerLeft_y())
+    width = float(box.getWidth())
+    height = float(box.getHeight())
+    rotation = int(page.get("/Rotate", 0)) % 360
+    if rotation == 90:
+        return height, width, [0, 1, -1, 0, x0 + width, y0]
+    if rotation == 180:
+        return width, height, [-1, 0, 0, -1, x0 + width, y0 + height]
+    if rotation == 270:
+        return height, width, [0, -1, 1, 0, x0, y0 + height]
+    return width, height, [1, 0, 0, 1, x0, y0]
+
+
+def overlay_operators(lines, page_number: int, width: float, matrix: List[float]) -> bytes:
+    ops = [b"q", " ".join(f"{v:.4f}" for v in matrix).encode("ascii") + b" cm", b"0 g"]
+    baseline = WATERMARK_BASELINE
+    for line in lines:
+        runs = [(font, encode_text(text)) for font, text in line]
+        line_width = sum(text_width(data, font, WATERMARK_FONT_SIZE) for font, data in runs)
+        ops.append(b"BT")
+        ops.append(f"{(width - line_width) / 2:.2f} {baseline:.2f} Td".encode("ascii"))
+        for font, data in runs:
+            ops.append(f"{font} {WATERMARK_FONT_SIZE} Tf".encode("ascii"))
+            ops.append(pdf_string(data) + b" Tj")
+        ops.append(b"ET")
+        baseline -= WATERMARK_BASELINE_SKIP
+    number = str(page_number).encode("ascii")
+    number_width = text_width(number, ROMAN, PAGE_NUMBER_FONT_SIZE)
+    ops.append(b"BT")
+    ops.append(f"{ROMAN} {PAGE_NUMBER_FONT_SIZE} Tf".encode("ascii"))
+    ops.append(f"{(width - number_width) / 2:.2f} {PAGE_NUMBER_BASELINE:.2f} Td".encode("ascii"))
+    ops.append(pdf_string(number) + b" Tj")
+    ops.append(b"ET")
+    ops.append(b"Q")
+    return b"\n".join(ops)
+
+
+def stream(data: bytes) -> DecodedStreamObject:
+    obj = DecodedStreamObject()
+    obj.setData(data)
+    return obj
+
+
+def stamp_page(page, lines, page_number: int, fonts: DictionaryObject):
+    width, _, matrix = display_transform(page)
+    contents = page.get("/Contents")
+    if contents is None:
+        original = []
+    elif isinstance(contents.getObject(), ArrayObject):
+        original = list(contents.getObject())
+    else:
+        original = [contents]
+    # Isolate the original content's graphics state from the overlay.
+    page[NameObject("/Contents")] = ArrayObject(
+        [stream(b"q\n")]
+        + original
+        + [stream(b"\nQ\n" + overlay_operators(lines, page_number, width, matrix))]
+    )
+    if "/Resources" not in page:
+        page[NameObject("/Resources")] = DictionaryObject()
+    resources = page["/Resources"]
+    if "/Font" not in resources:
+        resources[NameObject("/Font")] = DictionaryObject()
+    resources["/Font"].update(fonts)
+
+
+def font_dictionaries(writer: PdfFileWriter) -> DictionaryObject:
+    fonts = DictionaryObject()
+    for name, base_font in FONTS.items():
+        font = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject(base_font),
+                NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+            }
+        )
+        fonts[NameObject(name)] = writer._addObject(font)
+    return fonts
+
+
+def watermark_pdf(pdf_path: Path, output_path: Path, lines, start_page: int):
+    reader = PdfFileReader(str(pdf_path), strict=False)
+    writer = PdfFileWriter()
+    fonts = font_dictionaries(writer)
+    for i in range(reader.getNumPages()):
+        page = reader.getPage(i)
+        # As with \AddToShipoutPicture* in the template, only the first page
+        # gets the footer.
+        stamp_page(page, lines if i == 0 else [], start_page + i, fonts)
+        writer.addPage(page)
+    # Links into the paper may go through named destinations, which live in
+    # the document catalog rather than on the pages.
+    catalog = reader.trailer["/Root"]
+    writer_catalog = writer._root_object
+    if "/Names" in catalog and "/Dests" in catalog["/Names"]:
+        writer_catalog[NameObject("/Names")] = DictionaryObject(
+            {NameObject("/Dests"): catalog["/Names"].raw_get("/Dests")}
+        )
+    if "/Dests" in catalog:
+        writer_catalog[NameObject("/Dests")] = catalog.raw_get("/Dests")
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def create_native_watermarked_pdf(
+    paper,
+    conference,
+    root: Path,
+    cache: Optional[BuildCache] = None,
+    pdf_path: Optional[Path] = None,
+    build_dir: Path = Path("build"),
+):
+    """
+    The native counterpart of generate.create_watermarked_pdf.
+    """
+    watermarked_pdfs = Path(build_dir, "watermarked_pdfs")
+    output_path = Path(watermarked_pdfs, f"{paper['id']}.pdf")
+    if pdf_path is None:
+        pdf_path = Path(root, "papers", paper["file"])
+    lines = watermark_lines(paper, conference)
+    cache_key = None
+    if cache is not None:
+        cache_key = hash_strings(
+            "native", hash_file(pdf_path), repr(lines), paper["start_page"]
+        )
+        if cache.fetch("watermarked_pdfs", cache_key, output_path, ".pdf"):
+            print(f"Reusing cached {paper['id']}")
+            return
+    print(f"Watermarking {paper['id']}")
+    watermark_pdf(pdf_path, output_path, lines, paper["start_page"])
+    if cache is not None:
+        cache.put("watermarked_pdfs", cache_key, output_path, ".pdf")
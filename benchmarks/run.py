@@ -0,0 +1,231 @@
+"""
+Times the Python stages of the proceedings and handbook builds on synthetic
+conferences, and reports regressions against a stored baseline, by default
+benchmarks/baseline.json. Neither TeX nor Java is needed.
+
+    PYTHONPATH=. python3 -m benchmarks.run --sizes 100 1000
+    PYTHONPATH=. python3 -m benchmarks.run --save-baseline benchmarks/baseline.json
+    PYTHONPATH=. python3 -m benchmarks.run --baseline my_baseline.json
+"""
+from pathlib import Path
+from typing import Callable, Dict
+
+from aclpub2.cache import BuildCache
+from aclpub2.config import load_configs, load_configs_handbook
+from aclpub2.generate import process_papers, process_program, process_program_handbook
+from aclpub2.templates import collect_author_index, get_conference_dates, load_template
+from benchmarks.synthetic import write_conference
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = [100, 1000, 10000]
+# Recorded with the default sizes and repeats.
+DEFAULT_BASELINE = Path(Path(__file__).parent, "baseline.json")
+
+
+def best_time(function: Callable, repeat: int):
+    """
+    Returns the fastest of repeat runs of function, and its last result.
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(root: Path, repeat: int) -> Dict[str, float]:
+    timings = {}
+
+    def timed(name, function):
+        timings[name], result = best_time(function, repeat)
+        return result
+
+    (
+        conference,
+        papers,
+        sponsors,
+        prefaces,
+        organizing_committee,
+        program_committee,
+        invited_talks,
+        panels,
+        additional_pages,
+        program,
+    ) = timed("load_configs", lambda: load_configs(root, unattended=True))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # The first run stores the snapshot, the fastest one loads it.
+        cache = BuildCache(Path(cache_dir))
+        timed(
+            "load_configs snapshot",
+            lambda: load_configs(root, unattended=True, cache=cache),
+        )
+    id_to_paper, alphabetized_author_index, archival_papers = timed(
+        "process_papers", lambda: process_papers(papers, root)
+    )
+    sessions_by_date = timed("process_program", lambda: process_program(program))
+    paper_pdfs = {
+        paper["id"]: Path(root, "papers", paper["file"]) for paper in archival_papers
+    }
+    template = load_template("proceedings")
+    timed(
+        "render proceedings.tex",
+        lambda: template.render(
+            root=str(root),
+            conference=conference,
+            conference_dates=get_conference_dates(conference),
+            sponsors=sponsors,
+            prefaces=prefaces,
+            organizing_committee=organizing_committee,
+            program_committee=program_committee,
+            invited_talks=invited_talks,
+            panels=panels,
+            additional_pages=additional_pages,
+            archival_papers=archival_papers,
+            id_to_paper=id_to_paper,
+            program=sessions_by_date,
+            alphabetized_author_index=alphabetized_author_index,
+            include_papers=True,
+            paper_pdfs=paper_pdfs,
+            nopax=False,
+        ),
+    )
+
+    (
+        conference,
+        papers,
+        sponsors,
+        prefaces,
+        organizing_committee,
+        program_committee,
+        tutorial_program,
+        tutorials,
+        invited_talks,
+        panels,
+        additional_pages,
+        program,
+        program_overview,
+        workshops,
+        workshop_programs,
+        workshop_papers,
+    ) = timed("load_configs_handbook", lambda: load_configs_handbook(root))
+    # As in generate_handbook.
+    program_workshops = {
+        id: process_program(workshop_program)
+        for id, workshop_program in workshop_programs.items()
+    }
+    workshop_days = sorted({workshop["date"] for workshop in workshops})
+    id_to_paper = {str(paper["id"]): paper for paper in papers}
+    program = timed("process_program_handbook", lambda: process_program_handbook(program))
+    tutorial_program = process_program(tutorial_program, max_lines=350)
+    template = load_template("handbook")
+
+    def render_handbook():
+        with collect_author_index():
+            return template.render(
+                root=str(root),
+                conference=conference,
+                conference_dates=get_conference_dates(conference),
+                sponsors=sponsors,
+                prefaces=prefaces,
+                organizing_committee=organizing_committee,
+                program_committee=program_committee,
+                tutorial_program=tutorial_program,
+                tutorials=tutorials,
+                invited_talks=invited_talks,
+                panels=panels,
+                additional_pages=additional_pages,
+                papers=papers,
+                id_to_paper=id_to_paper,
+                program=program,
+                program_overview=program_overview,
+                workshops=workshops,
+                program_workshops=program_workshops,
+                workshop_days=workshop_days,
+                workshop_papers=workshop_papers,
+                build_dir="build",
+            )
+
+    timed("render handbook.tex", render_handbook)
+    return timings
+
+
+def find_regressions(results, baseline, tolerance: float, min_seconds: float):
+    """
+    Returns (size, stage, baseline seconds, seconds) for every stage that got
+    slower than the baseline by more than tolerance, ignoring differences
+    below min_seconds, which are mostly noise.
+    """
+    regressions = []
+    for size, timings in results.items():
+        for stage, seconds in timings.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * (1 + tolerance) and seconds - reference > min_seconds:
+                regressions.append((size, stage, reference, seconds))
+    return regressions
+
+
+def print_table(results, baseline):
+    for size, timings in results.items():
+        print(f"\n{size} papers")
+        for stage, seconds in timings.items():
+            line = f"  {stage:<28}{seconds:10.3f}s"
+            reference = baseline.get(size, {}).get(stage)
+            if reference:
+                line += f"  ({seconds / reference - 1:+.0%} vs. baseline)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest counts.")
+    parser.add_argument(
+        "--baseline",
+        default=str(DEFAULT_BASELINE),
+        help="Results of a previous run to compare against; an empty string skips the comparison.",
+    )
+    parser.add_argument("--save-baseline", help="Where to write the results of this run.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative slowdown above which a stage counts as a regression.",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.01,
+        help="Absolute slowdown below which a stage never counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            write_conference(Path(root), size)
+            results[str(size)] = benchmark(Path(root), args.repeat)
+    print_table(results, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    regressions = find_regressions(results, baseline, args.tolerance, args.min_seconds)
+    for size, stage, reference, seconds in regressions:
+        print(f"REGRESSION: {stage} on {size} papers took {seconds:.3f}s, baseline {reference:.3f}s")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
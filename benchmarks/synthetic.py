@@ -0,0 +1,326 @@
+"""
+Generates synthetic conferences, with the same structure as the examples,
+for benchmarking the Python stages of the build at arbitrary sizes.
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import random
+import yaml
+
+FIRST_NAMES = [
+    "Ana", "Björn", "Chen", "Dilek", "Émilie", "Farah", "Gabriel", "Hiroshi",
+    "Ingrid", "João", "Kateřina", "Luis", "Mónica", "Nikolai", "Olivier",
+    "Priya", "Quentin", "Rebecca", "Søren", "Tuğba", "Ulrich", "Vivian",
+    "Wei", "Xénia", "Yusuf", "Zoë",
+]
+LAST_NAME_SYLLABLES = [
+    "an", "ber", "ca", "dö", "el", "fan", "gu", "ha", "ić", "jo", "ka", "li",
+    "mü", "na", "ol", "pe", "qu", "ro", "sá", "ta", "ur", "ve", "wa", "xu",
+    "ya", "zé",
+]
+WORDS = (
+    "dialogue evaluation neural model language generation retrieval dataset "
+    "annotation multilingual transfer learning benchmark robust efficient "
+    "semantic parsing summarization translation speech grounding reasoning "
+    "knowledge graph entity discourse coherence bias fairness prompting "
+    "representation alignment low-resource adversarial contrastive"
+).split()
+INSTITUTIONS = [
+    "University of Edinburgh", "Universität Potsdam", "Google Research",
+    "Carnegie Mellon University", "KTH Royal Institute of Technology",
+    "Nara Institute of Science and Technology", "ETH Zürich", "Amazon",
+]
+
+
+@lru_cache(maxsize=None)
+def minimal_pdf(num_pages: int) -> bytes:
+    """
+    A valid PDF with num_pages empty A4 pages.
+    """
+    kids = " ".join(f"{3 + i} 0 R" for i in range(num_pages))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>",
+    ] + ["<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>"] * num_pages
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{obj}\nendobj\n".encode("ascii")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("ascii")
+    data += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode("ascii")
+    return data
+
+
+def dump(data, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+
+
+def write_tex(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text + "\n", encoding="utf-8")
+
+
+def person(rng: random.Random):
+    last_name = "".join(rng.choice(LAST_NAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    author = {"first_name": rng.choice(FIRST_NAMES), "last_name": last_name.capitalize()}
+    if rng.random() < 0.1:
+        author["middle_name"] = rng.choice("ABCDEFGHJKLMNPRSTW") + "."
+    return author
+
+
+def sentence(rng: random.Random, num_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(num_words)).capitalize()
+
+
+def paper_title(rng: random.Random) -> str:
+    title = sentence(rng, rng.randint(5, 12))
+    # Characters that load_configs has to escape.
+    if rng.random() < 0.1:
+        title += " & 100% of_it"
+    return title
+
+
+def paper_slots(paper_ids, day: date, hour: int):
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+    slots = []
+    for i, paper_id in enumerate(paper_ids):
+        slots.append(
+            {
+                "id": paper_id,
+                "start_time": start + timedelta(minutes=15 * i),
+                "end_time": start + timedelta(minutes=15 * (i + 1)),
+            }
+        )
+    return slots
+
+
+def program(rng: random.Random, paper_ids, days):
+    """
+    A program.yml with the papers spread over days, in sessions of parallel
+    subsessions, separated by breaks.
+    """
+    entries = []
+    per_day = -(-len(paper_ids) // len(days))
+    for day_index, day in enumerate(days):
+        day_papers = paper_ids[day_index * per_day : (day_index + 1) * per_day]
+        hour = 9
+        session_number = 1
+        while day_papers:
+            session_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+            subsessions = []
+            for track in range(rng.randint(2, 4)):
+                track_papers, day_papers = day_papers[:5], day_papers[5:]
+                if not track_papers:
+                    break
+                subsessions.append(
+                    {
+                        "title": f"{sentence(rng, 3)} ({track + 1})",
+                        "start_time": session_start,
+                        "end_time": session_start + timedelta(minutes=15 * len(track_papers)),
+                        "chair": " ".join(person(rng).values()),
+                        "location": f"Room {track + 1}",
+                        "papers": paper_slots(track_papers, day, hour),
+                    }
+                )
+            entries.append(
+                {
+                    "title": f"Session {day_index + 1}.{session_number}",
+                    "start_time": session_start,
+                    "end_time": session_start + timedelta(hours=1, minutes=15),
+                    "subsessions": subsessions,
+                }
+            )
+            entries.append(
+                {
+                    "title": "Break",
+                    "start_time": session_start + timedelta(hours=1, minutes=15),
+                    "end_time": session_start + timedelta(hours=1, minutes=30),
+                }
+            )
+            # Keep all sessions of a day on the same date.
+            hour = 9 + (hour - 8) % 14
+            session_number += 1
+    return entries
+
+
+def write_conference(root: Path, num_papers: int, seed: int = 0):
+    """
+    Writes a conference of num_papers papers to root, with everything that
+    load_configs and load_configs_handbook read, and everything that the
+    proceedings and handbook templates load.
+    """
+    rng = random.Random(seed)
+    num_days = max(3, num_papers // 500)
+    days = [date(2020, 7, 1) + timedelta(days=i) for i in range(num_days)]
+    dump(
+        {
+            "book_title": "Proceedings of the 1st Synthetic Conference on Benchmarking",
+            "event_name": "Synthetic Conference on Benchmarking",
+            "cover_subtitle": "Proceedings of the Conference",
+            "anthology_venue_id": "SYNTH",
+            "volume_name": "main",
+            "start_date": days[0],
+            "end_date": days[-1],
+            "isbn": "978-1-952148-02-6",
+            "location": "Online",
+            "editors": [person(rng) for _ in range(4)],
+            "publisher": "Association for Computational Linguistics",
+        },
+        Path(root, "conference_details.yml"),
+    )
+
+    papers = []
+    for i in range(1, num_papers + 1):
+        num_pages = rng.randint(4, 12)
+        file = f"{i}.pdf"
+        Path(root, "papers").mkdir(parents=True, exist_ok=True)
+        Path(root, "papers", file).write_bytes(minimal_pdf(num_pages))
+        paper = {
+            # A string, so that the proceedings and the handbook agree on it.
+            "id": str(i),
+            "title": paper_title(rng),
+            "authors": [person(rng) for _ in range(rng.randint(1, 6))],
+            "abstract": " ".join(sentence(rng, 12) + "." for _ in range(8)),
+            "file": file,
+        }
+        if rng.random() < 0.02:
+            paper["archival"] = False
+        papers.append(paper)
+    dump(papers, Path(root, "papers.yml"))
+    paper_ids = [paper["id"] for paper in papers]
+    dump(program(rng, paper_ids, days), Path(root, "program.yml"))
+
+    committee = [
+        dict(person(rng), institution=rng.choice(INSTITUTIONS))
+        for _ in range(max(20, num_papers // 2))
+    ]
+    dump(
+        [
+            {"role": "Senior Program Committee", "entries": committee[:10]},
+            {"role": "Program Committee", "entries": committee[10:]},
+        ],
+        Path(root, "program_committee.yml"),
+    )
+    dump(
+        [
+            {"role": "General Chair", "members": [dict(person(rng), institution=INSTITUTIONS[0])]},
+            {"role": "Program Chairs", "members": [dict(person(rng), institution=INSTITUTIONS[1])]},
+        ],
+        Path(root, "organizing_committee.yml"),
+    )
+    dump([{"tier": "Gold", "logos": ["gold.png"]}], Path(root, "sponsors.yml"))
+    dump([{"title": "Introduction", "file": "introduction.tex"}], Path(root, "prefaces.yml"))
+    write_tex(Path(root, "prefaces", "introduction.tex"), sentence(rng, 200))
+    talks = []
+    for i, day in enumerate(days, start=1):
+        talks.append(
+            {
+                "title": f"Invited {i}",
+                "abstract_file": f"invited{i}.tex",
+                "bio_file": f"invited{i}_bio.tex",
+                "speaker_name": " ".join(person(rng).values()),
+                "institution": rng.choice(INSTITUTIONS),
+                "date": datetime.combine(day, datetime.min.time()) + timedelta(hours=17),
+                "location": "Main Room",
+                "chair": " ".join(person(rng).values()),
+            }
+        )
+        write_tex(Path(root, "invited_talks", f"invited{i}.tex"), sentence(rng, 150))
+        write_tex(Path(root, "invited_talks", f"invited{i}_bio.tex"), sentence(rng, 80))
+    dump(talks, Path(root, "invited_talks.yml"))
+
+    # Handbook only.
+    tutorials = []
+    for i in range(1, 7):
+        tutorials.append(
+            {
+                "id": f"T{i}",
+                "title": f"Tutorial {i}: {sentence(rng, 5)}",
+                "file": f"tutorial{i}.tex",
+                "date": datetime.combine(days[0], datetime.min.time()) + timedelta(hours=9 + i),
+            }
+        )
+        write_tex(Path(root, "tutorials", f"tutorial{i}.tex"), sentence(rng, 150))
+    dump(tutorials, Path(root, "tutorials.yml"))
+    tutorial_slots = [
+        dict(slot, title=tutorial["title"], room=f"Hall {i}", authors=sentence(rng, 4))
+        for i, (slot, tutorial) in enumerate(
+            zip(paper_slots([t["id"] for t in tutorials], days[0], 9), tutorials), start=1
+        )
+    ]
+    dump(
+        [
+            {
+                "title": "Tutorials",
+                "start_time": tutorial_slots[0]["start_time"],
+                "end_time": tutorial_slots[-1]["end_time"],
+                "subsessions": [
+                    {
+                        "title": "Morning Tutorials",
+                        "start_time": tutorial_slots[0]["start_time"],
+                        "end_time": tutorial_slots[-1]["end_time"],
+                        "tutorials": tutorial_slots,
+                    }
+                ],
+            }
+        ],
+        Path(root, "tutorial_program.yml"),
+    )
+    dump(
+        [{"title": f"Overview {i + 1}", "file": f"overview{i + 1}.tex"} for i in range(num_days)],
+        Path(root, "program_overview.yml"),
+    )
+    for i in range(num_days):
+        write_tex(Path(root, "program_overview", f"overview{i + 1}.tex"), sentence(rng, 100))
+
+    workshops = []
+    for i in range(1, max(2, num_papers // 100) + 1):
+        workshop_id = f"workshop_{i}"
+        workshop_date = datetime.combine(days[i % num_days], datetime.min.time())
+        workshops.append(
+            {
+                "id": workshop_id,
+                "title": f"Workshop on {sentence(rng, 4)}",
+                "chair": " ".join(person(rng).values()),
+                "location": f"Room {i}",
+                "url": f"https://example.org/{workshop_id}",
+                "date": workshop_date,
+                "abstract": sentence(rng, 60),
+            }
+        )
+        workshop_papers = [
+            {
+                "id": f"{workshop_id}_{j}",
+                "title": paper_title(rng),
+                "authors": [person(rng) for _ in range(rng.randint(1, 4))],
+            }
+            for j in range(1, rng.randint(10, 30) + 1)
+        ]
+        dump(workshop_papers, Path(root, "workshops", f"papers_{workshop_id}.yml"))
+        dump(
+            program(rng, [paper["id"] for paper in workshop_papers], [workshop_date.date()]),
+            Path(root, "workshops", f"program_{workshop_id}.yml"),
+        )
+    dump(workshops, Path(root, "workshops.yml"))
+
+    for folder in [
+        "front_page_handbook/front_page",
+        "harassment/harassment",
+        "meal/meal",
+        "social_event/social_event",
+        "tutorial_message/tutorial_message",
+        "local_guide/local_guide",
+        "venue_map/venue_map",
+        "sponsorship/sponsorship",
+    ]:
+        write_tex(Path(root, f"{folder}.tex"), sentence(rng, 100))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# ---------------------------------------------------------------------------
+# Concurrent, resumable downloads of paper PDFs and attachments.
+# ---------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, NamedTuple
+from tqdm import tqdm
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Every completed download is appended to this file, so that an interrupted
+# export can be resumed.
+DOWNLOAD_MANIFEST = "downloads.jsonl"
+
+
+class Download(NamedTuple):
+    # Where to write the file.
+    path: str
+    # The OpenReview field value of the file, e.g. /pdf/<hash>.pdf, which
+    # changes when a new version is uploaded.
+    source: str
+    # Returns the content of the file.
+    fetch: Callable[[], bytes]
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Returns the last manifest entry of every downloaded path.
+    """
+    entries = {}
+    if not os.path.exists(manifest_path):
+        return entries
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be cut off.
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+
+def is_downloaded(download, entry):
+    if entry is None or entry["source"] != download.source:
+        return False
+    if not os.path.exists(download.path) or os.path.getsize(download.path) != entry["size"]:
+        return False
+    return sha256_file(download.path) == entry["sha256"]
+
+
+def write_atomically(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.part-{threading.get_ident()}")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def fetch_file(download, retries=2):
+    for attempt in range(retries + 1):
+        try:
+            data = download.fetch()
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+    write_atomically(download.path, data)
+    return {
+        "path": download.path,
+        "source": download.source,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def download_files(downloads, manifest_path=DOWNLOAD_MANIFEST, jobs=8, retries=2):
+    """
+    Fetches the downloads with up to jobs requests at a time, skipping the
+    files that the manifest records with the same source and checksum.
+    Returns the downloads that failed, which a later run will try again.
+    """
+    manifest = load_manifest(manifest_path)
+    pending = [d for d in downloads if not is_downloaded(d, manifest.get(d.path))]
+    if len(pending) < len(downloads):
+        print(f"{len(downloads) - len(pending)} files are already downloaded")
+    failed = []
+    if not pending:
+        return failed
+    with ThreadPoolExecutor(max_workers=jobs) as pool, open(
+        manifest_path, "a", encoding="utf-8"
+    ) as log:
+        futures = {pool.submit(fetch_file, d, retries): d for d in pending}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            download = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"Unable to download {download.path} ({download.source}): {e}")
+                failed.append(download)
+                continue
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+    return failed
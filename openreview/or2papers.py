@@ -14,10 +14,12 @@ import yaml
 from tqdm import tqdm
 import sys
 from util import *
+from downloads import DOWNLOAD_MANIFEST, Download, download_files
+from functools import partial
 import openreview.api
 
 
-def main(username, password, venue, download_all, download_pdfs):
+def main(username, password, venue, download_all, download_pdfs, profile_cache=PROFILE_CACHE, profile_ttl=PROFILE_TTL, jobs=8):
     try:
         client_acl_v2 = openreview.api.OpenReviewClient(
             baseurl="https://api2.openreview.net", username=username, password=password
@@ -62,16 +64,25 @@ def main(username, password, venue, download_all, download_pdfs):
             if "accept" in r["content"]["decision"]["value"].lower()
         }
 
+    # Resolve the authors of all accepted papers at once, so that each author
+    # is fetched once, in batches.
+    accepted = [s for s in submissions if s.id in decision_by_forum]
+    users = get_users(
+        [i for s in accepted for i in get_content_from(s, "authorids")],
+        client_acl_v2,
+        cache_path=profile_cache,
+        ttl=profile_ttl,
+    )
+
     papers = []
+    downloads = []
     abstract_flag, paper_type_flag, track_flag = False, False, False
     small_log = open("papers.log", "w")
-    for submission in tqdm(submissions):
-        if submission.id not in decision_by_forum:
-            continue
+    for submission in tqdm(accepted):
         authorsids = get_content_from(submission, "authorids")
         authors = []
         for authorsid in authorsids:
-            author, error = get_user(authorsid, client_acl_v2)
+            author, error = users[authorsid]
             if error:
                 small_log.write(
                     "Error at "
@@ -85,7 +96,8 @@ def main(username, password, venue, download_all, download_pdfs):
                     + "\n"
                 )
             if author:
-                authors.append(author)
+                # A copy, so that yaml.dump does not write anchors for authors of several papers.
+                authors.append(dict(author))
         assert len(authors) > 0
 
         if "abstract" in submission.content:
@@ -151,24 +163,24 @@ def main(username, password, venue, download_all, download_pdfs):
                 )
                 if download_all:
                     file_tye = get_content_from(submission, att_type).split(".")[-1]
-                    f = client_acl_v2.get_attachment(submission.id, att_type)
-                    with open(
-                        os.path.join(
-                            attachments_folder, str(paper["id"]) + suffix + "." + file_tye
-                        ),
-                        "wb",
-                    ) as op:
-                        op.write(f)
+                    downloads.append(
+                        Download(
+                            os.path.join(
+                                attachments_folder, str(paper["id"]) + suffix + "." + file_tye
+                            ),
+                            str(get_content_from(submission, att_type)),
+                            partial(client_acl_v2.get_attachment, submission.id, att_type),
+                        )
+                    )
                 attachments_count = attachments_count + 1
         if download_pdfs:
-            try:
-                f = client_acl_v2.get_pdf(id=paper["openreview_id"])
-                with open(
-                    os.path.join(papers_folder, str(paper["id"]) + ".pdf"), "wb"
-                ) as op:
-                    op.write(f)
-            except:
-                print(f"Unable to download PDF for {paper['openreview_id']}")
+            downloads.append(
+                Download(
+                    os.path.join(papers_folder, str(paper["id"]) + ".pdf"),
+                    str(get_content_from(submission, "pdf")),
+                    partial(client_acl_v2.get_pdf, id=paper["openreview_id"]),
+                )
+            )
 
         if len(attachments) > 0:
             paper["attachments"] = attachments
@@ -177,6 +189,12 @@ def main(username, password, venue, download_all, download_pdfs):
 
     small_log.close()
 
+    # Files are only fetched if they are missing, or changed on OpenReview
+    # since they were downloaded.
+    failed = download_files(downloads, DOWNLOAD_MANIFEST, jobs=jobs)
+    if failed:
+        print(f"Unable to download {len(failed)} files, run the script again to retry them")
+
     papers.sort(key=lambda p: p["id"])
     yaml.dump(papers, open("papers.yml", "w"), allow_unicode=True)
 
@@ -202,5 +220,32 @@ if __name__ == "__main__":
         action="store_true",
         help="If set, downloads PDFs.",
     )
+    parser.add_argument(
+        "--profile-cache",
+        type=str,
+        default=PROFILE_CACHE,
+        help="File in which to keep the fetched OpenReview profiles between runs.",
+    )
+    parser.add_argument(
+        "--profile-ttl",
+        type=float,
+        default=PROFILE_TTL / 3600,
+        help="Hours after which cached profiles are fetched again; 0 fetches every profile.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=8,
+        help="Maximum number of files to download at the same time.",
+    )
     args = parser.parse_args()
-    main(args.username, args.password, args.venue, args.all, args.pdfs)
+    main(
+        args.username,
+        args.password,
+        args.venue,
+        args.all,
+        args.pdfs,
+        profile_cache=args.profile_cache,
+        profile_ttl=args.profile_ttl * 3600,
+        jobs=args.jobs,
+    )
@@ -14,36 +14,19 @@ from tqdm import tqdm
 import sys 
 from util import *
 
-username = sys.argv[1]
-password = sys.argv[2]
-
-use_tracks = True
-
-try:
-    client_acl = openreview.api.OpenReviewClient(baseurl='https://api2.openreview.net', username=username, password=password)
-except:
-    print("OpenReview connection refused")
-    exit()
-
-acl_name = 'aclweb.org/ACL/2022/Conference' if len(sys.argv)<=3 else sys.argv[3]
-acl_name = acl_name.strip('/')
-
-try:
-    venue_group = client_acl.get_group(acl_name)
-    in_v2 = venue_group.domain is not None and venue_group.domain == venue_group.id
-except:
-    print(f"{acl_name} not found")
-    exit()
-
 def sort_role(t):
     return t["role"]
 def sort_user(t):
     return t["last_name"]
 
-def extract_or_data(client_acl, all_groups, role="Senior_Area_Chairs", or2acl={}):
-    lst = []
+def role_groups(all_groups, role):
     ## Groups will either look like venue_id/role or venue_id/track/role
-    for i, group in enumerate([g for g in all_groups if any(role == entry for entry in g.id.split('/'))]):
+    return [g for g in all_groups if any(role == entry for entry in g.id.split('/'))]
+
+def extract_or_data(users, all_groups, acl_name, role="Senior_Area_Chairs", or2acl={}):
+    # users maps every member to get_users' (user, error), see below.
+    lst = []
+    for i, group in enumerate(role_groups(all_groups, role)):
         # print(i, group.id)
         track = group.id.replace(acl_name, '').replace(role, '').strip('/')
         if len(track) > 0:
@@ -60,17 +43,18 @@ def extract_or_data(client_acl, all_groups, role="Senior_Area_Chairs", or2acl={}
         for member in group.members:
                 # print(member)
                 # if member[0] == "~":
-                user, error = get_user(member, client_acl) #get_user(member.content['reviewer_id'], client_acl)
+                user, error = users[member]
                 # else:
                 #     user = get_user_by_email(member, client_acl)
                 if not error:
-                    t["entries"].append(user)
+                    # A copy, so that yaml.dump does not write anchors for people in several roles.
+                    t["entries"].append(dict(user))
         t["entries"].sort(key=sort_user)
         t = None
     lst.sort(key=sort_role)
     return lst
 
-def get_committee(acl_name):
+def get_committee(client_acl, acl_name):
     if acl_name[-1] != "/":
         acl_name += "/"
     committees = []
@@ -88,39 +72,81 @@ def get_committee(acl_name):
     return committees
 
 
-if use_tracks:
-    use_tracks = ".*/"
-else:
-    use_tracks = ""
-
-## for debug
-# committees = get_committee(acl_name)
-# print(committees)
-
-# Fetch all groups and filter out the paper/submission groups
-all_groups = client_acl.get_all_groups(prefix = f"{acl_name}/.*")
-if not in_v2:
-    all_groups = [g for g in all_groups if 'Paper' not in g.id]
-else:
-    all_groups = [g for g in all_groups if 'Submission' not in g.id]
-
-program_committee = []
-
-# get PCs
-program_committee = extract_or_data(client_acl, all_groups, role="Program_Chairs")
-
-# get SACs
-or2acl = {} # You can use this dictionary to replace OpenReview field names with others you want to use in the proceedings
-program_committee.extend(extract_or_data(client_acl, all_groups, role="Senior_Area_Chairs", or2acl=or2acl))
-
-# get ACs
-program_committee.extend(extract_or_data(client_acl, all_groups, role="Area_Chairs", or2acl=or2acl))
-
-# get reviewers
-aux = extract_or_data(client_acl, all_groups, role="Reviewers", or2acl=or2acl)
-for reviewer in aux:
-    reviewer["type"]="name_block"
-program_committee.extend(aux)
-
-
-yaml.dump(program_committee, open('program_committee.yml', 'w'), allow_unicode=True)
+def main(username, password, acl_name):
+    use_tracks = True
+
+    try:
+        client_acl = openreview.api.OpenReviewClient(baseurl='https://api2.openreview.net', username=username, password=password)
+    except:
+        print("OpenReview connection refused")
+        exit()
+
+    acl_name = acl_name.strip('/')
+
+    try:
+        venue_group = client_acl.get_group(acl_name)
+        in_v2 = venue_group.domain is not None and venue_group.domain == venue_group.id
+    except:
+        print(f"{acl_name} not found")
+        exit()
+
+    if use_tracks:
+        use_tracks = ".*/"
+    else:
+        use_tracks = ""
+
+    ## for debug
+    # committees = get_committee(client_acl, acl_name)
+    # print(committees)
+
+    # Fetch all groups and filter out the paper/submission groups
+    all_groups = client_acl.get_all_groups(prefix = f"{acl_name}/.*")
+    if not in_v2:
+        all_groups = [g for g in all_groups if 'Paper' not in g.id]
+    else:
+        all_groups = [g for g in all_groups if 'Submission' not in g.id]
+
+    yaml.dump(
+        get_program_committee(client_acl, all_groups, acl_name),
+        open('program_committee.yml', 'w'),
+        allow_unicode=True,
+    )
+
+
+def get_program_committee(client_acl, all_groups, acl_name, cache_path=PROFILE_CACHE):
+    roles = ["Program_Chairs", "Senior_Area_Chairs", "Area_Chairs", "Reviewers"]
+
+    # The same person is often a member of several tracks and roles, so all
+    # distinct members are resolved at once, and shared between the roles.
+    users = get_users(
+        [member for role in roles for group in role_groups(all_groups, role) for member in group.members],
+        client_acl,
+        cache_path=cache_path,
+    )
+
+    program_committee = []
+
+    # get PCs
+    program_committee = extract_or_data(users, all_groups, acl_name, role="Program_Chairs")
+
+    # get SACs
+    or2acl = {} # You can use this dictionary to replace OpenReview field names with others you want to use in the proceedings
+    program_committee.extend(extract_or_data(users, all_groups, acl_name, role="Senior_Area_Chairs", or2acl=or2acl))
+
+    # get ACs
+    program_committee.extend(extract_or_data(users, all_groups, acl_name, role="Area_Chairs", or2acl=or2acl))
+
+    # get reviewers
+    aux = extract_or_data(users, all_groups, acl_name, role="Reviewers", or2acl=or2acl)
+    for reviewer in aux:
+        reviewer["type"]="name_block"
+    program_committee.extend(aux)
+    return program_committee
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1],
+        sys.argv[2],
+        'aclweb.org/ACL/2022/Conference' if len(sys.argv)<=3 else sys.argv[3],
+    )
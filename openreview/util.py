@@ -7,6 +7,15 @@
 # version ='1.0'
 # ---------------------------------------------------------------------------
 
+import json
+import os
+import tempfile
+import time
+
+# The escaping rules are shared with the proceedings generator.
+from aclpub2.escape import tex_escape
+
+
 def join_institution(institution):
     if len(institution)==0:
         return None
@@ -17,27 +26,117 @@ def join_institution(institution):
     return res
 
 
-def get_user(or_id,client_acl, force_institution=False):
-    c = None
-    try:
-        c = client_acl.get_profile(or_id)
-    except:
-        print("\nERROR: or_id not found", or_id)
-        return {"first_name":or_id, "last_name":or_id,"name":or_id, "username":or_id, "emails":or_id, "institution":"NA"}, True
+# Profiles fetched from OpenReview are kept in this file between runs, and
+# fetched again once they are older than PROFILE_TTL seconds.
+PROFILE_CACHE = "openreview_profiles.json"
+PROFILE_TTL = 7 * 24 * 3600
+# Number of ids or emails sent in one search_profiles call.
+PROFILE_BATCH_SIZE = 500
+
+
+def missing_user(or_id):
+    return {"first_name":or_id, "last_name":or_id,"name":or_id, "username":or_id, "emails":or_id, "institution":"NA"}
+
+
+def load_profile_cache(cache_path, ttl=PROFILE_TTL):
+    """
+    Returns the cached profiles by OpenReview id or email, leaving out those
+    older than ttl seconds.
+    """
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
     try:
-        if or_id[0] == "~":
-            emails = client_acl.search_profiles(ids=[or_id])
-            assert len(emails) >= 1
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except ValueError:
+        return {}
+    now = time.time()
+    return {or_id: entry for or_id, entry in cache.items() if now - entry["fetched"] < ttl}
+
+
+def save_profile_cache(cache_path, cache):
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cache, f, default=str)
+    os.replace(tmp, cache_path)
+
+
+def search_profiles(client_acl, or_ids, batch_size=PROFILE_BATCH_SIZE):
+    """
+    Fetches the profiles of OpenReview ids (~First_Last1) and emails in
+    batches, and returns them as {"id": ..., "content": ...} by the id or
+    email they were asked for. Ids that are not found are left out.
+    """
+    ids = [or_id for or_id in or_ids if or_id.startswith("~")]
+    emails = [or_id for or_id in or_ids if not or_id.startswith("~")]
+    profiles = {}
+    for i in range(0, len(ids), batch_size):
+        batch = set(ids[i:i + batch_size])
+        for profile in client_acl.search_profiles(ids=sorted(batch)):
+            # The profile may have been asked for by an older username.
+            usernames = {profile.id} | {
+                name.get("username") for name in profile.content.get("names", [])
+            }
+            for or_id in usernames & batch:
+                profiles[or_id] = {"id": profile.id, "content": profile.content}
+    for i in range(0, len(emails), batch_size):
+        batch = emails[i:i + batch_size]
+        # Profiles come back as lists by lowercased email.
+        asked = {}
+        for email in batch:
+            asked.setdefault(email.lower(), []).append(email)
+        found = client_acl.search_profiles(emails=batch)
+        for email, profiles_list in found.items():
+            if not profiles_list:
+                continue
+            profile = profiles_list[0]
+            for or_id in asked.get(email.lower(), []):
+                profiles[or_id] = {"id": profile.id, "content": profile.content}
+    return profiles
+
+
+def get_users(or_ids, client_acl, force_institution=False, cache_path=None, ttl=PROFILE_TTL):
+    """
+    Returns (user, error) by OpenReview id or email, as get_user does for a
+    single one. Every distinct id is fetched at most once, in batched
+    search_profiles calls, and profiles found in the cache at cache_path are
+    not fetched at all.
+    """
+    or_ids = list(dict.fromkeys(or_ids))
+    cache = load_profile_cache(cache_path, ttl)
+    missing = [or_id for or_id in or_ids if or_id not in cache]
+    if missing:
+        now = time.time()
+        for or_id, profile in search_profiles(client_acl, missing).items():
+            cache[or_id] = {"fetched": now, "profile": profile}
+        if cache_path is not None:
+            save_profile_cache(cache_path, cache)
+    users = {}
+    for or_id in or_ids:
+        if or_id not in cache:
+            print("\nERROR: or_id not found", or_id)
+            users[or_id] = missing_user(or_id), True
         else:
-            emails = client_acl.search_profiles(ids=[c.id])
-            assert len(emails) >= 1
-            # emails = [or_id]
-    except:
+            users[or_id] = profile_to_user(or_id, cache[or_id]["profile"], force_institution)
+    return users
+
+
+def get_user(or_id,client_acl, force_institution=False):
+    return get_users([or_id], client_acl, force_institution)[or_id]
+
+
+def profile_to_user(or_id, profile, force_institution=False):
+    """
+    Turns a profile as returned by search_profiles into an author or
+    committee member entry.
+    """
+    c = profile["content"]
+    if not c.get("preferredEmail") and not c.get("emails"):
         print("\nERROR: or_id not associated to an email", or_id)
-        return {"first_name":or_id, "last_name":or_id,"name":or_id, "username":or_id, "emails":or_id, "institution":"NA"}, True
+        return missing_user(or_id), True
     # try:
     if True:
-        c = c.content
         namePrefered = None
         for name in c["names"]:
             if namePrefered==None or ('preferred' in name and name['preferred']):
@@ -63,10 +162,10 @@ def get_user(or_id,client_acl, force_institution=False):
             # if full name has no spaces, try to insert some based on capitalization/periods
             if " " not in name:
                 name2 = ""
-                for c in name:
-                    if c.isupper() and name2 and (name2[-1].islower() or name2[-1]=="."):
+                for ch in name:
+                    if ch.isupper() and name2 and (name2[-1].islower() or name2[-1]=="."):
                         name2 += " "    # insert a space
-                    name2 += c
+                    name2 += ch
                 name = name2
             first_name = name.split(" ")[0] if " " in name else ""
             if name.count(" ") > 1 and name.split(" ")[-1].lower() in ("ii", "iii", "iv", "jr", "jr."):
@@ -110,11 +209,11 @@ def get_user(or_id,client_acl, force_institution=False):
             if all(n.isupper() or n.islower() for n in last_name.split(" ")):
                 last_name = last_name.title()
 
-        if 'preferredEmail' in emails[0].content:
-            emails = emails[0].content['preferredEmail']
+        if c.get('preferredEmail'):
+            emails = c['preferredEmail']
         else:
-            emails = emails[0].content['emails'][0]
-        emails = emails.replace("_","\\_")
+            emails = c['emails'][0]
+        emails = tex_escape(emails)
 
         institution = []
         if 'history' in c:
@@ -14,6 +14,9 @@ import os
 import shutil
 import re
 
+# The escaping rules are shared with the proceedings generator.
+from aclpub2.escape import tex_escape
+
 with open("config.json") as f:
     config = json.load(f)
 
@@ -76,28 +79,6 @@ def full_name(first_name, last_name, middle_name=None):
     full_name = full_name.replace("  ", " ")
     return full_name
 
-def tex_escape(text):
-    """
-        :param text: a plain text message
-        :return: the message escaped to appear correctly in LaTeX
-    """
-    conv = {
-        '&': r'\&',
-        '%': r'\%',
-        '$': r'\$',
-        '#': r'\#',
-        '_': r'\_',
-        '{': r'\{',
-        '}': r'\}',
-        '~': r'\textasciitilde{}',
-        '^': r'\^{}',
-        '\\': r'\textbackslash{}',
-        '<': r'\textless{}',
-        '>': r'\textgreater{}',
-    }
-    regex = re.compile('|'.join(re.escape(str(key)) for key in sorted(conv.keys(), key = lambda item: - len(item))))
-    return regex.sub(lambda match: conv[match.group()], text)
-
 # helper function for SOFTCONF scraping
 def follow_link_by_text(br, text):
     """
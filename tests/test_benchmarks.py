@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from benchmarks.run import DEFAULT_BASELINE, DEFAULT_SIZES, benchmark, find_regressions
+from benchmarks.synthetic import write_conference
+from aclpub2.config import load_configs
+from aclpub2.generate import process_papers
+
+import json
+
+
+def test_synthetic_conference(tmp_path):
+    write_conference(tmp_path, 20)
+    conference, papers, *_ = load_configs(tmp_path, unattended=True)
+    assert len(papers) == 20
+    _, _, archival_papers = process_papers(papers, tmp_path)
+    assert all(paper["num_pages"] >= 4 for paper in archival_papers)
+
+    timings = benchmark(tmp_path, repeat=1)
+    assert "render handbook.tex" in timings
+    # The stored baseline covers every stage at every default size.
+    with open(DEFAULT_BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    assert sorted(baseline) == sorted(str(size) for size in DEFAULT_SIZES)
+    assert all(set(stages) == set(timings) for stages in baseline.values())
+
+
+def test_find_regressions():
+    baseline = {"100": {"load_configs": 1.0, "process_papers": 0.001}}
+    results = {"100": {"load_configs": 1.5, "process_papers": 0.005, "new stage": 1.0}}
+    assert find_regressions(results, baseline, 0.25, 0.01) == [
+        ("100", "load_configs", 1.0, 1.5)
+    ]
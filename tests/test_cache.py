@@ -0,0 +1,21 @@
+from aclpub2.cache import BuildCache, hash_file, hash_strings
+
+
+def test_hash_strings_separates_parts():
+    assert hash_strings("ab", "c") != hash_strings("a", "bc")
+    assert hash_strings("a", "b") == hash_strings("a", "b")
+
+
+def test_build_cache_roundtrip(tmp_path):
+    source = tmp_path / "paper.pdf"
+    source.write_bytes(b"%PDF-1.4 content")
+    cache = BuildCache(tmp_path / "cache")
+    key = hash_strings(hash_file(source), "rendered template")
+
+    assert cache.get("watermarked_pdfs", key, ".pdf") is None
+    destination = tmp_path / "out.pdf"
+    assert not cache.fetch("watermarked_pdfs", key, destination, ".pdf")
+
+    cache.put("watermarked_pdfs", key, source, ".pdf")
+    assert cache.fetch("watermarked_pdfs", key, destination, ".pdf")
+    assert destination.read_bytes() == source.read_bytes()
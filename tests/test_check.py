@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from PyPDF2 import PdfFileWriter
+
+from aclpub2.check import check_inputs
+
+import shutil
+
+ROOT = Path(__file__).parent.parent
+
+
+def write_blank_pdf(path: Path, width: float, height: float):
+    writer = PdfFileWriter()
+    writer.addBlankPage(width=width, height=height)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_check_inputs_reports_all_problems(tmp_path):
+    shutil.copy(Path(ROOT, "examples", "sigdial", "conference_details.yml"), tmp_path)
+    Path(tmp_path, "papers").mkdir()
+    write_blank_pdf(Path(tmp_path, "papers", "1.pdf"), 595, 842)
+    write_blank_pdf(Path(tmp_path, "papers", "2.pdf"), 612, 792)
+    Path(tmp_path, "papers.yml").write_text(
+        """
+- id: 1
+  title: Fine
+  file: 1.pdf
+  authors: [{first_name: Ada, last_name: Lovelace}]
+- id: 2
+  title: Letter paper
+  file: 2.pdf
+  authors: [{first_name: Alan}]
+- id: 3
+  title: Missing
+  file: 3.pdf
+  authors: []
+- id: 3
+  title: Not archival
+  archival: false
+  authors: []
+- id: 5
+  title: No file
+  authors: []
+"""
+    )
+    Path(tmp_path, "program.yml").write_text(
+        """
+- title: Session 1
+  start_time: 2020-07-01 09:30:00
+  end_time: 2020-07-01 11:30:00
+  papers: [{id: 1}, {id: 4}]
+- title: Break
+  start_time: 2020-07-01 12:00
+"""
+    )
+
+    problems, warnings = check_inputs(tmp_path, processes=2)
+    assert sorted(problems) == [
+        "papers.yml: duplicate id 3",
+        "papers.yml: paper 3: " + str(Path(tmp_path, "papers", "3.pdf")) + " does not exist",
+        "papers.yml: paper 5: missing 'file'",
+        "papers.yml[1].authors[0]: missing 'last_name'",
+        "program.yml: session 'Session 1' lists paper 4, which is not in papers.yml",
+        "program.yml[1].start_time: expected datetime, got '2020-07-01 12:00'",
+        "program.yml[1]: missing 'end_time'",
+    ]
+    # Letter paper is scaled by the build, so it does not count as a problem.
+    assert warnings == ["paper 2 (2.pdf): page 1 is 612x792pt instead of A4 (595x842pt)"]
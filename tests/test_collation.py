@@ -0,0 +1,26 @@
+from aclpub2.collation import initial, sort_key
+from aclpub2.templates import group_by_last_name
+
+
+def test_sort_key_ignores_unicode_and_latex_accents():
+    assert sort_key("Müller") == sort_key(r'M\"{u}ller') == sort_key(r'M\"uller') == "muller"
+    assert sort_key("Şahin") == sort_key(r"\c{S}ahin") == sort_key(r"\c Sahin") == "sahin"
+    assert sort_key("Ødegaard") == sort_key(r"{\O}degaard") == "odegaard"
+    assert sort_key("Straße") == sort_key(r"Stra\ss e") == "strasse"
+    assert initial("Ångström") == initial(r"\AA ngstr\"om") == "a"
+
+
+def test_group_by_last_name():
+    entries = [
+        {"first_name": "Zoe", "last_name": "Zhang"},
+        {"first_name": "Ana", "last_name": r"\v{S}imko"},
+        {"first_name": "Ali", "last_name": "Şahin"},
+        {"first_name": "Bob", "last_name": "Smith"},
+        {"first_name": "Eve", "last_name": "Ødegaard"},
+        {"first_name": "Olga", "last_name": "Olsen"},
+    ]
+    assert [[entry["last_name"] for entry in group] for group in group_by_last_name(entries)] == [
+        ["Ødegaard", "Olsen"],
+        ["Şahin", r"\v{S}imko", "Smith"],
+        ["Zhang"],
+    ]
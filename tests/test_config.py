@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import aclpub2.config
+from aclpub2.cache import BuildCache
+from aclpub2.config import decode_snapshot, encode_snapshot, load_configs
+from datetime import date, datetime
+
+import json
+import pytest
+import shutil
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_load_configs_with_aliases(tmp_path):
+    for config in Path(ROOT, "examples", "sigdial").glob("*.yml"):
+        shutil.copy(config, tmp_path)
+    with open(Path(tmp_path, "program_committee.yml"), "w", encoding="utf-8") as f:
+        f.write(
+            "- role: Program Chairs\n"
+            "  entries:\n"
+            "  - &chair {first_name: Ada, last_name: Lovelace, institution: R&D Lab}\n"
+            "- role: Area Chairs\n"
+            "  entries:\n"
+            "  - *chair\n"
+        )
+    program_committee = load_configs(tmp_path, unattended=True)[5]
+    assert [block["entries"][0]["institution"] for block in program_committee] == [
+        r"R\&D Lab",
+        r"R\&D Lab",
+    ]
+
+
+def test_load_configs_uses_snapshot(tmp_path, monkeypatch):
+    root = Path(tmp_path, "sigdial")
+    root.mkdir()
+    for config in Path(ROOT, "examples", "sigdial").glob("*.yml"):
+        shutil.copy(config, root)
+    cache = BuildCache(Path(tmp_path, "cache"))
+    configs = load_configs(root, unattended=True, cache=cache)
+    assert configs == load_configs(root, unattended=True)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("configs were parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(aclpub2.config, "load_config", fail)
+        assert load_configs(root, unattended=True, cache=cache) == configs
+
+    with open(Path(root, "sponsors.yml"), "a", encoding="utf-8") as f:
+        f.write("\n# edited\n")
+    with monkeypatch.context() as m:
+        m.setattr(aclpub2.config, "load_config", fail)
+        with pytest.raises(AssertionError):
+            load_configs(root, unattended=True, cache=cache)
+
+    # A snapshot that cannot be read is parsed again instead.
+    snapshot, = Path(tmp_path, "cache", "configs").rglob("*.json")
+    snapshot.write_text('{"tuple": [{"dict": [[1]]}]}')
+    assert load_configs(root, unattended=True, cache=cache) == load_configs(root, unattended=True)
+
+
+def test_snapshot_round_trip():
+    configs = (
+        {"start_date": date(2022, 5, 22), "papers": [{"id": 1, "archival": False}]},
+        None,
+        {1: {"start_time": datetime(2022, 5, 23, 9, 30)}, "2": [1.5, "x"]},
+    )
+    data = json.loads(json.dumps(encode_snapshot(configs)))
+    assert decode_snapshot(data) == configs
+    with pytest.raises(TypeError):
+        encode_snapshot({"logo": b"\x89PNG"})
@@ -0,0 +1,16 @@
+from aclpub2.escape import normalize_latex_string, tex_escape
+
+
+def test_tex_escape():
+    assert tex_escape("A & B: 50% of $x_1^2$ {~#} \\ <>") == (
+        r"A \& B: 50\% of \$x\_1\^{}2\$ \{\textasciitilde{}\#\} \textbackslash{} \textless{}\textgreater{}"
+    )
+
+
+def test_normalize_latex_string_escapes_once():
+    assert normalize_latex_string("Q&A for 100% of snake_case") == r"Q\&A for 100\% of snake\_case"
+    assert normalize_latex_string("Don’t") == "Don't"
+    # Input that is already escaped, e.g. by an importer, is left alone.
+    escaped = tex_escape("Q&A for 100% of snake_case")
+    assert normalize_latex_string(escaped) == escaped
+    assert normalize_latex_string(r"3.6\% in BLEU") == r"3.6\% in BLEU"
@@ -1,4 +1,21 @@
-from aclpub2.generate import get_conference_dates
+from pathlib import Path
+
+import aclpub2.generate
+from aclpub2.generate import (
+    chunk_papers,
+    compile_handbook_sections,
+    generate_watermarked_pdfs,
+    get_conference_dates,
+    load_manifest,
+    render_watermarked_tex,
+    schedule_chunks,
+)
+from aclpub2.latex import CompilationError, LatexRun
+from aclpub2.scheduler import Scheduler
+from PyPDF2 import PdfFileReader, PdfFileWriter
+import json
+import pytest
+import re
 import yaml
 
 
@@ -26,3 +43,218 @@ end_date: 2020-02-02
     """
     )
     assert get_conference_dates(conference) == "January 1 - February 2"
+
+
+def test_render_watermarked_tex(tmp_path):
+    conference = yaml.safe_load(
+        """
+book_title: Proceedings of the Test Workshop
+start_date: 2020-01-01
+end_date: 2020-01-02
+    """
+    )
+    papers = [
+        {"id": 1, "file": "1.pdf", "start_page": 1, "end_page": 8},
+        {"id": 2, "file": "2.pdf", "start_page": 9, "end_page": 12},
+    ]
+    staged = Path(tmp_path, "staged.pdf")
+
+    rendered = render_watermarked_tex(papers, conference, tmp_path, {2: staged})
+
+    assert "pages 1--8" in rendered[1]
+    assert str(Path(tmp_path, "papers", "1.pdf")) in rendered[1]
+    assert str(staged) in rendered[2]
+    assert "January 1-2, 2020" in rendered[2]
+
+
+def flaky_watermark(paper, conference, root, cache, pdf_path, build_dir):
+    # Paper 2 always fails, paper 3 only on its first attempt.
+    marker = Path(root, f"{paper['id']}.attempted")
+    if paper["id"] == 2 or (paper["id"] == 3 and not marker.exists()):
+        marker.touch()
+        raise CompilationError(f"cannot compile {paper['id']}", "! LaTeX Error")
+
+
+def test_generate_watermarked_pdfs_collects_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("build").mkdir()
+    monkeypatch.setattr(aclpub2.generate, "create_native_watermarked_pdf", flaky_watermark)
+    papers = [{"id": i, "file": f"{i}.pdf"} for i in range(1, 4)]
+    papers.append({"id": 4, "file": "4.pdf", "archival": False})
+
+    report = generate_watermarked_pdfs(
+        papers, {}, tmp_path, watermark="native", unattended=True
+    )
+
+    assert [entry["status"] for entry in report["papers"]] == ["ok", "failed", "retried"]
+    assert report["papers"][1]["attempts"] == 2
+    assert report["papers"][1]["log"] == "! LaTeX Error"
+    with open(Path("build", "build_report.json")) as f:
+        assert json.load(f) == report
+
+
+def fake_compile_latex(tex_file, output_dir, args=(), quiet=False):
+    # Writes one blank page per page of the included papers, and fails on the
+    # paper bad.pdf.
+    tex = tex_file.read_text()
+    if "bad.pdf" in tex:
+        return LatexRun(1, 1, "! pdfTeX error")
+    with open(Path(output_dir, "compiled.txt"), "a") as f:
+        f.write(tex_file.stem + "\n")
+    writer = PdfFileWriter()
+    for start, end in re.findall(r"pages (\d+)--(\d+)", tex):
+        for _ in range(int(start), int(end) + 1):
+            writer.addBlankPage(width=595, height=842)
+    with open(tex_file.with_suffix(".pdf"), "wb") as f:
+        writer.write(f)
+    return LatexRun(0, 1, "")
+
+
+def test_watermark_batches_are_split_and_bisected(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(aclpub2.generate, "compile_latex", fake_compile_latex)
+    conference = yaml.safe_load(
+        """
+book_title: Proceedings of the Test Workshop
+start_date: 2020-01-01
+end_date: 2020-01-01
+    """
+    )
+    papers = [
+        {"id": i, "file": f"{i}.pdf", "start_page": 2 * i - 1, "end_page": 2 * i}
+        for i in range(1, 6)
+    ]
+    papers[2]["file"] = "bad.pdf"
+
+    report = generate_watermarked_pdfs(
+        papers, conference, tmp_path, batch=4, unattended=True, retries=0
+    )
+
+    assert [entry["status"] for entry in report["papers"]] == ["ok", "ok", "failed", "ok", "ok"]
+    watermarked = Path("build", "watermarked_pdfs")
+    assert sorted(path.name for path in watermarked.glob("*.pdf")) == [
+        "1.pdf",
+        "2.pdf",
+        "4.pdf",
+        "5.pdf",
+    ]
+    for i in (1, 2, 4, 5):
+        assert PdfFileReader(str(Path(watermarked, f"{i}.pdf"))).getNumPages() == 2
+    # The batch 1-4 failed, then 1-2 compiled and 3-4 was split again.
+    assert Path(watermarked, "batches", "compiled.txt").read_text().split() == ["1-2"]
+    assert sorted(Path(watermarked, "compiled.txt").read_text().split()) == ["4", "5"]
+
+
+def test_chunk_papers():
+    papers = []
+    for i, num_pages in enumerate([10, 2, 2, 2, 2, 2, 8, 12]):
+        start_page = papers[-1]["end_page"] + 1 if papers else 1
+        papers.append({"id": i, "start_page": start_page, "end_page": start_page + num_pages - 1})
+
+    chunks = chunk_papers(papers, 3)
+
+    assert [[paper["id"] for paper in chunk] for chunk in chunks] == [[0, 1, 2], [3, 4, 5, 6], [7]]
+    assert chunk_papers(papers, 1) == [papers]
+    assert chunk_papers([], 4) == []
+
+
+def test_schedule_chunks_joins_the_watermarked_papers(tmp_path, monkeypatch):
+    def compile_latex(*args, **kwargs):
+        raise AssertionError("chunks must not compile the papers again")
+
+    monkeypatch.setattr(aclpub2.generate, "compile_latex", compile_latex)
+    watermarked = Path(tmp_path, "watermarked_pdfs")
+    watermarked.mkdir()
+    papers = []
+    for i, num_pages in enumerate([3, 1, 2, 4]):
+        start_page = papers[-1]["end_page"] + 1 if papers else 1
+        papers.append({"id": i, "start_page": start_page, "end_page": start_page + num_pages - 1})
+        writer = PdfFileWriter()
+        for _ in range(num_pages):
+            writer.addBlankPage(width=595, height=842)
+        with open(Path(watermarked, f"{i}.pdf"), "wb") as f:
+            writer.write(f)
+
+    scheduler = Scheduler(jobs=2)
+    parts = schedule_chunks(scheduler, papers, tmp_path, 2, "main: ")
+    results, failures = scheduler.run()
+
+    assert failures == {}
+    assert list(parts) == ["main: chunk 0", "main: chunk 1"]
+    assert [PdfFileReader(str(part)).getNumPages() for part in parts.values()] == [6, 4]
+    assert not list(Path(tmp_path, "chunks").glob("*.tex"))
+
+    Path(watermarked, "2.pdf").unlink()
+    with pytest.raises(Exception, match="papers 2 were not watermarked"):
+        schedule_chunks(Scheduler(), papers, tmp_path, 2)
+
+
+def test_load_manifest(tmp_path):
+    manifest = Path(tmp_path, "volumes.yml")
+    manifest.write_text("- main\n- path: workshops/wnu\n- path: findings\n  name: findings-long\n")
+
+    assert load_manifest(manifest) == [
+        ("main", Path(tmp_path, "main")),
+        ("wnu", Path(tmp_path, "workshops/wnu")),
+        ("findings-long", Path(tmp_path, "findings")),
+    ]
+
+    manifest.write_text("- main\n- other/main\n")
+    with pytest.raises(ValueError, match="duplicate volume name"):
+        load_manifest(manifest)
+
+
+def fake_compile_part(tex_file):
+    # One page per paragraph of the document body, and an .aux file as LaTeX writes it.
+    body = tex_file.read_text().split("\\begin{document}", 1)[1]
+    setup = re.search(r"\\handbooksection\{(\d+)\}\{(\d+)\}", body)
+    page, chapter = (int(setup.group(1)), int(setup.group(2))) if setup else (1, 0)
+    aux = ""
+    for paragraph in body.split("\n\n"):
+        for title in re.findall(r"\\chapter\{([^}]*)\}", paragraph):
+            chapter += 1
+            aux += f"\\@writefile{{toc}}{{\\contentsline {{chapter}}{{{title}}}{{{page}}}{{chapter.{chapter}}}}}\n"
+        for label in re.findall(r"\\label\{([^}]*)\}", paragraph):
+            aux += f"\\newlabel{{{label}}}{{{{}}{{{page}}}}}\n"
+        for number in re.findall(r"\\aclindex\{(\d+)\}", paragraph):
+            aux += f"\\aclindexpage{{{number}}}{{{page}}}\n"
+        page += 1
+    tex_file.with_suffix(".aux").write_text(aux + f"\\handbooknextpage{{{page}}}\n")
+    writer = PdfFileWriter()
+    for _ in body.split("\n\n"):
+        writer.addBlankPage(width=420, height=595)
+    with open(tex_file.with_suffix(".pdf"), "wb") as f:
+        writer.write(f)
+
+
+def test_compile_handbook_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr(aclpub2.generate, "compile_part", fake_compile_part)
+    rendered_template = "\n".join(
+        [
+            "\\documentclass{book}",
+            "\\begin{document}",
+            "\\tableofcontents",
+            "",
+            "\\chapter{Workshops} see p.\\pageref{w1}",
+            "% handbook section",
+            "\\chapter{Workshop 1}\\label{w1}\\section{Talks}",
+            "",
+            "Ada\\aclindex{0}",
+            "% handbook section",
+            "\\begin{theindex}\\end{theindex}",
+            "\\end{document}",
+        ]
+    )
+
+    compile_handbook_sections(rendered_template, tmp_path)
+
+    sections = Path(tmp_path, "handbook_sections")
+    assert "\\handbooksection{5}{1}{0}{100000}" in Path(sections, "section_1.tex").read_text()
+    assert "\\handbooksection{8}{2}{1}{200000}" in Path(sections, "section_2.tex").read_text()
+    assert "\\newlabel{w1}{{}{5}}" in Path(sections, "section_0.refs").read_text()
+    assert "\\aclindexpage{0}{6}" in Path(sections, "section_2.refs").read_text()
+    assert Path(sections, "contents.toc").read_text() == (
+        "\\contentsline {chapter}{Workshops}{3}{chapter.1}\n"
+        "\\contentsline {chapter}{Workshop 1}{5}{chapter.2}\n"
+    )
+    assert PdfFileReader(str(Path(tmp_path, "handbook.pdf"))).getNumPages() == 9
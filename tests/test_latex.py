@@ -0,0 +1,141 @@
+from pathlib import Path
+
+import aclpub2.latex
+from aclpub2.latex import compile_latex, log_excerpt
+
+
+def fake_pdflatex(monkeypatch, tex_file: Path, aux_per_pass, log=""):
+    """
+    Replaces pdflatex by a function that writes the given .aux contents, one
+    per pass, and records the number of calls.
+    """
+    calls = []
+
+    def call(command, stdout=None, stderr=None):
+        aux = aux_per_pass[min(len(calls), len(aux_per_pass) - 1)]
+        tex_file.with_suffix(".aux").write_text(aux)
+        tex_file.with_suffix(".log").write_text(log)
+        calls.append(command)
+        return 0
+
+    monkeypatch.setattr(aclpub2.latex.subprocess, "call", call)
+    return calls
+
+
+# What hyperref writes to the .aux file of a document without references.
+HYPERREF_AUX = r"""\relax 
+\providecommand\hyper@newdestlabel[2]{}
+\providecommand\HyperFirstAtBeginDocument{\AtBeginDocument}
+\HyperFirstAtBeginDocument{\ifx\hyper@anchor\@undefined
+\global\let\oldnewlabel\newlabel
+\gdef\newlabel#1#2{\newlabelxx{#1}#2}
+\gdef\newlabelxx#1#2#3#4#5#6{\oldnewlabel{#1}{{#2}{#3}}}
+\AtEndDocument{\ifx\hyper@anchor\@undefined
+\let\newlabel\oldnewlabel
+\fi}
+\fi}
+\global\let\hyper@last\relax 
+\gdef\HyperFirstAtBeginDocument#1{#1}
+\providecommand\HyField@AuxAddToFields[1]{}
+\providecommand\HyField@AuxAddToCoFields[2]{}
+\gdef \@abspage@last{1}
+"""
+
+
+def test_single_pass_without_cross_references(tmp_path, monkeypatch):
+    tex_file = Path(tmp_path, "paper.tex")
+    calls = fake_pdflatex(monkeypatch, tex_file, [HYPERREF_AUX])
+    run = compile_latex(tex_file, tmp_path)
+    assert run.passes == 1
+    assert len(calls) == 1
+
+
+def test_reruns_until_stable(tmp_path, monkeypatch):
+    tex_file = Path(tmp_path, "proceedings.tex")
+    labels = HYPERREF_AUX + "\\newlabel{a}{{1}{1}{}{section.1}{}}\n"
+    fake_pdflatex(monkeypatch, tex_file, [labels])
+    assert compile_latex(tex_file, tmp_path).passes == 2
+
+    tex_file.with_suffix(".aux").unlink()
+    fake_pdflatex(monkeypatch, tex_file, ["\\relax\n"], log="Rerun to get outlines right")
+    assert compile_latex(tex_file, tmp_path, max_passes=3).passes == 3
+
+
+def test_formats_are_dumped_once_and_fall_back(tmp_path, monkeypatch):
+    format_dir = Path(tmp_path, "formats")
+    monkeypatch.setattr(aclpub2.latex, "_format_dir", format_dir)
+    monkeypatch.setattr(aclpub2.latex, "pdflatex_version", lambda: "pdfTeX 3.14")
+    tex_file = Path(tmp_path, "paper.tex")
+    tex_file.write_text("\\documentclass{book}\n\\begin{document}\nA\n\\end{document}\n")
+    calls = []
+
+    def call(command, stdout=None, stderr=None):
+        calls.append(list(command))
+        if "-ini" in command:
+            jobname = command[2].split("=", 1)[1]
+            Path(format_dir, f"{jobname}.fmt").write_text("format")
+            return 0
+        tex_file.with_suffix(".aux").write_text("\\relax\n")
+        # The document fails when started from the format.
+        return 1 if "broken" in tex_file.read_text() and "-fmt" in command[1] else 0
+
+    monkeypatch.setattr(aclpub2.latex.subprocess, "call", call)
+    compile_latex(tex_file, tmp_path)
+    compile_latex(tex_file, tmp_path)
+    assert sum("-ini" in command for command in calls) == 1
+    assert [command[1].startswith("-fmt=") for command in calls[1:]] == [True, True]
+    assert [path.suffix for path in format_dir.iterdir()] == [".fmt"]
+
+    # Another preamble gets another format, and the build does not depend on it.
+    calls.clear()
+    tex_file.write_text("\\documentclass{article}\n\\begin{document}\nbroken\n\\end{document}\n")
+    run = compile_latex(tex_file, tmp_path)
+    assert run.returncode == 0 and run.passes == 1
+    assert ["-ini" in calls[0], calls[1][1].startswith("-fmt="), calls[2][1]] == [
+        True,
+        True,
+        f"-output-directory={tmp_path}",
+    ]
+
+
+def test_formats_are_dumped_again_when_an_input_changes(tmp_path, monkeypatch):
+    format_dir = Path(tmp_path, "formats")
+    monkeypatch.setattr(aclpub2.latex, "_format_dir", format_dir)
+    monkeypatch.setattr(aclpub2.latex, "pdflatex_version", lambda: "pdfTeX 3.14")
+    Path(tmp_path, "setup").mkdir()
+    macros = Path(tmp_path, "setup", "macros.tex")
+    venues = Path(tmp_path, "setup", "venues.tex")
+    macros.write_text(f"\\newcommand{{\\venue}}{{A}}\n\\input{{{venues.with_suffix('').as_posix()}}}\n")
+    venues.write_text("\\newcommand{\\room}{1}\n")
+    tex_file = Path(tmp_path, "handbook.tex")
+    tex_file.write_text(
+        f"\\documentclass{{book}}\n\\input{{{macros.with_suffix('').as_posix()}}}\n"
+        "\\begin{document}\nA\n\\end{document}\n"
+    )
+    dumps = []
+
+    def call(command, stdout=None, stderr=None):
+        if "-ini" in command:
+            jobname = command[2].split("=", 1)[1]
+            Path(format_dir, f"{jobname}.fmt").write_text("format")
+            dumps.append(jobname)
+            return 0
+        tex_file.with_suffix(".aux").write_text("\\relax\n")
+        return 0
+
+    monkeypatch.setattr(aclpub2.latex.subprocess, "call", call)
+    compile_latex(tex_file, tmp_path)
+    compile_latex(tex_file, tmp_path)
+    assert len(dumps) == 1
+    # Editing a file that the preamble inputs, also indirectly, gets a new format.
+    macros.write_text(macros.read_text().replace("{A}", "{B}"))
+    compile_latex(tex_file, tmp_path)
+    assert len(dumps) == 2
+    venues.write_text("\\newcommand{\\room}{2}\n")
+    compile_latex(tex_file, tmp_path)
+    assert len(dumps) == 3
+
+
+def test_log_excerpt():
+    log = "This is pdfTeX\n(./paper.tex\n! Undefined control sequence.\nl.3 \\foo\n"
+    assert log_excerpt(log, 2) == "! Undefined control sequence.\nl.3 \\foo"
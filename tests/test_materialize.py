@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from aclpub2.materialize import materialize_file, materialize_tree, prune
+
+import os
+
+
+def test_materialize_file_skips_unchanged_files(tmp_path):
+    source = Path(tmp_path, "build", "1.pdf")
+    source.parent.mkdir()
+    source.write_bytes(b"%PDF-1.4 first")
+    destination = Path(tmp_path, "output", "watermarked_pdfs", "1.pdf")
+
+    materialize_file(source, destination)
+    assert destination.read_bytes() == b"%PDF-1.4 first"
+    inode = destination.stat().st_ino
+
+    # A rebuilt file with the same content leaves the output alone.
+    source.unlink()
+    source.write_bytes(b"%PDF-1.4 first")
+    materialize_file(source, destination)
+    assert destination.stat().st_ino == inode
+
+    source.unlink()
+    source.write_bytes(b"%PDF-1.4 second")
+    materialize_file(source, destination)
+    assert destination.read_bytes() == b"%PDF-1.4 second"
+
+
+def test_prune(tmp_path):
+    source = Path(tmp_path, "papers")
+    Path(source, "sub").mkdir(parents=True)
+    Path(source, "1.pdf").write_bytes(b"1")
+    Path(source, "sub", "2.pdf").write_bytes(b"2")
+    output = Path(tmp_path, "output")
+    Path(output, "old").mkdir(parents=True)
+    Path(output, "old", "stale.pdf").write_bytes(b"stale")
+
+    kept = materialize_tree(source, Path(output, "inputs", "papers"))
+    prune(output, kept)
+
+    assert sorted(
+        str(Path(directory, file).relative_to(output))
+        for directory, _, files in os.walk(output)
+        for file in files
+    ) == ["inputs/papers/1.pdf", "inputs/papers/sub/2.pdf"]
+    assert not Path(output, "old").exists()
@@ -0,0 +1,143 @@
+from pathlib import Path
+
+from PyPDF2 import PdfFileReader, PdfFileWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, NameObject, createStringObject
+
+from aclpub2.merge import link_destination, merge_pdfs, read_page_labels, split_pdf
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_merge_pdfs(tmp_path):
+    papers = sorted(Path(ROOT, "examples", "sigdial", "papers").glob("*.pdf"))[:3]
+    num_pages = [PdfFileReader(str(paper)).getNumPages() for paper in papers]
+    output_path = Path(tmp_path, "merged.pdf")
+    merge_pdfs(
+        papers,
+        output_path,
+        bookmarks=[("Second", num_pages[0]), ("First", 0)],
+        named_pages={"page.1": 0, "page.2": num_pages[0]},
+        labels=[(0, "/r"), (2, "/D", 5)],
+    )
+
+    merged = PdfFileReader(str(output_path))
+    assert merged.getNumPages() == sum(num_pages)
+    destinations = merged.namedDestinations
+    assert merged.getDestinationPageNumber(destinations["page.1"]) == 0
+    assert merged.getDestinationPageNumber(destinations["page.2"]) == num_pages[0]
+    titles = [item.title for item in merged.getOutlines() if not isinstance(item, list)]
+    assert titles.index("First") < titles.index("Second")
+    assert read_page_labels(output_path) == [(0, "/r", 1), (2, "/D", 5)]
+
+
+def test_merge_pdfs_keeps_links_within_their_input(tmp_path):
+    papers = sorted(Path(ROOT, "examples", "sigdial", "papers").glob("*.pdf"))[:3]
+    readers = [PdfFileReader(str(paper)) for paper in papers]
+    output_path = Path(tmp_path, "merged.pdf")
+    merge_pdfs(papers, output_path)
+
+    merged = PdfFileReader(str(output_path))
+    page_numbers = {
+        merged.getPage(i).indirectRef.idnum: i for i in range(merged.getNumPages())
+    }
+    # The first paper defines many of the names of the last one.
+    shared = set(readers[0].namedDestinations) & set(readers[2].namedDestinations)
+    first_page = readers[0].getNumPages() + readers[1].getNumPages()
+    checked = 0
+    for i in range(readers[2].getNumPages()):
+        original = readers[2].getPage(i).get("/Annots") or []
+        annotations = merged.getPage(first_page + i).get("/Annots") or []
+        for before, after in zip(original, annotations):
+            link = link_destination(before.getObject())
+            if link is None or link[0][link[1]] not in shared:
+                continue
+            destination = readers[2].namedDestinations[link[0][link[1]]]
+            after_link = link_destination(after.getObject())
+            target = after_link[0][after_link[1]][0]
+            assert page_numbers[target.idnum] == (
+                first_page + readers[2].getDestinationPageNumber(destination)
+            )
+            checked += 1
+    assert checked > 0
+
+
+def write_linked_pdf(path: Path):
+    # Two pages, the first linking to the name "target" on the second through
+    # an indirect /Annots array.
+    writer = PdfFileWriter()
+    first = writer.addBlankPage(width=595, height=842)
+    writer.addBlankPage(width=595, height=842)
+    link = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Annot"),
+            NameObject("/Subtype"): NameObject("/Link"),
+            NameObject("/Rect"): ArrayObject(),
+            NameObject("/Dest"): createStringObject("target"),
+        }
+    )
+    first[NameObject("/Annots")] = writer._addObject(ArrayObject([writer._addObject(link)]))
+    target = writer.getObject(writer._pages)["/Kids"][1]
+    names = ArrayObject([createStringObject("target"), ArrayObject([target, NameObject("/Fit")])])
+    writer._root_object[NameObject("/Names")] = DictionaryObject(
+        {NameObject("/Dests"): DictionaryObject({NameObject("/Names"): names})}
+    )
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_merge_pdfs_resolves_indirect_annotations(tmp_path):
+    pdf_path = Path(tmp_path, "linked.pdf")
+    write_linked_pdf(pdf_path)
+    output_path = Path(tmp_path, "merged.pdf")
+    merge_pdfs([pdf_path, pdf_path], output_path)
+
+    merged = PdfFileReader(str(output_path))
+    page_numbers = {
+        merged.getPage(i).indirectRef.idnum: i for i in range(merged.getNumPages())
+    }
+    for first_page in (0, 2):
+        annotations = merged.getPage(first_page)["/Annots"].getObject()
+        link = link_destination(annotations[0].getObject())
+        assert page_numbers[link[0][link[1]][0].idnum] == first_page + 1
+
+
+def test_merge_pdfs_copies_nested_outlines(tmp_path):
+    writer = PdfFileWriter()
+    for _ in range(3):
+        writer.addBlankPage(width=595, height=842)
+    chapter = writer.addBookmark("Chapter", 0)
+    writer.addBookmark("Section", 2, parent=chapter)
+    pdf_path = Path(tmp_path, "outlined.pdf")
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+    output_path = Path(tmp_path, "merged.pdf")
+    merge_pdfs([pdf_path, pdf_path], output_path, bookmarks=[("Second", 3)])
+
+    merged = PdfFileReader(str(output_path), strict=True)
+    outline = merged.getOutlines()
+    assert [item.title for item in outline if not isinstance(item, list)] == [
+        "Chapter",
+        "Second",
+        "Chapter",
+    ]
+    assert [merged.getDestinationPageNumber(outline[i]) for i in (0, 2, 3)] == [0, 3, 3]
+    assert [item.title for item in outline[4]] == ["Section"]
+    assert merged.getDestinationPageNumber(outline[4][0]) == 5
+
+
+def test_split_pdf(tmp_path):
+    papers = sorted(Path(ROOT, "examples", "sigdial", "papers").glob("*.pdf"))[:3]
+    readers = [PdfFileReader(str(paper)) for paper in papers]
+    merged_path = Path(tmp_path, "merged.pdf")
+    merge_pdfs(papers, merged_path)
+
+    parts = [(Path(tmp_path, f"{i}.pdf"), r.getNumPages()) for i, r in enumerate(readers)]
+    split_pdf(merged_path, parts)
+
+    for (part_path, num_pages), reader in zip(parts, readers):
+        part = PdfFileReader(str(part_path))
+        assert part.getNumPages() == num_pages
+        for i in range(num_pages):
+            assert len(part.getPage(i).get("/Annots") or []) == len(
+                reader.getPage(i).get("/Annots") or []
+            )
@@ -0,0 +1,189 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import importlib.util
+import json
+import os
+import sys
+import yaml
+
+ROOT = Path(__file__).parent.parent
+
+
+def load_script_module(name):
+    # The OpenReview scripts are not a package, they import their helpers from
+    # their folder.
+    spec = importlib.util.spec_from_file_location(name, Path(ROOT, "openreview", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+util = load_script_module("util")
+downloads = load_script_module("downloads")
+or2program_committee = load_script_module("or2program_committee")
+
+
+def profile(username, email):
+    first, last = username.strip("~0123456789").split("_")
+    return SimpleNamespace(
+        id=username,
+        content={
+            "names": [{"first": first, "last": last, "username": username, "preferred": True}],
+            "emails": [email],
+            "history": [{"institution": {"name": "ETH Zürich"}}],
+        },
+    )
+
+
+class FakeClient:
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.calls = []
+
+    def search_profiles(self, ids=None, emails=None):
+        self.calls.append(ids or emails)
+        if ids is not None:
+            return [p for p in self.profiles if p.id in ids]
+        # As openreview-py does, by lowercased email, with a list of profiles each.
+        found = {}
+        for email in emails:
+            matches = [p for p in self.profiles if email.lower() in p.content["emails"]]
+            if matches:
+                found[email.lower()] = matches
+        return found
+
+
+def test_get_users_batches_and_caches(tmp_path):
+    client = FakeClient(
+        [profile("~Ada_Lovelace1", "ada@example.org"), profile("~Alan_Turing1", "alan@example.org")]
+    )
+    cache_path = str(Path(tmp_path, "profiles.json"))
+    or_ids = ["~Ada_Lovelace1", "alan@example.org", "~Ada_Lovelace1", "~Nobody_Here1"]
+
+    users = util.get_users(or_ids, client, cache_path=cache_path)
+
+    assert client.calls == [["~Ada_Lovelace1", "~Nobody_Here1"], ["alan@example.org"]]
+    assert users["~Ada_Lovelace1"] == (
+        {
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "name": "Ada Lovelace",
+            "username": "~Ada_Lovelace1",
+            "emails": "ada@example.org",
+            "institution": "ETH Zürich",
+        },
+        False,
+    )
+    assert users["alan@example.org"][0]["username"] == "~Alan_Turing1"
+    assert users["~Nobody_Here1"] == (util.missing_user("~Nobody_Here1"), True)
+
+    # Found profiles come from the cache until they expire.
+    client.calls.clear()
+    assert util.get_users(or_ids, client, cache_path=cache_path) == users
+    assert client.calls == [["~Nobody_Here1"]]
+    client.calls.clear()
+    util.get_users(or_ids, client, cache_path=cache_path, ttl=0)
+    assert len(client.calls) == 2
+    with open(cache_path) as f:
+        assert set(json.load(f)) == {"~Ada_Lovelace1", "alan@example.org"}
+
+
+def test_get_users_matches_emails_case_insensitively():
+    client = FakeClient([profile("~Alan_Turing1", "alan@example.org")])
+
+    users = util.get_users(["Alan@Example.org", "alan@example.org", "nobody@example.org"], client)
+
+    assert client.calls == [["Alan@Example.org", "alan@example.org", "nobody@example.org"]]
+    assert users["Alan@Example.org"][0]["username"] == "~Alan_Turing1"
+    assert users["alan@example.org"][0]["username"] == "~Alan_Turing1"
+    assert users["nobody@example.org"] == (util.missing_user("nobody@example.org"), True)
+
+
+def test_get_program_committee_resolves_members_once(tmp_path):
+    client = FakeClient(
+        [profile("~Ada_Lovelace1", "ada@example.org"), profile("~Alan_Turing1", "alan@example.org")]
+    )
+    venue = "aclweb.org/ACL/2022/Conference"
+    all_groups = [
+        SimpleNamespace(id=f"{venue}/Program_Chairs", members=["~Ada_Lovelace1"]),
+        SimpleNamespace(id=f"{venue}/Syntax/Area_Chairs", members=["~Alan_Turing1"]),
+        SimpleNamespace(id=f"{venue}/Syntax/Reviewers", members=["~Ada_Lovelace1", "~Nobody_Here1"]),
+        SimpleNamespace(id=f"{venue}/Reviewers", members=["alan@example.org", "~Ada_Lovelace1"]),
+    ]
+
+    committee = or2program_committee.get_program_committee(
+        client, all_groups, venue, cache_path=str(Path(tmp_path, "profiles.json"))
+    )
+
+    assert client.calls == [["~Ada_Lovelace1", "~Alan_Turing1", "~Nobody_Here1"], ["alan@example.org"]]
+    assert [(role["role"], [entry["name"] for entry in role["entries"]]) for role in committee] == [
+        ("Program Chairs", ["Ada Lovelace"]),
+        ("Syntax Area Chairs", ["Alan Turing"]),
+        ("Reviewers", ["Ada Lovelace", "Alan Turing"]),
+        ("Syntax Reviewers", ["Ada Lovelace"]),
+    ]
+    assert [role.get("type") for role in committee] == [None, None, "name_block", "name_block"]
+    # People in several roles are written out in full every time.
+    assert "&id" not in yaml.dump(committee, allow_unicode=True)
+
+
+def test_get_program_committee_resolves_members_by_email(tmp_path):
+    client = FakeClient(
+        [profile("~Grace_Hopper1", "grace@example.org"), profile("~Alan_Turing1", "alan@example.org")]
+    )
+    venue = "aclweb.org/ACL/2022/Conference"
+    all_groups = [
+        SimpleNamespace(id=f"{venue}/Senior_Area_Chairs", members=["Grace@Example.org"]),
+        SimpleNamespace(id=f"{venue}/Area_Chairs", members=["alan@example.org"]),
+        SimpleNamespace(id=f"{venue}/Reviewers", members=["~Alan_Turing1", "grace@example.org"]),
+    ]
+
+    committee = or2program_committee.get_program_committee(
+        client, all_groups, venue, cache_path=str(Path(tmp_path, "profiles.json"))
+    )
+
+    assert [(role["role"], [entry["username"] for entry in role["entries"]]) for role in committee] == [
+        ("Senior Area Chairs", ["~Grace_Hopper1"]),
+        ("Area Chairs", ["~Alan_Turing1"]),
+        ("Reviewers", ["~Grace_Hopper1", "~Alan_Turing1"]),
+    ]
+
+
+def test_download_files_resumes(tmp_path):
+    fetched = []
+
+    def fetch(name, content):
+        def fetch_content():
+            fetched.append(name)
+            if content is None:
+                raise ConnectionError("timed out")
+            return content
+
+        return fetch_content
+
+    manifest = str(Path(tmp_path, "downloads.jsonl"))
+    files = [
+        downloads.Download(str(Path(tmp_path, "papers", "1.pdf")), "/pdf/a.pdf", fetch("1", b"%PDF 1")),
+        downloads.Download(str(Path(tmp_path, "papers", "2.pdf")), "/pdf/b.pdf", fetch("2", None)),
+    ]
+    failed = downloads.download_files(files, manifest, jobs=2, retries=0)
+    assert [d.path for d in failed] == [files[1].path]
+    assert Path(files[0].path).read_bytes() == b"%PDF 1"
+    assert os.listdir(Path(tmp_path, "papers")) == ["1.pdf"]
+
+    # A re-run only fetches the failed and the new files, then the changed one.
+    fetched.clear()
+    files = [
+        files[0],
+        downloads.Download(files[1].path, "/pdf/b.pdf", fetch("2", b"%PDF 2")),
+        downloads.Download(str(Path(tmp_path, "attachments", "1.zip")), "/attachment/c.zip", fetch("3", b"PK")),
+    ]
+    assert downloads.download_files(files, manifest, retries=0) == []
+    assert sorted(fetched) == ["2", "3"]
+    fetched.clear()
+    files[0] = downloads.Download(files[0].path, "/pdf/a2.pdf", fetch("1", b"%PDF 1b"))
+    assert downloads.download_files(files, manifest, retries=0) == []
+    assert fetched == ["1"]
+    assert Path(files[0].path).read_bytes() == b"%PDF 1b"
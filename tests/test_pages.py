@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from PyPDF2 import PdfFileReader, PdfFileWriter
+
+import aclpub2.pages
+from aclpub2.pages import count_pages, load_index, read_page_count
+
+ROOT = Path(__file__).parent.parent
+
+
+def write_blank_pdf(path: Path, num_pages: int):
+    writer = PdfFileWriter()
+    for _ in range(num_pages):
+        writer.addBlankPage(width=595, height=842)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_read_page_count_matches_pypdf2():
+    for paper in sorted(Path(ROOT, "examples", "sigdial", "papers").glob("*.pdf"))[:5]:
+        assert read_page_count(paper) == PdfFileReader(str(paper)).getNumPages()
+
+
+def test_count_pages_uses_index(tmp_path):
+    papers = [Path(tmp_path, f"{i}.pdf") for i in range(1, 4)]
+    for i, paper in enumerate(papers, start=1):
+        write_blank_pdf(paper, i)
+    index_path = Path(tmp_path, "index.json")
+
+    assert count_pages(papers, index_path, processes=2) == {
+        papers[0]: 1,
+        papers[1]: 2,
+        papers[2]: 3,
+    }
+    assert len(load_index(index_path)) == 3
+    assert count_pages(papers, index_path) == count_pages(papers)
+
+    write_blank_pdf(papers[0], 5)
+    assert count_pages(papers, index_path)[papers[0]] == 5
+
+
+def test_count_pages_parses_copies_once(tmp_path, monkeypatch):
+    papers = [Path(tmp_path, volume, "1.pdf") for volume in ("main", "findings")]
+    for paper in papers:
+        paper.parent.mkdir()
+        write_blank_pdf(paper, 2)
+    parsed = []
+
+    def counting_read_page_count(pdf_path):
+        parsed.append(pdf_path)
+        return read_page_count(pdf_path)
+
+    monkeypatch.setattr(aclpub2.pages, "read_page_count", counting_read_page_count)
+    assert count_pages(papers) == {papers[0]: 2, papers[1]: 2}
+    assert len(parsed) == 1
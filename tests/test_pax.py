@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import aclpub2.pax
+from aclpub2.cache import BuildCache, hash_file
+from aclpub2.pax import extract_annotations, hash_included_pdf
+
+
+def test_extract_annotations_runs_pax_once_per_pdf(tmp_path, monkeypatch):
+    batches = []
+
+    def fake_run_pax(pdf_paths):
+        batches.append(pdf_paths)
+        for path in pdf_paths:
+            path.with_suffix(".pax").write_text("pax")
+
+    monkeypatch.setattr(aclpub2.pax, "run_pax", fake_run_pax)
+    papers = []
+    for name in ["1", "2", "3"]:
+        paper = Path(tmp_path, f"{name}.pdf")
+        paper.write_bytes(f"%PDF {name}".encode())
+        papers.append(paper)
+    # A paper that ships its own annotations is used as is.
+    Path(tmp_path, "3.pax").write_text("pax")
+    cache = BuildCache(Path(tmp_path, "cache"))
+
+    included = extract_annotations(papers, cache, jvms=2)
+    assert len(batches) == 2
+    assert sum(len(batch) for batch in batches) == 2
+    assert included[papers[2]] == papers[2]
+    for paper in papers:
+        assert included[paper].read_bytes() == paper.read_bytes()
+        assert included[paper].with_suffix(".pax").exists()
+
+    assert extract_annotations(papers, cache, jvms=2) == included
+    assert len(batches) == 2
+
+
+def test_hash_included_pdf_covers_pax_file(tmp_path):
+    paper = Path(tmp_path, "1.pdf")
+    paper.write_bytes(b"%PDF 1")
+    assert hash_included_pdf(paper) == hash_file(paper)
+
+    annotations = paper.with_suffix(".pax")
+    annotations.write_text("pax")
+    key = hash_included_pdf(paper)
+    assert key != hash_file(paper)
+    annotations.write_text("edited pax")
+    assert hash_included_pdf(paper) != key
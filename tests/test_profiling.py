@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from aclpub2 import profiling
+
+import json
+import sys
+
+
+def test_trace(tmp_path):
+    trace_path = Path(tmp_path, "profile.json")
+    profiling.enable(trace_path)
+    with profiling.stage("outer", volume="test"):
+        assert profiling.call([sys.executable, "-c", "pass"]) == 0
+    profiling.write_trace(trace_path)
+    assert not profiling.enabled()
+
+    with open(trace_path) as f:
+        trace = json.load(f)
+    events = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    assert events["outer"]["args"]["volume"] == "test"
+    assert events["outer"]["dur"] >= events[Path(sys.executable).name]["dur"]
+    assert events[Path(sys.executable).name]["args"]["max_rss"] > 0
+    assert trace["summary"]["outer"]["count"] == 1
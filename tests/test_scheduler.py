@@ -0,0 +1,64 @@
+from aclpub2.scheduler import DependencyFailed, Result, Scheduler
+
+import os
+import threading
+import time
+
+
+def square(x):
+    return x * x
+
+
+def pid(_):
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("failed")
+
+
+def test_dependencies_and_results():
+    scheduler = Scheduler(jobs=2)
+    scheduler.add("numbers", lambda: {"a": 2, "b": 3})
+    scheduler.add("a", square, Result("numbers", "a"), in_process=True)
+    scheduler.add("b", square, Result("numbers", "b"))
+    scheduler.add("sum", lambda a, b: a + b, Result("a"), Result("b"))
+    scheduler.add("pid", pid, Result("a"), in_process=True)
+    scheduler.add("dict", lambda d: d, {"a": Result("a"), "c": 4})
+    results, failures = scheduler.run()
+    assert failures == {}
+    assert results["sum"] == 13
+    assert results["dict"] == {"a": 4, "c": 4}
+    assert results["pid"] != os.getpid()
+
+
+def test_failures_propagate():
+    scheduler = Scheduler(jobs=2)
+    scheduler.add("fail", fail)
+    scheduler.add("after fail", square, 2, after=["fail"])
+    scheduler.add("after that", square, Result("after fail"))
+    scheduler.add("independent", square, 3)
+    results, failures = scheduler.run()
+    assert results == {"independent": 9}
+    assert isinstance(failures["fail"], ValueError)
+    assert isinstance(failures["after that"], DependencyFailed)
+
+
+def test_concurrency_budget():
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def task():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.pop()
+
+    scheduler = Scheduler(jobs=3)
+    for i in range(12):
+        scheduler.add(f"task {i}", task)
+    scheduler.run()
+    assert max(peak) <= 3
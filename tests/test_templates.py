@@ -0,0 +1,37 @@
+from aclpub2.templates import (
+    LATEX_JINJA_ENV,
+    collect_author_index,
+    index_author,
+    index_speakers,
+    render_name,
+)
+
+
+def test_author_index_is_built_while_rendering():
+    template = LATEX_JINJA_ENV.from_string(
+        "\\VAR{join_names(', ', authors, ' and ')}\n"
+        "\\VAR{index_speakers(speakers)}\n"
+        "\\VAR{print_author_index()}"
+    )
+    authors = [
+        {"first_name": "Alan", "last_name": "Turing"},
+        {"first_name": "Ada", "middle_name": "King", "last_name": "Lovelace"},
+    ]
+    with collect_author_index():
+        rendered = template.render(authors=authors, speakers="Alan Turing, Grace Hopper")
+
+    assert rendered.splitlines() == [
+        r"Alan Turing\aclindex{0} and Ada King Lovelace\aclindex{1}",
+        r"\aclindex{0}\aclindex{2}",
+        r"\begin{theindex}",
+        r"\item Hopper, Grace, \aclindexpages{2}",
+        r"\indexspace",
+        r"\item Lovelace, Ada King, \aclindexpages{1}",
+        r"\indexspace",
+        r"\item Turing, Alan, \aclindexpages{0}",
+        r"\end{theindex}",
+    ]
+    # Outside of collect_author_index, names go to makeindex in their old form.
+    assert render_name(authors[0]) == r"Alan Turing\index{Turing}"
+    assert index_author("Ada King Lovelace") == r"\index{Lovelace, Ada King}"
+    assert index_speakers("Alan Turing, Grace Hopper") == r"\index{Turing}\index{Hopper}"
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from PyPDF2 import PdfFileReader
+import yaml
+
+from aclpub2.watermark import watermark_lines, watermark_pdf, latex_to_text
+
+ROOT = Path(__file__).parent.parent
+CONFERENCE = yaml.safe_load(
+    """
+book_title: Proceedings of the Workshop on Tests \\& Benchmarks
+start_date: 2020-01-01
+end_date: 2020-01-02
+"""
+)
+
+
+def test_latex_to_text():
+    assert latex_to_text("A \\& B --- 5--7") == "A & B — 5–7"
+
+
+def test_watermark_lines():
+    paper = {"start_page": 5, "end_page": 11}
+    lines = watermark_lines(paper, CONFERENCE)
+    assert "".join(text for _, text in lines[0]) == (
+        "Proceedings of the Workshop on Tests & Benchmarks, pages 5–11"
+    )
+    assert "".join(text for _, text in lines[1]) == (
+        "January 1-2, 2020 © 2020 Association for Computational Linguistics"
+    )
+
+    conference = dict(CONFERENCE, watermark_book_title="First line\\\\Second line")
+    assert len(watermark_lines(paper, conference)) == 3
+
+
+def test_watermark_pdf_keeps_pages_and_annotations(tmp_path):
+    source = Path(ROOT, "examples", "sigdial", "papers", "2.pdf")
+    output = Path(tmp_path, "2.pdf")
+    lines = watermark_lines({"start_page": 5, "end_page": 11}, CONFERENCE)
+    watermark_pdf(source, output, lines, 5)
+
+    original = PdfFileReader(str(source))
+    watermarked = PdfFileReader(str(output))
+    assert watermarked.getNumPages() == original.getNumPages()
+    for i in range(original.getNumPages()):
+        assert len(watermarked.getPage(i).get("/Annots", [])) == len(
+            original.getPage(i).get("/Annots", [])
+        )
+    assert set(watermarked.namedDestinations) == set(original.namedDestinations)
+    assert "pages 5" in watermarked.getPage(0).extractText()
+    # The footer is only on the first page, the page numbers on every page.
+    assert "pages 5" not in watermarked.getPage(1).extractText()
+    assert "6" in watermarked.getPage(1).extractText().split("\n")